@@ -0,0 +1,221 @@
+import threading
+import time
+from services.logging_service import logging_service
+from models.stroop_amount import StroopAmount, parse_stroops, format_stroops
+from config.config import Config
+
+class AccountStateTracker:
+    """
+    Locally maintained account balances.
+
+    The account is loaded from Horizon once, then balance deltas from the
+    account's effects stream are applied in place. Transaction fees do not
+    produce effects, and some effect types are not modelled, so the tracker
+    also resyncs from Horizon on those and every resync_interval seconds.
+    Listeners are called as listener(asset_code, balance, effect) after each
+    applied change.
+
+    The stream starts at the first ledger after the loaded snapshot and
+    resumes from the last paging token after a disconnect, so no effect is
+    lost; effects from ledgers the snapshot already includes are skipped.
+    The balance change of the account's own path payments shows up as
+    account_debited/account_credited, so trade effects are applied only
+    for offers this account made (as of the last resync).
+    """
+
+    # Effect types whose balance impact is not reconstructed locally
+    RESYNC_EFFECTS = {
+        'liquidity_pool_deposited', 'liquidity_pool_withdrew',
+        'claimable_balance_claimed', 'claimable_balance_created',
+        'account_removed', 'trustline_flags_updated'
+    }
+
+    def __init__(self, stellar_service, resync_interval=Config.ACCOUNT_RESYNC_INTERVAL):
+        self.stellar_service = stellar_service
+        self.resync_interval = resync_interval
+        self.sequence = None
+        self.balances = {}
+        self.offer_ids = set()
+        self.synced_ledger = 0
+        self.applied_ledger = 0
+        self.cursor = None
+        self.last_synced = 0.0
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def is_ready(self):
+        return self._thread is not None and self._thread.is_alive() and self.last_synced > 0
+
+    def add_listener(self, callback):
+        """Register a callback for balance changes"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def start(self):
+        """Load the account and start following its effects stream"""
+        self.resync()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._follow_effects, name="account-effects", daemon=True)
+        self._thread.start()
+        logging_service.info("Account state tracker started")
+
+    def stop(self):
+        self._stop_event.set()
+        logging_service.info("Account state tracker stopped")
+
+    def resync(self):
+        """Replace local balances with a fresh account load from Horizon"""
+        account_details = self.stellar_service.get_account_details()
+        offer_ids = self._load_offer_ids()
+        balances = {}
+        synced_ledger = account_details.get('last_modified_ledger') or 0
+        for balance in account_details['balances']:
+            asset_code = self._asset_code(balance)
+            if asset_code:
+                balances[asset_code] = dict(balance)
+            synced_ledger = max(synced_ledger, balance.get('last_modified_ledger') or 0)
+        with self._lock:
+            self.sequence = account_details['sequence']
+            self.balances = balances
+            self.offer_ids = offer_ids
+            # Every balance-changing effect modifies an entry, so ledgers up
+            # to the latest last_modified_ledger are in the snapshot
+            self.synced_ledger = synced_ledger
+            self.applied_ledger = max(self.applied_ledger, synced_ledger)
+            if self.cursor is None:
+                self.cursor = str((synced_ledger + 1) << 32)
+            self.last_synced = time.time()
+        logging_service.debug(f"Account state resynced with {len(balances)} balances at ledger {synced_ledger}")
+
+    def _load_offer_ids(self):
+        """Ids of the account's open offers, following Horizon's pages"""
+        offer_ids = set()
+        cursor = None
+        while True:
+            builder = self.stellar_service.server.offers().for_seller(self.stellar_service.public_key).limit(200)
+            if cursor is not None:
+                builder = builder.cursor(cursor)
+            records = builder.call().get('_embedded', {}).get('records', [])
+            offer_ids.update(str(record['id']) for record in records)
+            if len(records) < 200:
+                return offer_ids
+            cursor = records[-1]['paging_token']
+
+    def get_account_details(self):
+        """Account details in the same shape as StellarService.get_account_details"""
+        if time.time() - self.last_synced > self.resync_interval:
+            self.resync()
+        with self._lock:
+            return {
+                'sequence': self.sequence,
+                'balances': [dict(balance) for balance in self.balances.values()]
+            }
+
+    def get_balance(self, asset_code):
+        with self._lock:
+            balance = self.balances.get(asset_code)
+            return StroopAmount.parse(balance['balance']) if balance else StroopAmount(0)
+
+    def _follow_effects(self):
+        """Stream account effects, reconnecting with backoff"""
+        backoff = 1
+        while not self._stop_event.is_set():
+            try:
+                stream = (
+                    self.stellar_service.server.effects()
+                    .for_account(self.stellar_service.public_key)
+                    .cursor(self.cursor or 'now')
+                    .stream()
+                )
+                for effect in stream:
+                    if self._stop_event.is_set():
+                        return
+                    self._apply_effect(effect)
+                    self.cursor = effect.get('paging_token', self.cursor)
+                    self.applied_ledger = max(self.applied_ledger, self._effect_ledger(effect) or 0)
+                    backoff = 1
+            except Exception as e:
+                # Reconnecting resumes from the last paging token, so nothing is missed
+                logging_service.warning(f"Account effects stream interrupted: {str(e)}")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+    @staticmethod
+    def _effect_ledger(effect):
+        """Ledger of an effect, from its paging token (a TOID with the ledger in the high 32 bits)"""
+        try:
+            return int(effect['paging_token'].split('-')[0]) >> 32
+        except (KeyError, ValueError):
+            return None
+
+    def _apply_effect(self, effect):
+        """Apply one effect's balance delta"""
+        effect_type = effect.get('type')
+        changes = []
+
+        ledger = self._effect_ledger(effect)
+        if ledger is not None and ledger <= self.synced_ledger:
+            # Already reflected in the last resync
+            return
+
+        if effect_type == 'account_credited':
+            changes.append((self._asset_code(effect), parse_stroops(effect['amount'])))
+        elif effect_type == 'account_debited':
+            changes.append((self._asset_code(effect), -parse_stroops(effect['amount'])))
+        elif effect_type == 'trade':
+            if str(effect.get('offer_id')) not in self.offer_ids:
+                # Taker side: the debited/credited effects already carry the change
+                return
+            changes.append((self._asset_code(effect, 'sold_'), -parse_stroops(effect['sold_amount'])))
+            changes.append((self._asset_code(effect, 'bought_'), parse_stroops(effect['bought_amount'])))
+        elif effect_type == 'trustline_created':
+            changes.append((self._asset_code(effect), 0))
+        elif effect_type == 'trustline_removed':
+            asset_code = self._asset_code(effect)
+            with self._lock:
+                self.balances.pop(asset_code, None)
+            self._notify(asset_code, StroopAmount(0), effect)
+            return
+        elif effect_type in self.RESYNC_EFFECTS:
+            self.resync()
+            return
+        else:
+            return
+
+        for asset_code, delta in changes:
+            if not asset_code:
+                continue
+            with self._lock:
+                balance = self.balances.setdefault(asset_code, {
+                    'balance': '0.0000000',
+                    'asset_type': 'native' if asset_code == 'XLM' else effect.get('asset_type'),
+                    'asset_code': asset_code
+                })
+                new_balance = StroopAmount(parse_stroops(balance['balance']) + delta)
+                balance['balance'] = format_stroops(new_balance.stroops)
+            self._notify(asset_code, new_balance, effect)
+
+    def _notify(self, asset_code, balance, effect):
+        for listener in list(self._listeners):
+            try:
+                listener(asset_code, balance, effect)
+            except Exception as e:
+                logging_service.error(f"Account state listener failed: {str(e)}")
+
+    @staticmethod
+    def _asset_code(record, prefix=''):
+        """Map a Horizon balance or effect record to an asset code"""
+        asset_type = record.get(f'{prefix}asset_type', 'native')
+        if asset_type == 'native':
+            return 'XLM'
+        if asset_type == 'liquidity_pool_shares':
+            return None
+        return record.get(f'{prefix}asset_code')
+
+__all__ = ['AccountStateTracker']
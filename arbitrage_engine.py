@@ -1,64 +1,163 @@
+import math
+import numpy as np
 from services.market_data_service import market_data_service
+from services.order_book_service import order_book_service
+from services.liquidity_pool_service import liquidity_pool_service
 from services.logging_service import logging_service
+from services.metrics_service import metrics_service
+from services.fee_engine import fee_engine
+from core.arbitrage_graph import ArbitrageGraph
+from core.path_finder import LocalPathFinder
+from models.stroop_amount import STROOPS_PER_UNIT, StroopAmount, to_stroops_array
 from config.config import Config
 
 class ArbitrageEngine:
-    def __init__(self, stellar_service):
+    def __init__(self, stellar_service, trade_sizes=Config.ARBITRAGE_TRADE_SIZES, fee_stroops=None):
+        """
+        Args:
+            stellar_service (StellarService): Account the opportunities are for
+            trade_sizes (list): Notionals, in the reference currency, at which
+                every opportunity is evaluated
+            fee_stroops (int): Network fee per operation to size cycles
+                with; by default the fee the executor bids at 'high' urgency
+        """
         self.stellar_service = stellar_service
-    
-    def find_profitable_paths(self, current_portfolio, threshold=Config.ARBITRAGE_THRESHOLD):
+        self.fee_stroops = fee_stroops
+        self.graph = ArbitrageGraph()
+        self.path_finder = LocalPathFinder()
+        self.trade_sizes = np.asarray(trade_sizes, dtype=np.float64)
+
+    @metrics_service.timed('arbitrage_scan')
+    def find_profitable_paths(self, current_portfolio, threshold=Config.ARBITRAGE_THRESHOLD,
+                              market_prices=None):
         """
         Detect arbitrage opportunities across different trading paths
-        
+
         Args:
             current_portfolio (dict): Current asset allocation
             threshold (float): Minimum profit percentage to execute
-        
+            market_prices (dict): Already fetched prices; retrieved when omitted
+
         Returns:
-            list: Profitable arbitrage paths
+            list: Profitable arbitrage paths, including multi-hop cycles,
+                ranked by profit at their best trade size. Sized paths carry
+                'trade_size' (StroopAmount of the first asset), 'profit_value'
+                (reference currency, after network fees) and 'expected_profit'
+                (StroopAmount of XLM); paths whose liquidity is unknown follow
+                with those set to None. to_path_payment() turns a sized path
+                into executable payment details.
         """
         try:
             # Retrieve market prices for assets
-            market_prices = market_data_service.get_current_prices()
-            
-            profitable_paths = []
-            
-            # Cross-asset arbitrage detection
-            for source_asset in current_portfolio:
-                for target_asset in market_prices:
-                    if source_asset != target_asset:
-                        profit_percentage = self._calculate_arbitrage_opportunity(
-                            source_asset, 
-                            target_asset, 
-                            market_prices
-                        )
-                        
-                        if profit_percentage > threshold:
-                            path = {
-                                'source_asset': source_asset,
-                                'target_asset': target_asset,
-                                'profit_percentage': profit_percentage
-                            }
-                            profitable_paths.append(path)
-                            logging_service.info(f"Found profitable arbitrage path: {path}")
-            
+            if market_prices is None:
+                market_prices = market_data_service.get_current_prices()
+
+            # Only executable rates form edges: top of book, or the marginal
+            # pool rate where the pool pays more
+            rates = order_book_service.get_rates(max_age=Config.ORDER_BOOK_MAX_AGE)
+            for pair, rate in liquidity_pool_service.get_rates(max_age=Config.ORDER_BOOK_MAX_AGE).items():
+                if rate > rates.get(pair, 0.0):
+                    rates[pair] = rate
+            self.graph.update_rates(rates)
+
+            # Only keep cycles we can enter from an asset we actually hold
+            candidates = [
+                path for path in self.graph.find_negative_cycles(threshold)
+                if any(asset in current_portfolio for asset in path['path'])
+            ]
+
+            # Size every candidate against on-chain depth and rank by profit at size
+            sized, unsized = [], []
+            for path in candidates:
+                self._size_path(path, market_prices)
+                if path['profit_value'] is None:
+                    unsized.append(path)
+                elif path['profit_value'] > 0:
+                    sized.append(path)
+            sized.sort(key=lambda p: p['profit_value'], reverse=True)
+            profitable_paths = sized + unsized
+
+            for path in profitable_paths:
+                logging_service.info("Found profitable arbitrage path: %s", path)
+
             return profitable_paths
-        
+
         except Exception as e:
             logging_service.error(f"Error in arbitrage path detection: {e}")
             return []
-    
-    def _calculate_arbitrage_opportunity(self, source_asset, target_asset, market_prices):
-        """Calculate potential arbitrage profit"""
-        try:
-            source_price = market_prices[source_asset]
-            target_price = market_prices[target_asset]
-            
-            # Simple cross-asset price comparison
-            conversion_rate = source_price / target_price
-            profit_percentage = (conversion_rate - 1) * 100
-            
-            return profit_percentage
-        except Exception as e:
-            logging_service.error(f"Error calculating arbitrage opportunity: {e}")
-            return 0.0
+
+    def _size_path(self, path, market_prices):
+        """
+        Evaluate a cycle at every trade size and record the most profitable
+
+        Each hop is quoted for all sizes at once against the better of its
+        order book and pool, so no Horizon round trip is made per candidate.
+        """
+        path.update({'trade_size': None, 'profit_value': None, 'expected_profit': None, 'break_even': None})
+        codes = path['path']
+        start_price = float(market_prices.get(codes[0], 0) or 0)
+        if start_price <= 0:
+            return
+
+        sizes = to_stroops_array(self.trade_sizes / start_price).astype(np.float64)
+        sizes[sizes <= 0] = np.nan
+        amounts = sizes
+        for source_asset, target_asset in zip(codes[:-1], codes[1:]):
+            amounts = self.path_finder.hop_send_array(source_asset, target_asset, amounts)
+
+        xlm_price = float(market_prices.get('XLM', 0) or 0)
+        fee_value = self.execution_fee() / STROOPS_PER_UNIT * xlm_price
+        profit_value = (amounts - sizes) / STROOPS_PER_UNIT * start_price - fee_value
+        if not np.isfinite(profit_value).any():
+            return
+
+        best = int(np.nanargmax(profit_value))
+        path['trade_size'] = StroopAmount(sizes[best])
+        path['profit_value'] = float(profit_value[best])
+        path['profit_percentage_at_size'] = float((amounts[best] / sizes[best] - 1) * 100)
+        # Receiving less than this back loses money once network fees are paid
+        path['break_even'] = StroopAmount(math.ceil(sizes[best] + fee_value / start_price * STROOPS_PER_UNIT))
+        if xlm_price > 0:
+            path['expected_profit'] = StroopAmount(int(path['profit_value'] / xlm_price * STROOPS_PER_UNIT))
+
+    def execution_fee(self):
+        """
+        Stroops to execute one cycle
+
+        A cycle runs as a single path-payment operation, bid at 'high'
+        urgency like to_path_payment asks the executor to.
+        """
+        if self.fee_stroops is not None:
+            return self.fee_stroops
+        if not Config.FEE_ENGINE_ENABLED:
+            return Config.MAX_TRANSACTION_FEE
+        return fee_engine.fee_for(1, 'high')
+
+    def to_path_payment(self, path):
+        """
+        Payment details executing a sized cycle as one path payment to self
+
+        trade_size of the first asset is sent through the cycle's
+        intermediate assets back to the account. The minimum received is the
+        break-even amount, so a market that moved fails the operation
+        instead of executing at a loss. Arbitrage decays within ledgers, so
+        the payment bids 'high' urgency, with the fee capped by its
+        expected profit.
+
+        Returns:
+            dict: Details for TransactionExecutor.execute_path_payment, or
+                None if the path was not sized
+        """
+        if path.get('trade_size') is None:
+            return None
+        codes = path['path']
+        return {
+            'source_asset': codes[0],
+            'destination_asset': codes[-1],
+            'send_amount': path['trade_size'],
+            'destination': self.stellar_service.public_key,
+            'path_assets': codes[1:-1],
+            'dest_min': path['break_even'],
+            'expected_profit': path['expected_profit'],
+            'urgency': 'high'
+        }
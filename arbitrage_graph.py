@@ -0,0 +1,153 @@
+import numpy as np
+from services.logging_service import logging_service
+from config.config import Config
+from models.etf_assetlist import dynamic_asset_manager
+
+class ArbitrageGraph:
+    """
+    Exchange-rate graph over the enabled ETF assets.
+
+    Edges are executable rates only (top of book or marginal pool rate),
+    stored as negative log rates in a dense NumPy matrix so that a
+    profitable cycle (product of rates > 1) shows up as a negative cycle,
+    which a batched Bellman-Ford pass can detect for all vertices at once.
+    """
+
+    def __init__(self, asset_codes=None, max_hops=Config.ARBITRAGE_MAX_HOPS):
+        self.max_hops = max_hops
+        if asset_codes is None:
+            asset_codes = [asset['asset_code'] for asset in dynamic_asset_manager.get_enabled_assets()]
+        self.reset_assets(asset_codes)
+
+    def reset_assets(self, asset_codes):
+        """Rebuild the vertex set, dropping all known rates"""
+        self.asset_codes = list(asset_codes)
+        self.index = {code: i for i, code in enumerate(self.asset_codes)}
+        size = len(self.asset_codes)
+        self.weights = np.full((size, size), np.inf)
+        np.fill_diagonal(self.weights, 0.0)
+
+    def update_rate(self, source_asset, target_asset, rate):
+        """
+        Set the conversion rate for a single edge
+
+        Args:
+            source_asset (str): Asset code being sold
+            target_asset (str): Asset code being bought
+            rate (float): Units of target received per unit of source
+        """
+        i = self.index.get(source_asset)
+        j = self.index.get(target_asset)
+        if i is None or j is None or i == j:
+            return
+        self.weights[i, j] = -np.log(rate) if rate > 0 else np.inf
+
+    def update_rates(self, rates):
+        """
+        Replace every edge with the given executable rates
+
+        Pairs without a rate have no edge. Reference prices are never used
+        here: rates derived from one common-quote price vector multiply to
+        exactly 1 around any cycle, so they can only hide real opportunities
+        or fabricate them when mixed with executable rates.
+
+        Args:
+            rates (dict): (source_code, target_code) -> units of target per unit of source
+        """
+        size = len(self.asset_codes)
+        self.weights = np.full((size, size), np.inf)
+        np.fill_diagonal(self.weights, 0.0)
+        for (source_asset, target_asset), rate in rates.items():
+            self.update_rate(source_asset, target_asset, rate)
+
+    def find_negative_cycles(self, threshold=Config.ARBITRAGE_THRESHOLD):
+        """
+        Detect profitable cycles with a batched Bellman-Ford relaxation
+
+        A virtual source connected to every vertex with zero cost lets a
+        single distance vector cover all start points; each relaxation round
+        is one (n x n) matrix operation.
+
+        Args:
+            threshold (float): Minimum profit percentage to report
+
+        Returns:
+            list: Cycles sorted by descending profit_percentage
+        """
+        size = len(self.asset_codes)
+        if size < 2:
+            return []
+
+        weights = self.weights.copy()
+        np.fill_diagonal(weights, np.inf)
+
+        distance = np.zeros(size)
+        predecessor = np.full(size, -1, dtype=np.int64)
+        improved = np.zeros(size, dtype=bool)
+
+        for _ in range(size):
+            candidates = distance[:, None] + weights
+            best_source = np.argmin(candidates, axis=0)
+            best_distance = candidates[best_source, np.arange(size)]
+            improved = best_distance < distance - 1e-12
+            if not improved.any():
+                return []
+            distance = np.where(improved, best_distance, distance)
+            predecessor = np.where(improved, best_source, predecessor)
+
+        cycles = {}
+        for vertex in np.flatnonzero(improved):
+            cycle = self._extract_cycle(int(vertex), predecessor, size)
+            if not cycle or len(cycle) > self.max_hops:
+                continue
+            key = self._canonical(cycle)
+            if key in cycles:
+                continue
+            cycle_weight = sum(
+                weights[cycle[k], cycle[(k + 1) % len(cycle)]] for k in range(len(cycle))
+            )
+            profit_percentage = float(np.expm1(-cycle_weight) * 100)
+            if profit_percentage > threshold:
+                cycles[key] = self._build_path(cycle, profit_percentage)
+
+        ranked = sorted(cycles.values(), key=lambda p: p['profit_percentage'], reverse=True)
+        logging_service.debug("Negative-cycle scan over %d assets found %d cycles", size, len(ranked))
+        return ranked
+
+    def _extract_cycle(self, vertex, predecessor, size):
+        """Walk predecessors back into the cycle that contains or feeds vertex"""
+        for _ in range(size):
+            vertex = int(predecessor[vertex])
+            if vertex < 0:
+                return None
+
+        cycle = [vertex]
+        current = predecessor[vertex]
+        while current != vertex:
+            if current < 0 or len(cycle) > size:
+                return None
+            cycle.append(int(current))
+            current = predecessor[current]
+        cycle.reverse()
+        return cycle
+
+    @staticmethod
+    def _canonical(cycle):
+        """Rotate a cycle so that equal cycles share one key"""
+        start = cycle.index(min(cycle))
+        return tuple(cycle[start:] + cycle[:start])
+
+    def _build_path(self, cycle, profit_percentage):
+        """Convert a vertex cycle into an arbitrage path description"""
+        start = cycle.index(min(cycle))
+        ordered = cycle[start:] + cycle[:start]
+        codes = [self.asset_codes[i] for i in ordered]
+        return {
+            'source_asset': codes[0],
+            'target_asset': codes[1],
+            'path': codes + [codes[0]],
+            'hops': len(codes),
+            'profit_percentage': profit_percentage
+        }
+
+__all__ = ['ArbitrageGraph']
@@ -0,0 +1,101 @@
+import threading
+from types import MappingProxyType
+from stellar_sdk import Asset
+
+class AssetSnapshot:
+    """Immutable, versioned view of the asset universe"""
+
+    __slots__ = ('version', 'by_code', 'by_key', 'assets', 'enabled_codes', 'enabled_assets')
+
+    def __init__(self, version, records, assets):
+        self.version = version
+        self.by_code = MappingProxyType({r['asset_code']: r for r in records})
+        self.by_key = MappingProxyType({(r['asset_code'], r['issuer']): r for r in records})
+        self.assets = MappingProxyType(assets)
+        self.enabled_assets = tuple(r for r in records if r['enabled'])
+        self.enabled_codes = tuple(r['asset_code'] for r in self.enabled_assets)
+
+class AssetRegistry:
+    """
+    Indexed asset lookup with interned stellar_sdk Asset objects.
+
+    Writers (enable/disable, allocation changes) rebuild a new AssetSnapshot
+    under a lock and swap it in with a single reference assignment, so
+    readers always see a consistent snapshot without taking a lock.
+    """
+
+    def __init__(self, asset_list):
+        self._records = [dict(asset) for asset in asset_list]
+        self._interned = {}
+        self._write_lock = threading.Lock()
+        self._snapshot = None
+        self._publish(0)
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def get(self, asset_code):
+        """Return the read-only record for an asset code, or None"""
+        return self._snapshot.by_code.get(asset_code)
+
+    def get_by_key(self, asset_code, issuer):
+        """Return the read-only record for a (code, issuer) pair, or None"""
+        return self._snapshot.by_key.get((asset_code, issuer))
+
+    def get_asset(self, asset_code):
+        """Return the interned stellar_sdk Asset for an asset code, or None"""
+        if asset_code.upper() == 'XLM':
+            return self._snapshot.assets.get('XLM') or self._intern('XLM', 'native')
+        return self._snapshot.assets.get(asset_code)
+
+    def get_issuer(self, asset_code):
+        record = self.get(asset_code)
+        return record['issuer'] if record else None
+
+    def get_enabled_assets(self):
+        return self._snapshot.enabled_assets
+
+    def get_enabled_codes(self):
+        return self._snapshot.enabled_codes
+
+    def update(self, asset_code, **changes):
+        """
+        Apply field changes to one asset and publish a new snapshot
+
+        Returns:
+            bool: False if the asset code is unknown
+        """
+        with self._write_lock:
+            for index, record in enumerate(self._records):
+                if record['asset_code'] == asset_code:
+                    self._records[index] = dict(record, **changes)
+                    self._publish(self._snapshot.version + 1)
+                    return True
+            return False
+
+    def load(self, asset_list):
+        """Replace the whole asset universe and publish a new snapshot"""
+        with self._write_lock:
+            self._records = [dict(asset) for asset in asset_list]
+            self._publish(self._snapshot.version + 1)
+
+    def _intern(self, asset_code, issuer):
+        key = (asset_code, issuer)
+        asset = self._interned.get(key)
+        if asset is None:
+            asset = Asset.native() if issuer == 'native' else Asset(asset_code, issuer)
+            self._interned[key] = asset
+        return asset
+
+    def _publish(self, version):
+        """Build and swap in a new snapshot; caller must hold the write lock"""
+        records = [MappingProxyType(dict(record)) for record in self._records]
+        assets = {r['asset_code']: self._intern(r['asset_code'], r['issuer']) for r in records}
+        self._snapshot = AssetSnapshot(version, records, assets)
+
+__all__ = ['AssetSnapshot', 'AssetRegistry']
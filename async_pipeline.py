@@ -0,0 +1,124 @@
+import asyncio
+import threading
+from stellar_sdk import ServerAsync
+from stellar_sdk.client.aiohttp_client import AiohttpClient
+from services.market_data_service import market_data_service
+from services.logging_service import logging_service
+from services.metrics_service import metrics_service
+from config.config import Config
+
+class AsyncPipeline:
+    """
+    Asyncio execution core for Horizon I/O.
+
+    A dedicated event loop runs in a background thread and owns one
+    ServerAsync with a pooled aiohttp session, so independent Horizon calls
+    (account state, price feeds, path quotes) run concurrently. Synchronous
+    callers submit coroutines through run() and block only on the combined
+    result.
+    """
+
+    def __init__(self, stellar_service, horizon_url=Config.HORIZON_SERVER,
+                 timeout=Config.ASYNC_CALL_TIMEOUT):
+        self.stellar_service = stellar_service
+        self.horizon_url = horizon_url
+        self.timeout = timeout
+        self.server = None
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        """Start the background event loop on first use"""
+        with self._lock:
+            if self._loop is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._loop.run_forever, name="async-pipeline", daemon=True
+            )
+            self._thread.start()
+            logging_service.info("Async pipeline event loop started")
+
+    def run(self, coroutine, timeout=None):
+        """Run a coroutine on the pipeline loop and wait for its result"""
+        self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        return future.result(timeout or self.timeout)
+
+    def close(self):
+        """Close the Horizon session and stop the event loop"""
+        if self._loop is None:
+            return
+        if self.server is not None:
+            self.run(self.server.close())
+            self.server = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+        logging_service.info("Async pipeline event loop stopped")
+
+    async def _get_server(self):
+        """Create the ServerAsync inside the running loop"""
+        if self.server is None:
+            self.server = ServerAsync(horizon_url=self.horizon_url, client=AiohttpClient())
+        return self.server
+
+    async def fetch_account_details(self, account_id=None):
+        """Retrieve account sequence and balances (of the service's account by default)"""
+        server = await self._get_server()
+        with metrics_service.horizon_call('account'):
+            response = await server.accounts().account_id(account_id or self.stellar_service.public_key).call()
+        return {
+            'sequence': response['sequence'],
+            'balances': response['balances']
+        }
+
+    async def fetch_market_prices(self, assets=None):
+        """Retrieve reference prices without blocking the loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, market_data_service.get_current_prices, assets)
+
+    async def fetch_tick_state(self, account_id=None, assets=None):
+        """
+        Fetch account details and market prices concurrently
+
+        Args:
+            account_id (str): Account to load; a pipeline shared between
+                portfolios is asked for each portfolio's own account
+            assets (list): Asset codes to price; defaults to the enabled assets
+
+        Returns:
+            tuple: (account_details, market_prices)
+        """
+        return await asyncio.gather(
+            self.fetch_account_details(account_id),
+            self.fetch_market_prices(assets)
+        )
+
+    async def strict_send_paths(self, source_asset, source_amount, destination_asset):
+        """Query one strict-send path set"""
+        server = await self._get_server()
+        with metrics_service.horizon_call('strict_send_paths'):
+            return await server.strict_send_paths(
+                source_asset=source_asset,
+                source_amount=source_amount,
+                destination=[destination_asset]
+            ).call()
+
+    async def strict_send_paths_many(self, queries):
+        """
+        Run many strict-send path queries in parallel
+
+        Args:
+            queries (list): (source_asset, source_amount, destination_asset) tuples
+
+        Returns:
+            list: Horizon responses in query order; failed queries yield the exception
+        """
+        return await asyncio.gather(
+            *(self.strict_send_paths(*query) for query in queries),
+            return_exceptions=True
+        )
+
+__all__ = ['AsyncPipeline']
@@ -0,0 +1,167 @@
+"""
+Offline benchmark harness for the ETF bot.
+
+Starts a local MockHorizon, points the bot's configuration at it and drives
+ETFManager.execute_etf_strategy, ArbitrageEngine and TransactionExecutor end
+to end while the asset universe grows. Reports ticks/sec, per-stage latency
+from metrics_service, and allocations per tick from tracemalloc.
+
+Environment variables are set before any bot module is imported so that
+Config picks up the mock Horizon URL and a throwaway key; values from the
+.env file do not override them.
+
+Usage:
+    python -m benchmarks.benchmark --scales 16,50,100,250,500 --ticks 20 --latency 0.002
+"""
+import argparse
+import json
+import logging
+import os
+import time
+import tracemalloc
+from stellar_sdk import Keypair
+from benchmarks.mock_horizon import MockHorizon
+
+def build_universe(size, base_assets):
+    """Enabled base assets padded with synthetic ones, equally allocated"""
+    universe = [dict(asset) for asset in base_assets if asset['enabled']][:size]
+    index = 0
+    while len(universe) < size:
+        universe.append({
+            'asset_code': f'BN{index:04d}',
+            'issuer': Keypair.random().public_key,
+            'enabled': True,
+            'allocation': 0.0
+        })
+        index += 1
+    for asset in universe:
+        asset['allocation'] = 1.0 / size
+    return universe
+
+def configure_environment(horizon_url):
+    os.environ['STELLAR_HORIZON_SERVER'] = horizon_url
+    os.environ['STELLAR_SECRET_KEY'] = Keypair.random().secret
+    os.environ['METRICS_PORT'] = '0'
+    os.environ['LOG_ASYNC'] = 'true'
+
+def run_scale(size, mock, args):
+    from config.config import Config
+    from core.etf_manager import ETFManager
+    from models.etf_assetlist import ETF_ASSETLIST, asset_registry
+    from services.market_data_service import market_data_service, PriceSource
+    from services.metrics_service import metrics_service
+    from services.path_cache import path_cache
+    from services.stellar_service import stellar_service
+
+    class MockPriceSource(PriceSource):
+        def supported(self, assets):
+            return list(assets)
+
+        def fetch(self, assets, timeout):
+            response = self.session.get(f'{mock.url}/prices', timeout=timeout)
+            response.raise_for_status()
+            prices = response.json()
+            return {asset: prices[asset] for asset in assets if asset in prices}
+
+    universe = build_universe(size, args.base_assets)
+    mock.set_universe(universe)
+    ETF_ASSETLIST[:] = universe
+    asset_registry.load(universe)
+    market_data_service.price_sources = [MockPriceSource('mock_horizon')]
+    market_data_service.clear_cache()
+    path_cache.clear()
+    stellar_service.sequence_manager.invalidate()
+
+    manager = ETFManager(Config.NETWORK_PASSPHRASE, Config.HORIZON_SERVER)
+    manager.execute_etf_strategy()  # warm up sessions, loops and caches
+    metrics_service.reset()
+
+    submissions_before = mock.submissions
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        manager.execute_etf_strategy()
+    elapsed = time.perf_counter() - started
+
+    # Isolated component timings on the same universe
+    portfolio = manager.valuation_engine.get_composition()
+    with metrics_service.timer('bench_arbitrage'):
+        for _ in range(args.ticks):
+            manager.arbitrage_engine.find_profitable_paths(portfolio)
+    codes = [asset['asset_code'] for asset in universe]
+    for i in range(args.ticks):
+        path_cache.clear()
+        manager.transaction_executor.get_path_payment_min_amount(codes[i % size], codes[(i + 1) % size], '10')
+
+    # Allocation pass, kept separate because tracemalloc slows everything down
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+    for _ in range(args.alloc_ticks):
+        manager.execute_etf_strategy()
+    snapshot_after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated = sum(
+        stat.size_diff for stat in snapshot_after.compare_to(snapshot_before, 'filename') if stat.size_diff > 0
+    )
+
+    return {
+        'assets': size,
+        'ticks': args.ticks,
+        'ticks_per_sec': args.ticks / elapsed if elapsed else 0.0,
+        'submissions': mock.submissions - submissions_before,
+        'stages': metrics_service.summary(),
+        'alloc_peak_kb': peak / 1024,
+        'alloc_retained_kb_per_tick': allocated / 1024 / max(args.alloc_ticks, 1)
+    }
+
+def print_result(result):
+    print(f"\n== {result['assets']} assets: {result['ticks_per_sec']:.2f} ticks/sec, "
+          f"{result['submissions']} submissions, peak alloc {result['alloc_peak_kb']:.0f} KiB, "
+          f"retained {result['alloc_retained_kb_per_tick']:.1f} KiB/tick")
+    print(f"{'stage':<22}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage, summary in sorted(result['stages'].items()):
+        print(f"{stage:<22}{summary['count']:>8}{summary['p50'] * 1000:>10.3f}"
+              f"{summary['p99'] * 1000:>10.3f}{summary['max'] * 1000:>10.3f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline ETF bot benchmark against a mock Horizon")
+    parser.add_argument('--scales', default='16,50,100,250,500')
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--alloc-ticks', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.0, help='Mock Horizon latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random latency in seconds')
+    parser.add_argument('--book-levels', type=int, default=20)
+    parser.add_argument('--path-records', type=int, default=5)
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args(argv)
+
+    from models.etf_assetlist import ETF_ASSETLIST
+    args.base_assets = [dict(asset) for asset in ETF_ASSETLIST]
+
+    mock = MockHorizon(
+        build_universe(16, args.base_assets), latency=args.latency, jitter=args.jitter,
+        book_levels=args.book_levels, path_records=args.path_records
+    ).start()
+    configure_environment(mock.url)
+
+    # Importing the config applies logging settings, so quieten afterwards
+    from config.config import Config
+    from services.logging_service import logging_service
+    logging_service.logger.setLevel(logging.WARNING)
+
+    results = []
+    try:
+        for size in (int(scale) for scale in args.scales.split(',')):
+            result = run_scale(size, mock, args)
+            print_result(result)
+            results.append(result)
+    finally:
+        mock.stop()
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+    return results
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Build+sign microbenchmark for path payment transactions.
+
+Times TransactionBuilder against the cached TransactionTemplates for the
+transaction shapes the executor submits: single legs, multi-operation
+rebalance batches, and channel transactions signed by two keys. Before
+timing, every shape is built both ways with the same sequence number and
+time bounds and the base64 envelopes are checked to be identical.
+
+No network access or bot configuration is needed; accounts and assets are
+random.
+
+Usage:
+    python -m benchmarks.build_sign_bench --iterations 2000 --ops 1,10,100
+"""
+import argparse
+import json
+import random
+import time
+from stellar_sdk import Account, Asset, Keypair, Network, PathPaymentStrictSend, TransactionBuilder
+from services.transaction_templates import TransactionTemplates
+from models.stroop_amount import format_stroops
+
+BASE_FEE = 100
+TIMEOUT = 30
+
+def make_legs(count, assets, destination, source=None):
+    """Random path payment legs as (send_asset, send, dest_asset, dest_min, path, source)"""
+    legs = []
+    for _ in range(count):
+        send_asset, dest_asset, hop = random.sample(assets, 3)
+        send = random.randint(1, 10 ** 11)
+        legs.append((send_asset, format_stroops(send), dest_asset, format_stroops(send * 97 // 100),
+                     [hop] if random.random() < 0.5 else [], destination, source))
+    return legs
+
+def build_with_sdk(keypair, sequence, legs, max_time, co_signers=()):
+    builder = TransactionBuilder(
+        source_account=Account(keypair.public_key, sequence - 1),
+        network_passphrase=Network.TESTNET_NETWORK_PASSPHRASE,
+        base_fee=BASE_FEE
+    )
+    for send_asset, send, dest_asset, dest_min, path, destination, source in legs:
+        builder.append_operation(PathPaymentStrictSend(
+            destination=destination, send_asset=send_asset, send_amount=send,
+            dest_asset=dest_asset, dest_min=dest_min, path=path, source=source
+        ))
+    transaction = builder.add_time_bounds(0, max_time).build()
+    transaction.sign(keypair)
+    for signer in co_signers:
+        transaction.sign(signer)
+    return transaction.to_xdr()
+
+def build_with_templates(templates, keypair, sequence, legs, max_time, co_signers=()):
+    operations = [
+        templates.path_payment(send_asset, send, destination, dest_asset, dest_min, path, source=source)
+        for send_asset, send, dest_asset, dest_min, path, destination, source in legs
+    ]
+    envelope, _ = templates.build(keypair, sequence, operations, co_signers=co_signers, max_time=max_time)
+    return envelope
+
+def time_per_tx(build, iterations):
+    started = time.perf_counter()
+    for sequence in range(iterations):
+        build(sequence + 1)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+def run_shape(name, ops, iterations, assets, channel):
+    main_key = Keypair.random()
+    destination = main_key.public_key
+    if channel:
+        source_key, co_signers, op_source = Keypair.random(), (main_key,), main_key.public_key
+    else:
+        source_key, co_signers, op_source = main_key, (), None
+    legs = make_legs(ops, assets, destination, op_source)
+    templates = TransactionTemplates(Network.TESTNET_NETWORK_PASSPHRASE, BASE_FEE, timeout=TIMEOUT)
+    max_time = int(time.time()) + TIMEOUT
+
+    expected = build_with_sdk(source_key, 4242, legs, max_time, co_signers)
+    actual = build_with_templates(templates, source_key, 4242, legs, max_time, co_signers)
+    if expected != actual:
+        raise AssertionError(f"{name}: template envelope differs from TransactionBuilder")
+
+    sdk_us = time_per_tx(lambda seq: build_with_sdk(source_key, seq, legs, max_time, co_signers), iterations)
+    template_us = time_per_tx(
+        lambda seq: build_with_templates(templates, source_key, seq, legs, max_time, co_signers), iterations
+    )
+    return {
+        'shape': name,
+        'operations': ops,
+        'iterations': iterations,
+        'builder_us_per_tx': sdk_us,
+        'template_us_per_tx': template_us,
+        'speedup': sdk_us / template_us
+    }
+
+def print_result(result):
+    print(f"{result['shape']:<14}{result['operations']:>5}{result['builder_us_per_tx']:>14.1f}"
+          f"{result['template_us_per_tx']:>14.1f}{result['speedup']:>9.1f}x")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build+sign microseconds per transaction")
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--ops', default='1,10,100', help='Operations per transaction to test')
+    parser.add_argument('--assets', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    assets = [Asset.native()] + [
+        Asset(f'BS{index:04d}', Keypair.random().public_key) for index in range(args.assets - 1)
+    ]
+
+    print(f"{'shape':<14}{'ops':>5}{'builder us':>14}{'template us':>14}{'speedup':>10}")
+    results = []
+    for ops in (int(count) for count in args.ops.split(',')):
+        for name, channel in (('main', False), ('channel', True)):
+            iterations = max(args.iterations // ops, 10)
+            result = run_shape(name, ops, iterations, assets, channel)
+            print_result(result)
+            results.append(result)
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+    return results
+
+if __name__ == '__main__':
+    main()
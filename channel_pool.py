@@ -0,0 +1,136 @@
+import queue
+import threading
+import time
+from stellar_sdk import Keypair
+from stellar_sdk.exceptions import ConnectionError as HorizonConnectionError
+from services.logging_service import logging_service
+from services.sequence_manager import SequenceManager
+from config.config import Config
+
+# Result codes that point at the channel account rather than the market
+CHANNEL_FAULT_CODES = ('tx_bad_seq', 'tx_insufficient_balance', 'tx_no_account', 'tx_bad_auth')
+
+class ChannelAccount:
+    """A funded account used only as transaction source (fee and sequence)"""
+
+    def __init__(self, server, secret_key):
+        self.keypair = Keypair.from_secret(secret_key)
+        self.public_key = self.keypair.public_key
+        self.sequence_manager = SequenceManager(server, self.public_key)
+        self.consecutive_failures = 0
+        self.quarantined_until = 0.0
+
+class ChannelPool:
+    """
+    Checkout/return pool of channel accounts.
+
+    Each in-flight transaction holds one channel, so independent
+    transactions get independent sequence numbers and can be submitted in
+    parallel. Channels that keep faulting (bad sequence, unfunded,
+    transport errors) are quarantined for a while instead of being handed
+    out again; legs that fail on the market (tx_failed) do not count.
+    """
+
+    def __init__(self, server, secret_keys=Config.CHANNEL_SECRET_KEYS,
+                 max_failures=Config.CHANNEL_MAX_FAILURES,
+                 quarantine_seconds=Config.CHANNEL_QUARANTINE_SECONDS):
+        self.max_failures = max_failures
+        self.quarantine_seconds = quarantine_seconds
+        self.channels = []
+        self._available = queue.Queue()
+        self._quarantined = []
+        self._lock = threading.Lock()
+
+        for secret_key in secret_keys:
+            try:
+                channel = ChannelAccount(server, secret_key)
+                self.channels.append(channel)
+                self._available.put(channel)
+            except Exception as e:
+                logging_service.error(f"Invalid channel account secret: {str(e)}")
+
+        if self.channels:
+            logging_service.info(f"Channel pool initialized with {len(self.channels)} accounts")
+
+    @property
+    def size(self):
+        return len(self.channels)
+
+    def checkout(self, timeout=None):
+        """
+        Take a channel out of the pool, waiting up to timeout seconds
+
+        Returns:
+            ChannelAccount: Channel reserved for the caller, or None on timeout
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            self._release_quarantined()
+            # Wake up when the next quarantine ends instead of waiting out the timeout
+            wait = self._next_release()
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.time())
+                wait = remaining if wait is None else min(wait, remaining)
+            try:
+                return self._available.get(timeout=wait)
+            except queue.Empty:
+                if deadline is not None and time.time() >= deadline:
+                    logging_service.warning("No channel account available before timeout")
+                    return None
+
+    def checkin(self, channel, error=None):
+        """
+        Return a channel to the pool, quarantining it after repeated faults
+
+        Args:
+            channel (ChannelAccount): Channel from checkout()
+            error (Exception): Why its transaction failed, None on success
+        """
+        if error is None or not self.is_channel_fault(error):
+            channel.consecutive_failures = 0
+            self._available.put(channel)
+            return
+
+        channel.consecutive_failures += 1
+        if channel.consecutive_failures >= self.max_failures:
+            channel.quarantined_until = time.time() + self.quarantine_seconds
+            channel.sequence_manager.invalidate()
+            with self._lock:
+                self._quarantined.append(channel)
+            logging_service.warning(
+                f"Channel {channel.public_key} quarantined for {self.quarantine_seconds}s "
+                f"after {channel.consecutive_failures} failures"
+            )
+        else:
+            self._available.put(channel)
+
+    @staticmethod
+    def is_channel_fault(error):
+        """Whether a failed submission says something about the channel itself"""
+        result_code = SequenceManager.get_transaction_result_code(error)
+        if result_code is not None:
+            return result_code in CHANNEL_FAULT_CODES
+        if isinstance(error, (HorizonConnectionError, ConnectionError)):
+            return True
+        status = getattr(error, 'status', None)
+        return status is not None and status >= 500
+
+    def _next_release(self):
+        """Seconds until the earliest quarantine ends, or None if none is quarantined"""
+        with self._lock:
+            if not self._quarantined:
+                return None
+            return max(0.0, min(c.quarantined_until for c in self._quarantined) - time.time())
+
+    def _release_quarantined(self):
+        """Put channels whose quarantine expired back into rotation"""
+        now = time.time()
+        with self._lock:
+            expired = [c for c in self._quarantined if c.quarantined_until <= now]
+            self._quarantined = [c for c in self._quarantined if c.quarantined_until > now]
+        for channel in expired:
+            channel.consecutive_failures = 0
+            self._available.put(channel)
+            logging_service.info(f"Channel {channel.public_key} released from quarantine")
+
+__all__ = ['ChannelAccount', 'ChannelPool']
@@ -1,7 +1,9 @@
+import json
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from models.etf_assetlist import DynamicAssetManager, ETF_ASSETLIST
+from models.etf_assetlist import DynamicAssetManager, ETF_ASSETLIST, asset_registry
+from services.logging_service import logging_service
 
 # Get the absolute path to the .env file
 env_path = Path(__file__).parent.parent / '.env'
@@ -28,16 +30,87 @@ class Config:
     if not SECRET_KEY:
         raise ValueError("STELLAR_SECRET_KEY must be set in .env file")
 
+    # Optional channel accounts (comma-separated secrets) for parallel submission
+    CHANNEL_SECRET_KEYS = [
+        key.strip() for key in os.getenv('STELLAR_CHANNEL_SECRET_KEYS', '').split(',')
+        if key.strip()
+    ]
+
     # Load Trading Configuration with defaults
     try:
         ARBITRAGE_THRESHOLD = float(os.getenv('ARBITRAGE_THRESHOLD', '0.005'))
         ALLOCATION_TOLERANCE = float(os.getenv('ALLOCATION_TOLERANCE', '0.02'))
         MAX_TRANSACTION_FEE = int(os.getenv('MAX_TRANSACTION_FEE', '100'))
+        ARBITRAGE_MAX_HOPS = int(os.getenv('ARBITRAGE_MAX_HOPS', '4'))
+        # Notionals (reference currency) at which opportunities are sized
+        ARBITRAGE_TRADE_SIZES = [
+            float(size) for size in os.getenv('ARBITRAGE_TRADE_SIZES', '10,25,50,100,250,500,1000,2500').split(',')
+            if size.strip()
+        ]
+        ORDER_BOOK_DEPTH = int(os.getenv('ORDER_BOOK_DEPTH', '20'))
+        ORDER_BOOK_MAX_AGE = float(os.getenv('ORDER_BOOK_MAX_AGE', '30'))
+        # Pairs beyond this many SSE streams are polled round-robin by one thread
+        ORDER_BOOK_MAX_STREAMS = int(os.getenv('ORDER_BOOK_MAX_STREAMS', '24'))
+        ORDER_BOOK_POLL_INTERVAL = float(os.getenv('ORDER_BOOK_POLL_INTERVAL', '10'))
+        LOCAL_PATHFINDING_ENABLED = os.getenv('LOCAL_PATHFINDING_ENABLED', 'true').lower() == 'true'
+        PATH_FINDER_MAX_HOPS = int(os.getenv('PATH_FINDER_MAX_HOPS', '3'))
+        # Pools reload on ledger close; these bound the wait without one and the search for new pools
+        LIQUIDITY_POOL_REFRESH = float(os.getenv('LIQUIDITY_POOL_REFRESH', '15'))
+        LIQUIDITY_POOL_DISCOVERY_INTERVAL = float(os.getenv('LIQUIDITY_POOL_DISCOVERY_INTERVAL', '300'))
+        REBALANCE_BATCH_ENABLED = os.getenv('REBALANCE_BATCH_ENABLED', 'true').lower() == 'true'
+        REBALANCE_BATCH_ATOMIC = os.getenv('REBALANCE_BATCH_ATOMIC', 'false').lower() == 'true'
+        REBALANCE_UNQUOTED_COST = float(os.getenv('REBALANCE_UNQUOTED_COST', '0.005'))
+        REBALANCE_DEPTH_PENALTY = float(os.getenv('REBALANCE_DEPTH_PENALTY', '0.01'))
+        FEE_ENGINE_ENABLED = os.getenv('FEE_ENGINE_ENABLED', 'true').lower() == 'true'
+        FEE_STATS_INTERVAL = float(os.getenv('FEE_STATS_INTERVAL', '5'))
+        FEE_STATS_MAX_AGE = float(os.getenv('FEE_STATS_MAX_AGE', '30'))
+        FEE_MAX_PER_OPERATION = int(os.getenv('FEE_MAX_PER_OPERATION', '100000'))
+        FEE_PROFIT_SHARE = float(os.getenv('FEE_PROFIT_SHARE', '0.5'))
+        FEE_BUMP_MULTIPLIER = int(os.getenv('FEE_BUMP_MULTIPLIER', '10'))
+        FEE_BUMP_MAX_ATTEMPTS = int(os.getenv('FEE_BUMP_MAX_ATTEMPTS', '2'))
+        SUBMIT_ASYNC_ENABLED = os.getenv('SUBMIT_ASYNC_ENABLED', 'false').lower() == 'true'
+        SUBMIT_MAX_IN_FLIGHT = int(os.getenv('SUBMIT_MAX_IN_FLIGHT', '16'))
+        SUBMIT_RESULT_TIMEOUT = float(os.getenv('SUBMIT_RESULT_TIMEOUT', '45'))
+        CHANNEL_MAX_FAILURES = int(os.getenv('CHANNEL_MAX_FAILURES', '3'))
+        CHANNEL_QUARANTINE_SECONDS = float(os.getenv('CHANNEL_QUARANTINE_SECONDS', '60'))
+        CHANNEL_CHECKOUT_TIMEOUT = float(os.getenv('CHANNEL_CHECKOUT_TIMEOUT', '10'))
+        ASYNC_CALL_TIMEOUT = float(os.getenv('ASYNC_CALL_TIMEOUT', '15'))
+        PATH_CACHE_TTL = float(os.getenv('PATH_CACHE_TTL', '5'))
+        PATH_CACHE_SIZE = int(os.getenv('PATH_CACHE_SIZE', '1024'))
+        PATH_CACHE_BUCKET_DIGITS = int(os.getenv('PATH_CACHE_BUCKET_DIGITS', '2'))
+        PRICE_CACHE_TTL = float(os.getenv('PRICE_CACHE_TTL', '2'))
+        PRICE_REQUEST_TIMEOUT = float(os.getenv('PRICE_REQUEST_TIMEOUT', '2'))
+        PRICE_HEDGE_DELAY = float(os.getenv('PRICE_HEDGE_DELAY', '0.5'))
+        PRICE_STALE_AFTER = float(os.getenv('PRICE_STALE_AFTER', '60'))
+        ACCOUNT_RESYNC_INTERVAL = float(os.getenv('ACCOUNT_RESYNC_INTERVAL', '300'))
+        SCHEDULER_TICK_DEADLINE = float(os.getenv('SCHEDULER_TICK_DEADLINE', '5'))
+        SCHEDULER_IDLE_TIMEOUT = float(os.getenv('SCHEDULER_IDLE_TIMEOUT', '30'))
+        SCHEDULER_ERROR_BACKOFF = float(os.getenv('SCHEDULER_ERROR_BACKOFF', '5'))
+        SCHEDULER_OVERRUN_POLICY = os.getenv('SCHEDULER_OVERRUN_POLICY', 'coalesce')
+        SCHEDULER_MARKET_TRIGGERS = os.getenv('SCHEDULER_MARKET_TRIGGERS', 'false').lower() == 'true'
+        METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
+        RECORDER_ENABLED = os.getenv('RECORDER_ENABLED', 'false').lower() == 'true'
+        RECORDER_OUTPUT_DIR = os.getenv('RECORDER_OUTPUT_DIR', 'recordings')
+        RECORDER_SEGMENT_LEDGERS = int(os.getenv('RECORDER_SEGMENT_LEDGERS', '720'))
+        MARKET_FEED_ROLE = os.getenv('MARKET_FEED_ROLE', '').lower()
+        MARKET_FEED_PATH = os.getenv('MARKET_FEED_PATH', '/dev/shm/stellar_etf_market_feed')
+        MARKET_FEED_CAPACITY = int(os.getenv('MARKET_FEED_CAPACITY', '65536'))
+        MARKET_FEED_DEPTH = int(os.getenv('MARKET_FEED_DEPTH', '5'))
+        MARKET_FEED_POLL_INTERVAL = float(os.getenv('MARKET_FEED_POLL_INTERVAL', '0.05'))
+        PORTFOLIOS_FILE = os.getenv('PORTFOLIOS_FILE', '')
+        PORTFOLIO_WORKERS = int(os.getenv('PORTFOLIO_WORKERS', '4'))
     except ValueError as e:
         raise ValueError(f"Invalid trading configuration in .env file: {str(e)}")
     
     # Load Logging Configuration
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_ASYNC = os.getenv('LOG_ASYNC', 'true').lower() == 'true'
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+    try:
+        LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+        LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+    except ValueError as e:
+        raise ValueError(f"Invalid logging configuration in .env file: {str(e)}")
 
     @classmethod
     def verify_env_variables(cls):
@@ -63,7 +136,25 @@ class Config:
         print(f"Arbitrage Threshold: {cls.ARBITRAGE_THRESHOLD}")
         print(f"Allocation Tolerance: {cls.ALLOCATION_TOLERANCE}")
         print(f"Max Transaction Fee: {cls.MAX_TRANSACTION_FEE}")
-        print(f"Log Level: {cls.LOG_LEVEL}")
+        print(f"Fee Engine: {cls.FEE_ENGINE_ENABLED} (cap {cls.FEE_MAX_PER_OPERATION}/op, "
+              f"profit share {cls.FEE_PROFIT_SHARE}, {cls.FEE_BUMP_MAX_ATTEMPTS} bumps)")
+        print(f"Arbitrage Max Hops: {cls.ARBITRAGE_MAX_HOPS}")
+        print(f"Arbitrage Trade Sizes: {cls.ARBITRAGE_TRADE_SIZES}")
+        print(f"Order Book Depth: {cls.ORDER_BOOK_DEPTH} (max {cls.ORDER_BOOK_MAX_STREAMS} streams, "
+              f"others polled every {cls.ORDER_BOOK_POLL_INTERVAL}s)")
+        print(f"Local Path Finding: {cls.LOCAL_PATHFINDING_ENABLED} (max {cls.PATH_FINDER_MAX_HOPS} hops, "
+              f"pools on ledger close or every {cls.LIQUIDITY_POOL_REFRESH}s, "
+              f"new pools every {cls.LIQUIDITY_POOL_DISCOVERY_INTERVAL}s)")
+        print(f"Batched Rebalance: {cls.REBALANCE_BATCH_ENABLED} (atomic: {cls.REBALANCE_BATCH_ATOMIC})")
+        print(f"Channel Accounts: {len(cls.CHANNEL_SECRET_KEYS)}")
+        print(f"Async Submission: {cls.SUBMIT_ASYNC_ENABLED} ({cls.SUBMIT_MAX_IN_FLIGHT} in flight)")
+        print(f"Path Cache: {cls.PATH_CACHE_SIZE} entries, TTL {cls.PATH_CACHE_TTL}s")
+        print(f"Price Feed: TTL {cls.PRICE_CACHE_TTL}s, timeout {cls.PRICE_REQUEST_TIMEOUT}s")
+        print(f"Scheduler: deadline {cls.SCHEDULER_TICK_DEADLINE}s, overrun policy {cls.SCHEDULER_OVERRUN_POLICY}")
+        print(f"Portfolios: {cls.PORTFOLIOS_FILE or 'single account'} ({cls.PORTFOLIO_WORKERS} workers)")
+        print(f"Market Feed: {cls.MARKET_FEED_ROLE or 'disabled'} ({cls.MARKET_FEED_PATH})")
+        print(f"Market Recorder: {cls.RECORDER_ENABLED} ({cls.RECORDER_OUTPUT_DIR})")
+        print(f"Log Level: {cls.LOG_LEVEL} ({cls.LOG_FORMAT}, async: {cls.LOG_ASYNC})")
         print("Secret Key: [SECURED]\n")
 
     @classmethod
@@ -75,6 +166,52 @@ class Config:
             for asset in enabled_assets
         }
 
+    @classmethod
+    def load_portfolios(cls, path=None):
+        """
+        Load portfolio definitions for multi-portfolio mode
+        
+        The file is a JSON list of objects with 'name', 'allocations'
+        (asset code -> weight) and either 'secret_key_env' (name of the
+        environment variable holding the secret) or 'secret_key'. Optional
+        keys: 'channel_secret_keys_env' (comma-separated secrets) and
+        'weight' (scheduling share, default 1).
+        """
+        path = path or cls.PORTFOLIOS_FILE
+        with open(path) as handle:
+            entries = json.load(handle)
+        
+        portfolios = []
+        names = set()
+        for entry in entries:
+            name = entry.get('name')
+            if not name or name in names:
+                raise ValueError(f"Portfolio names must be present and unique, got {name!r}")
+            names.add(name)
+            
+            secret_key = os.getenv(entry['secret_key_env']) if 'secret_key_env' in entry \
+                else entry.get('secret_key')
+            if not secret_key:
+                raise ValueError(f"No secret key configured for portfolio {name}")
+            
+            allocations = {code: float(weight) for code, weight in entry.get('allocations', {}).items()}
+            unknown = [code for code in allocations if asset_registry.get(code) is None]
+            if unknown:
+                raise ValueError(f"Portfolio {name} allocates unknown assets: {unknown}")
+            if abs(sum(allocations.values()) - 1.0) > 0.0001:
+                raise ValueError(f"Portfolio {name} allocation must equal 1.0, got {sum(allocations.values())}")
+            
+            channel_keys = os.getenv(entry.get('channel_secret_keys_env', ''), '') \
+                if entry.get('channel_secret_keys_env') else ''
+            portfolios.append({
+                'name': name,
+                'secret_key': secret_key,
+                'allocations': allocations,
+                'channel_secret_keys': [key.strip() for key in channel_keys.split(',') if key.strip()],
+                'weight': float(entry.get('weight', 1.0))
+            })
+        return portfolios
+
     @classmethod
     def validate_configuration(cls):
         """Validate the entire configuration"""
@@ -89,6 +226,43 @@ class Config:
                 raise ValueError("ALLOCATION_TOLERANCE must be greater than 0")
             if cls.MAX_TRANSACTION_FEE <= 0:
                 raise ValueError("MAX_TRANSACTION_FEE must be greater than 0")
+            if cls.FEE_MAX_PER_OPERATION < cls.MAX_TRANSACTION_FEE:
+                raise ValueError("FEE_MAX_PER_OPERATION must be at least MAX_TRANSACTION_FEE")
+            if not 0 < cls.FEE_PROFIT_SHARE <= 1:
+                raise ValueError("FEE_PROFIT_SHARE must be in (0, 1]")
+            if cls.FEE_BUMP_MULTIPLIER < 10:
+                raise ValueError("FEE_BUMP_MULTIPLIER must be at least 10 to replace a queued transaction")
+            if cls.SUBMIT_MAX_IN_FLIGHT <= 0:
+                raise ValueError("SUBMIT_MAX_IN_FLIGHT must be greater than 0")
+            if cls.SUBMIT_RESULT_TIMEOUT <= 30:
+                raise ValueError("SUBMIT_RESULT_TIMEOUT must exceed the 30s transaction time bound")
+            # A cycle of n assets is one path payment with n - 1 intermediate assets, at most 5
+            if not 2 <= cls.ARBITRAGE_MAX_HOPS <= 6:
+                raise ValueError("ARBITRAGE_MAX_HOPS must be between 2 and 6")
+            if not cls.ARBITRAGE_TRADE_SIZES or min(cls.ARBITRAGE_TRADE_SIZES) <= 0:
+                raise ValueError("ARBITRAGE_TRADE_SIZES must be a list of positive notionals")
+            if cls.ORDER_BOOK_DEPTH <= 0:
+                raise ValueError("ORDER_BOOK_DEPTH must be greater than 0")
+            if cls.ORDER_BOOK_MAX_STREAMS < 0:
+                raise ValueError("ORDER_BOOK_MAX_STREAMS must not be negative")
+            if not 0 < cls.ORDER_BOOK_POLL_INTERVAL < cls.ORDER_BOOK_MAX_AGE:
+                raise ValueError("ORDER_BOOK_POLL_INTERVAL must be positive and below ORDER_BOOK_MAX_AGE")
+            if not 0 < cls.LIQUIDITY_POOL_REFRESH < cls.ORDER_BOOK_MAX_AGE:
+                raise ValueError("LIQUIDITY_POOL_REFRESH must be positive and below ORDER_BOOK_MAX_AGE")
+            if cls.LIQUIDITY_POOL_DISCOVERY_INTERVAL <= 0:
+                raise ValueError("LIQUIDITY_POOL_DISCOVERY_INTERVAL must be positive")
+            if not 0 <= cls.PATH_FINDER_MAX_HOPS <= 5:
+                raise ValueError("PATH_FINDER_MAX_HOPS must be between 0 and 5")
+            if cls.PRICE_REQUEST_TIMEOUT <= 0:
+                raise ValueError("PRICE_REQUEST_TIMEOUT must be greater than 0")
+            if cls.SCHEDULER_OVERRUN_POLICY not in ('coalesce', 'skip'):
+                raise ValueError("SCHEDULER_OVERRUN_POLICY must be 'coalesce' or 'skip'")
+            if cls.MARKET_FEED_ROLE not in ('', 'writer', 'reader'):
+                raise ValueError("MARKET_FEED_ROLE must be empty, 'writer' or 'reader'")
+            if cls.PORTFOLIO_WORKERS <= 0:
+                raise ValueError("PORTFOLIO_WORKERS must be greater than 0")
+            if cls.LOG_FORMAT not in ('text', 'jsonl'):
+                raise ValueError("LOG_FORMAT must be 'text' or 'jsonl'")
             
             # Validate ETF asset list
             if not cls.ETF_ASSETLIST:
@@ -113,5 +287,14 @@ dynamic_asset_manager = DynamicAssetManager()
 config = Config()
 config.validate_configuration()
 
+# Apply logging settings now that the environment is loaded
+logging_service.configure(
+    level=Config.LOG_LEVEL,
+    async_mode=Config.LOG_ASYNC,
+    log_format=Config.LOG_FORMAT,
+    max_bytes=Config.LOG_MAX_BYTES,
+    backup_count=Config.LOG_BACKUP_COUNT
+)
+
 # Export configuration
 __all__ = ['Config', 'config']
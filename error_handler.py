@@ -14,12 +14,12 @@ def handle_transaction_error(error, info=None):
         'additional_info': info
     }
     
-    logging_service.error(f"Transaction Error: {error_info}")
+    logging_service.error("Transaction Error: %s", error_info, **error_info)
     
     if hasattr(error, 'response') and error.response:
         try:
             response_data = error.response.json()
-            logging_service.error("Stellar API Error Details", str(response_data))
+            logging_service.error("Stellar API Error Details: %s", response_data)
         except:
             pass
 
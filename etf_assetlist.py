@@ -1,5 +1,6 @@
 from stellar_sdk import Asset
 from services.logging_service import logging_service
+from models.asset_registry import AssetRegistry
 
 ETF_ASSETLIST = [
     {"asset_code": "XLM", "issuer": "native", "enabled": True, "allocation": 0.2},
@@ -25,53 +26,58 @@ ETF_ASSETLIST = [
 # Add more trade listed assets here
 ]
 
+# Indexed, snapshot-based view of the asset list
+asset_registry = AssetRegistry(ETF_ASSETLIST)
+
 class DynamicAssetManager:
     def __init__(self):
         self.etf_assetlist = ETF_ASSETLIST
+        self.registry = asset_registry
         self.logger = logging_service
         self.logger.info("Dynamic Asset Manager initialized")
 
-    def enable_asset(self, asset_code):
-        """Enable an asset by its code."""
+    def _set_enabled(self, asset_code, status):
+        """Publish a new registry snapshot and keep ETF_ASSETLIST in step"""
+        if not self.registry.update(asset_code, enabled=status):
+            return False
         for asset in self.etf_assetlist:
             if asset["asset_code"] == asset_code:
-                asset["enabled"] = True
-                self.logger.info(f"Asset {asset_code} has been enabled.")
-                return
+                asset["enabled"] = status
+                break
+        return True
+
+    def enable_asset(self, asset_code):
+        """Enable an asset by its code."""
+        if self._set_enabled(asset_code, True):
+            self.logger.info(f"Asset {asset_code} has been enabled.")
+            return
         self.logger.warning(f"Asset {asset_code} not found in the trade asset list.")
 
     def disable_asset(self, asset_code):
         """Disable an asset by its code."""
-        for asset in self.etf_assetlist:
-            if asset["asset_code"] == asset_code:
-                asset["enabled"] = False
-                self.logger.info(f"Asset {asset_code} has been disabled.")
-                return
+        if self._set_enabled(asset_code, False):
+            self.logger.info(f"Asset {asset_code} has been disabled.")
+            return
         self.logger.warning(f"Asset {asset_code} not found in the trade asset list.")
 
     def get_enabled_assets(self):
         """Retrieve the list of currently enabled assets."""
-        enabled_assets = [asset for asset in self.etf_assetlist if asset["enabled"]]
-        self.logger.debug(f"Enabled assets: {[asset['asset_code'] for asset in enabled_assets]}")
-        return enabled_assets
+        snapshot = self.registry.snapshot
+        self.logger.debug("Enabled assets: %s", snapshot.enabled_codes)
+        return list(snapshot.enabled_assets)
 
     def update_asset_status(self, asset_code, status):
         """Update the enabled status of an asset dynamically."""
-        for asset in self.etf_assetlist:
-            if asset["asset_code"] == asset_code:
-                asset["enabled"] = status
-                action = "enabled" if status else "disabled"
-                self.logger.info(f"Asset {asset_code} has been {action}.")
-                return
+        if self._set_enabled(asset_code, status):
+            action = "enabled" if status else "disabled"
+            self.logger.info(f"Asset {asset_code} has been {action}.")
+            return
         self.logger.warning(f"Asset {asset_code} not found in the trade asset list.")
 
     def get_asset_allocation(self, asset_code):
         """Retrieve allocation for a specific asset."""
-        for asset in self.etf_assetlist:
-            if asset["asset_code"] == asset_code:
-                return asset["allocation"]
-        return 0.0
+        asset = self.registry.get(asset_code)
+        return asset["allocation"] if asset else 0.0
 
 # Singleton instance for easy access
 dynamic_asset_manager = DynamicAssetManager()
-
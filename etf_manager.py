@@ -1,104 +1,167 @@
-from decimal import Decimal
+import numpy as np
 from services.stellar_service import stellar_service
 from services.market_data_service import market_data_service
+from services.order_book_service import order_book_service
 from core.arbitrage_engine import ArbitrageEngine
 from core.transaction_executor import TransactionExecutor
+from core.valuation_engine import ValuationEngine
+from core.rebalance_planner import RebalancePlanner
 from utils.error_handler import handle_transaction_error
 from services.logging_service import logging_service
+from services.metrics_service import metrics_service
+from services.market_recorder import market_recorder
 from config.config import Config
 
 class ETFManager:
-    def __init__(self, network_passphrase, server_endpoint):
-        self.stellar_network = stellar_service
+    def __init__(self, network_passphrase, server_endpoint, stellar_network=None,
+                 target_allocations=None, async_pipeline=None):
+        """
+        Args:
+            stellar_network (StellarService): Account to manage; defaults to
+                the configured stellar_service
+            target_allocations (dict): Asset code -> weight; defaults to the
+                enabled ETF asset list
+            async_pipeline (AsyncPipeline): Pipeline shared with other managers
+        """
+        self.stellar_network = stellar_network or stellar_service
+        self.order_book_service = order_book_service
         self.arbitrage_engine = ArbitrageEngine(self.stellar_network)
-        self.transaction_executor = TransactionExecutor(self.stellar_network)
-        self.target_allocations = Config.get_asset_allocations()
+        self.transaction_executor = TransactionExecutor(self.stellar_network, async_pipeline)
+        self.async_pipeline = self.transaction_executor.async_pipeline
+        self.target_allocations = target_allocations or Config.get_asset_allocations()
+        self.valuation_engine = ValuationEngine(self.target_allocations)
+        self.rebalance_planner = RebalancePlanner(self.order_book_service)
+        # Pipelined rebalance transactions not yet reflected in the balances
+        self._in_flight = []
+        self._settled_ledger = 0
+        
+        # Keep valuation current as fills arrive between ticks
+        self.stellar_network.account_tracker.add_listener(
+            lambda asset_code, balance, effect: self.valuation_engine.update_balance(asset_code, balance)
+        )
+
+    def _update_valuation(self, account_details, market_prices):
+        """Load the tick's balances and prices into the valuation engine"""
+        self.valuation_engine.set_balances_from_account(account_details['balances'])
+        self.valuation_engine.set_prices(market_prices)
 
-    def _analyze_allocation_drift(self, current_portfolio):
-        """Detect portfolio allocation deviations"""
+    def _analyze_allocation_drift(self, analysis):
+        """Detect portfolio allocation deviations from a valuation analysis"""
         discrepancies = {}
-        for asset, target_percentage in self.target_allocations.items():
-            try:
-                current = Decimal(str(current_portfolio.get(asset, '0')))
-                target = Decimal(str(target_percentage))
-                
-                if abs(current - target) > Decimal(str(Config.ALLOCATION_TOLERANCE)):
-                    discrepancies[asset] = {
-                        'current': str(current),
-                        'target': str(target),
-                        'difference': str(abs(current - target)),
-                        'direction': 'increase' if current < target else 'decrease'
-                    }
-                    logging_service.info(
-                        f"Drift detected for {asset}: "
-                        f"current={current:.7f}, target={target:.7f}, "
-                        f"difference={abs(current - target):.7f}"
-                    )
-            except Exception as e:
-                logging_service.error(f"Error analyzing drift for {asset}: {str(e)}")
-                continue
+        for i in np.flatnonzero(analysis['flagged']):
+            asset = self.valuation_engine.asset_codes[i]
+            current = float(analysis['weights'][i])
+            target = float(analysis['targets'][i])
+            difference = abs(float(analysis['drift'][i]))
+            discrepancies[asset] = {
+                'current': str(current),
+                'target': str(target),
+                'difference': str(difference),
+                'direction': 'increase' if current < target else 'decrease'
+            }
+            logging_service.info(
+                "Drift detected for %s: current=%.7f, target=%.7f, difference=%.7f",
+                asset, current, target, difference
+            )
                 
         return discrepancies
 
-    def _calculate_rebalance_pairs(self, current_portfolio):
-        """Calculate which assets need rebalancing and pair them for path payments"""
-        over_allocated = []
-        under_allocated = []
+    def _calculate_rebalance_pairs(self, analysis):
+        """Plan the cheapest set of path payments that clears the flagged drift"""
+        plan = self.rebalance_planner.plan(
+            self.valuation_engine.asset_codes,
+            analysis['drift'],
+            analysis['flagged'],
+            self.valuation_engine.prices,
+            analysis['total_value']
+        )
+        for leg in plan.legs:
+            logging_service.info(
+                "Created rebalance pair: %s -> %s, amount: %s (est. cost %.6f)",
+                leg['source_asset'], leg['destination_asset'], leg['amount'], leg['cost']
+            )
+        return plan.legs
+
+    def _build_path_payment(self, pair):
+        """Convert a rebalance pair into path payment details"""
+        return {
+            'source_asset': pair['source_asset'],
+            'destination_asset': pair['destination_asset'],
+            'send_amount': pair['amount'],
+            'destination': self.stellar_network.public_key
+        }
+
+    def _execute_rebalance_batch(self, rebalance_pairs):
+        """Submit all rebalance legs as multi-operation transactions"""
+        if not rebalance_pairs:
+            return
         
-        for asset, target in self.target_allocations.items():
-            current = Decimal(str(current_portfolio.get(asset, '0')))
-            target = Decimal(str(target))
-            difference = current - target
+        logging_service.info(f"Attempting batched rebalance of {len(rebalance_pairs)} legs")
+        try:
+            responses = self.transaction_executor.execute_path_payments_batch(
+                [self._build_path_payment(pair) for pair in rebalance_pairs],
+                atomic=Config.REBALANCE_BATCH_ATOMIC
+            )
+            logging_service.info(
+                f"Batched rebalance completed with {len(responses)} transactions"
+            )
+        except Exception as e:
+            logging_service.error(f"Batched rebalance failed: {str(e)}")
+
+    def _rebalance_in_flight(self):
+        """
+        Whether pipelined legs from an earlier tick are not yet in the balances
+
+        Legs are outstanding until their transactions settle, and then until
+        the account tracker has applied the ledger of the last successful one;
+        planning before that would submit the same rebalance again.
+        """
+        outstanding = []
+        for future in self._in_flight:
+            if not future.done():
+                outstanding.append(future)
+            elif future.exception() is None:
+                self._settled_ledger = max(self._settled_ledger, int(future.result().get('ledger') or 0))
+        self._in_flight = outstanding
+        if outstanding:
+            return True
+        tracker = self.stellar_network.account_tracker
+        return tracker.is_ready and tracker.applied_ledger < self._settled_ledger
+
+    def _rebalance_portfolio(self, discrepancies, analysis=None):
+        """Execute portfolio rebalancing using path payments"""
+        try:
+            if Config.SUBMIT_ASYNC_ENABLED and self._rebalance_in_flight():
+                logging_service.info(
+                    f"Previous rebalance still settling ({len(self._in_flight)} transactions), skipping"
+                )
+                return
+
+            if analysis is None:
+                analysis = self.valuation_engine.analyze()
+            rebalance_pairs = self._calculate_rebalance_pairs(analysis)
             
-            if abs(difference) > Decimal(str(Config.ALLOCATION_TOLERANCE)):
-                if difference > 0:
-                    over_allocated.append((asset, difference))
-                    logging_service.info(f"Over-allocated: {asset} by {difference:.7f}")
-                else:
-                    under_allocated.append((asset, abs(difference)))
-                    logging_service.info(f"Under-allocated: {asset} by {abs(difference):.7f}")
-        
-        # Sort by size of deviation to handle largest imbalances first
-        over_allocated.sort(key=lambda x: x[1], reverse=True)
-        under_allocated.sort(key=lambda x: x[1], reverse=True)
-        
-        rebalance_pairs = []
-        while over_allocated and under_allocated:
-            source_asset, source_excess = over_allocated[0]
-            dest_asset, dest_deficit = under_allocated[0]
+            if Config.SUBMIT_ASYNC_ENABLED:
+                # Legs settle in the background; the tick does not wait for ledgers
+                futures = self.transaction_executor.execute_path_payments_pipelined(
+                    [self._build_path_payment(pair) for pair in rebalance_pairs]
+                )
+                self._in_flight.extend(futures)
+                logging_service.info(f"Pipelined rebalance queued {len(futures)} transactions")
+                return
             
-            # Determine amount to transfer (as a percentage)
-            amount = min(source_excess, dest_deficit)
+            if Config.REBALANCE_BATCH_ENABLED:
+                self._execute_rebalance_batch(rebalance_pairs)
+                return
             
-            if amount >= Decimal('0.0000001'):  # Stellar's minimum amount
-                rebalance_pairs.append({
-                    'source_asset': source_asset,
-                    'destination_asset': dest_asset,
-                    'amount': str(amount),
-                    'source_pct': str(source_excess),
-                    'dest_pct': str(dest_deficit)
-                })
-                
+            if self.stellar_network.channel_pool.size:
+                responses = self.transaction_executor.execute_path_payments_concurrent(
+                    [self._build_path_payment(pair) for pair in rebalance_pairs]
+                )
                 logging_service.info(
-                    f"Created rebalance pair: {source_asset} -> {dest_asset}, "
-                    f"amount: {amount:.7f}"
+                    f"Concurrent rebalance completed: {len(responses)}/{len(rebalance_pairs)} legs"
                 )
-            
-            # Update remaining imbalances
-            if source_excess > dest_deficit:
-                over_allocated[0] = (source_asset, source_excess - dest_deficit)
-                under_allocated.pop(0)
-            else:
-                under_allocated[0] = (dest_asset, dest_deficit - source_excess)
-                over_allocated.pop(0)
-                
-        return rebalance_pairs
-
-    def _rebalance_portfolio(self, discrepancies):
-        """Execute portfolio rebalancing using path payments"""
-        try:
-            current_portfolio = self.stellar_network.get_portfolio_composition()
-            rebalance_pairs = self._calculate_rebalance_pairs(current_portfolio)
+                return
             
             for pair in rebalance_pairs:
                 try:
@@ -108,16 +171,10 @@ class ETFManager:
                         f"{pair['destination_asset']} ({pair['dest_pct']}%)"
                     )
                     
-                    # Create path payment
-                    path_payment = {
-                        'source_asset': pair['source_asset'],
-                        'destination_asset': pair['destination_asset'],
-                        'send_amount': pair['amount'],
-                        'destination': self.stellar_network.public_key
-                    }
-                    
                     # Execute the path payment
-                    result = self.transaction_executor.execute_path_payment(path_payment)
+                    result = self.transaction_executor.execute_path_payment(
+                        self._build_path_payment(pair)
+                    )
                     if result:
                         logging_service.info(
                             f"Successfully rebalanced {pair['amount']} from "
@@ -133,32 +190,55 @@ class ETFManager:
         except Exception as e:
             handle_transaction_error(e, "Portfolio Rebalancing")
 
+    @metrics_service.timed('tick')
     def execute_etf_strategy(self):
         """Core high-frequency ETF strategy execution"""
+        metrics_service.mark_tick_start()
         try:
-            # Current portfolio assessment
-            current_portfolio = self.stellar_network.get_portfolio_composition()
-            logging_service.info(f"Current portfolio composition: {current_portfolio}")
-            logging_service.info(f"Target allocations: {self.target_allocations}")
+            if self.stellar_network.account_tracker.is_ready:
+                # Balances are maintained locally from the effects stream
+                account_details = self.stellar_network.account_tracker.get_account_details()
+                market_prices = market_data_service.get_current_prices(list(self.target_allocations))
+            else:
+                # Fetch account state and market prices concurrently
+                account_details, market_prices = self.async_pipeline.run(
+                    self.async_pipeline.fetch_tick_state(
+                        self.stellar_network.public_key, list(self.target_allocations)
+                    )
+                )
+            market_recorder.record_account(account_details)
+            market_recorder.record_prices(market_prices)
+            
+            # Current portfolio assessment, weighted by market value
+            self._update_valuation(account_details, market_prices)
+            analysis = self.valuation_engine.analyze()
+            current_portfolio = self.valuation_engine.get_composition(analysis)
+            logging_service.info("Current portfolio composition: %s", current_portfolio)
+            logging_service.debug("Target allocations: %s", self.target_allocations)
             
             # Detect deviation from target allocation
-            allocation_discrepancies = self._analyze_allocation_drift(current_portfolio)
+            allocation_discrepancies = self._analyze_allocation_drift(analysis)
             
             if allocation_discrepancies:
-                logging_service.info(f"Detected allocation discrepancies: {allocation_discrepancies}")
-                self._rebalance_portfolio(allocation_discrepancies)
+                logging_service.info("Detected allocation discrepancies: %s", allocation_discrepancies)
+                self._rebalance_portfolio(allocation_discrepancies, analysis)
             else:
                 logging_service.info("Portfolio is within target allocations")
             
             # Identify arbitrage opportunities
             arbitrage_paths = self.arbitrage_engine.find_profitable_paths(
                 current_portfolio, 
-                threshold=Config.ARBITRAGE_THRESHOLD
+                threshold=Config.ARBITRAGE_THRESHOLD,
+                market_prices=market_prices
             )
             
-            # Execute transactions
+            # Execute sized cycles as path payments back to the account
             for path in arbitrage_paths:
-                self.transaction_executor.execute_path_payment(path)
+                payment = self.arbitrage_engine.to_path_payment(path)
+                if payment is None:
+                    logging_service.debug("Arbitrage path %s has no known liquidity, not executed", path['path'])
+                    continue
+                self.transaction_executor.execute_path_payment(payment)
             
         except Exception as e:
             handle_transaction_error(e, "ETF Strategy Execution")
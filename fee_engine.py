@@ -0,0 +1,171 @@
+import threading
+import time
+from services.logging_service import logging_service
+from services.stellar_service import stellar_service
+from services.metrics_service import metrics_service
+from services.sequence_manager import SequenceManager
+from models.stroop_amount import parse_stroops
+from config.config import Config
+
+# Network minimum base fee per operation, in stroops
+MIN_BASE_FEE = 100
+
+# Fee-charged percentile bid at each urgency level
+URGENCY_PERCENTILES = {
+    'low': 'p10',
+    'normal': 'p50',
+    'high': 'p90',
+    'critical': 'p99'
+}
+URGENCY_LEVELS = list(URGENCY_PERCENTILES)
+
+class FeeEngine:
+    """
+    Per-transaction fee pricing from live Horizon fee statistics.
+
+    A background thread polls fee_stats about once per ledger and caches
+    the fee-charged percentiles and capacity usage. fee_for() bids the
+    percentile matching a transaction's urgency, capped by a share of its
+    expected profit and by FEE_MAX_PER_OPERATION, and never below the last
+    ledger's base fee. Without fresh statistics it falls back to the static
+    MAX_TRANSACTION_FEE.
+
+    Submissions that time out waiting for a ledger, or are rejected with
+    tx_insufficient_fee, can be re-sent wrapped in a fee-bump transaction.
+    bump_fee() picks the new rate: at least FEE_BUMP_MULTIPLIER times the
+    old one (Stellar Core only replaces a queued transaction for a tenfold
+    fee) and at least the next urgency level's percentile.
+    """
+
+    def __init__(self, stellar_service=stellar_service, interval=Config.FEE_STATS_INTERVAL,
+                 max_age=Config.FEE_STATS_MAX_AGE, max_fee=Config.FEE_MAX_PER_OPERATION,
+                 profit_share=Config.FEE_PROFIT_SHARE, bump_multiplier=Config.FEE_BUMP_MULTIPLIER,
+                 default_fee=Config.MAX_TRANSACTION_FEE):
+        self.stellar_service = stellar_service
+        self.interval = interval
+        self.max_age = max_age
+        self.max_fee = max_fee
+        self.profit_share = profit_share
+        self.bump_multiplier = bump_multiplier
+        self.default_fee = default_fee
+        self.percentiles = {}
+        self.base_fee = MIN_BASE_FEE
+        self.capacity_usage = 0.0
+        self.last_ledger = None
+        self.updated_at = 0.0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def is_fresh(self):
+        return bool(self.percentiles) and time.time() - self.updated_at <= self.max_age
+
+    def start(self):
+        """Poll fee_stats in the background"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._poll, name="fee-stats", daemon=True)
+        self._thread.start()
+        logging_service.info(f"Fee engine started, polling fee_stats every {self.interval}s")
+
+    def stop(self):
+        self._stop_event.set()
+        logging_service.info("Fee engine stopped")
+
+    def _poll(self):
+        while not self._stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logging_service.warning(f"Fee stats refresh failed: {str(e)}")
+            self._stop_event.wait(self.interval)
+
+    def refresh(self):
+        """Fetch fee_stats from Horizon and replace the cached percentiles"""
+        with metrics_service.horizon_call('fee_stats'):
+            response = self.stellar_service.server.fee_stats().call()
+        self.apply_stats(response)
+
+    def apply_stats(self, response):
+        """Cache a Horizon fee_stats response"""
+        charged = response.get('fee_charged', {})
+        percentiles = {
+            key: int(value) for key, value in charged.items()
+            if key.startswith('p') or key in ('min', 'max', 'mode')
+        }
+        with self._lock:
+            self.percentiles = percentiles
+            self.base_fee = int(response.get('last_ledger_base_fee', MIN_BASE_FEE))
+            self.capacity_usage = float(response.get('ledger_capacity_usage', 0.0))
+            self.last_ledger = response.get('last_ledger')
+            self.updated_at = time.time()
+        logging_service.debug(
+            f"Fee stats at ledger {self.last_ledger}: base {self.base_fee}, "
+            f"p50 {percentiles.get('p50')}, p90 {percentiles.get('p90')}, "
+            f"capacity {self.capacity_usage:.2f}"
+        )
+
+    def _percentile_fee(self, urgency):
+        if urgency not in URGENCY_PERCENTILES:
+            raise ValueError(f"Unknown urgency {urgency!r}, expected one of {URGENCY_LEVELS}")
+        if not self.is_fresh:
+            return self.default_fee
+        return max(self.percentiles.get(URGENCY_PERCENTILES[urgency], self.default_fee), self.base_fee)
+
+    def fee_for(self, operations=1, urgency='normal', expected_profit=None):
+        """
+        Base fee per operation for a new transaction
+
+        Args:
+            operations (int): Operations in the transaction
+            urgency (str): 'low', 'normal', 'high' or 'critical'
+            expected_profit: Expected profit in XLM, if known (anything
+                parse_stroops accepts); at most FEE_PROFIT_SHARE of it is
+                spent on fees
+
+        Returns:
+            int: Stroops per operation
+        """
+        fee = min(self._percentile_fee(urgency), self.max_fee)
+        if expected_profit is not None:
+            budget = parse_stroops(expected_profit) * self.profit_share // max(operations, 1)
+            fee = min(fee, int(budget))
+        return max(fee, self.base_fee)
+
+    def bump_fee(self, current_fee, urgency='normal'):
+        """
+        Base fee per operation for a fee bump of a stuck transaction
+
+        Returns:
+            int: Stroops per operation, or None if the bump would exceed
+                FEE_MAX_PER_OPERATION
+        """
+        level = URGENCY_LEVELS.index(urgency) if urgency in URGENCY_PERCENTILES else 1
+        next_urgency = URGENCY_LEVELS[min(level + 1, len(URGENCY_LEVELS) - 1)]
+        fee = max(current_fee * self.bump_multiplier, self._percentile_fee(next_urgency))
+        if fee > self.max_fee:
+            return None
+        return fee
+
+    @staticmethod
+    def is_stuck(error):
+        """Whether a submission error means the transaction is waiting on its fee"""
+        if getattr(error, 'status', None) == 504:
+            return True
+        return SequenceManager.get_transaction_result_code(error) == 'tx_insufficient_fee'
+
+    def stats(self):
+        return {
+            'fresh': self.is_fresh,
+            'last_ledger': self.last_ledger,
+            'base_fee': self.base_fee,
+            'capacity_usage': self.capacity_usage,
+            'percentiles': dict(self.percentiles)
+        }
+
+# Create singleton instance
+fee_engine = FeeEngine()
+
+__all__ = ['FeeEngine', 'fee_engine', 'URGENCY_LEVELS']
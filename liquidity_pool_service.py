@@ -0,0 +1,266 @@
+import threading
+import time
+from itertools import combinations
+import numpy as np
+from stellar_sdk.exceptions import NotFoundError
+from services.logging_service import logging_service
+from services.stellar_service import stellar_service
+from services.metrics_service import metrics_service
+from services.market_feed import record_reserves
+from models.etf_assetlist import asset_registry
+from models.stroop_amount import parse_stroops
+from config.config import Config
+
+# Pool fees are expressed in basis points
+FEE_DENOMINATOR = 10000
+
+class LiquidityPool:
+    """
+    Constant-product pool between two enabled assets, reserves in stroops
+
+    quote_send and quote_receive use the integer formulas Stellar Core
+    applies to pool trades (CAP-38), so results match on-chain amounts for
+    the cached reserves.
+    """
+
+    __slots__ = ('pool_id', 'asset_a', 'asset_b', 'reserve_a', 'reserve_b', 'fee_bp', 'updated_at')
+
+    def __init__(self, pool_id, asset_a, asset_b, reserve_a, reserve_b, fee_bp=30, updated_at=None):
+        self.pool_id = pool_id
+        self.asset_a = asset_a
+        self.asset_b = asset_b
+        self.reserve_a = reserve_a
+        self.reserve_b = reserve_b
+        self.fee_bp = fee_bp
+        self.updated_at = time.time() if updated_at is None else updated_at
+
+    def reserves(self, source_code):
+        """(reserve in, reserve out) when selling source_code into the pool"""
+        if source_code == self.asset_a:
+            return self.reserve_a, self.reserve_b
+        return self.reserve_b, self.reserve_a
+
+    def quote_send(self, source_code, send_stroops):
+        """Stroops received for selling send_stroops of source_code, or None"""
+        reserve_in, reserve_out = self.reserves(source_code)
+        if send_stroops <= 0 or reserve_in <= 0 or reserve_out <= 0:
+            return None
+        effective = send_stroops * (FEE_DENOMINATOR - self.fee_bp)
+        received = effective * reserve_out // (reserve_in * FEE_DENOMINATOR + effective)
+        return received or None
+
+    def quote_send_array(self, source_code, send_stroops):
+        """
+        quote_send for many trade sizes at once
+
+        Evaluated in float64, so amounts agree with the integer formula to
+        within a stroop for realistic reserves.
+
+        Returns:
+            numpy.ndarray: Stroops received per size (NaN for non-positive sizes)
+        """
+        reserve_in, reserve_out = self.reserves(source_code)
+        sizes = np.asarray(send_stroops, dtype=np.float64)
+        if reserve_in <= 0 or reserve_out <= 0:
+            return np.full(sizes.shape, np.nan)
+        effective = sizes * (FEE_DENOMINATOR - self.fee_bp)
+        received = np.floor(effective * float(reserve_out) / (float(reserve_in) * FEE_DENOMINATOR + effective))
+        return np.where(sizes > 0, received, np.nan)
+
+    def marginal_rate(self, source_code):
+        """Units of the other asset per unit of source_code for an infinitesimal trade, after the fee"""
+        reserve_in, reserve_out = self.reserves(source_code)
+        if reserve_in <= 0:
+            return 0.0
+        return reserve_out / reserve_in * (FEE_DENOMINATOR - self.fee_bp) / FEE_DENOMINATOR
+
+    def quote_receive(self, source_code, receive_stroops):
+        """Stroops of source_code needed to receive receive_stroops, or None"""
+        reserve_in, reserve_out = self.reserves(source_code)
+        if receive_stroops <= 0 or reserve_in <= 0 or receive_stroops >= reserve_out:
+            return None
+        numerator = reserve_in * receive_stroops * FEE_DENOMINATOR
+        denominator = (reserve_out - receive_stroops) * (FEE_DENOMINATOR - self.fee_bp)
+        return -(-numerator // denominator)
+
+class LiquidityPoolService:
+    """
+    Local cache of the constant-product pools between enabled assets.
+
+    Horizon has no pool stream, so a background thread reloads the pools
+    on every ledger close (on_ledger_close), or after refresh_interval
+    seconds without one. Each enabled pair is searched once with
+    for_reserves; pools found are then reloaded by id, one request per
+    pool, and pairs without a pool are searched again every
+    discovery_interval seconds. Pools are keyed by their sorted asset-code
+    pair. Listeners receive every reloaded pool, which is how the market
+    feed writer publishes them to reader processes (apply_feed_record).
+    """
+
+    def __init__(self, stellar_service=stellar_service, refresh_interval=Config.LIQUIDITY_POOL_REFRESH,
+                 discovery_interval=Config.LIQUIDITY_POOL_DISCOVERY_INTERVAL):
+        self.stellar_service = stellar_service
+        self.refresh_interval = refresh_interval
+        self.discovery_interval = discovery_interval
+        self.pools = {}
+        self.last_refreshed = 0.0
+        # Time source for pool ages; replay substitutes a simulated clock
+        self.clock = time.time
+        self._pool_ids = {}
+        self._searched = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._ledger_closed = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def add_listener(self, callback):
+        """Register callback(pool) for every reloaded pool"""
+        self._listeners.append(callback)
+
+    def start(self):
+        """Load pools now and keep reloading them in the background"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._poll, name="liquidity-pools", daemon=True)
+        self._thread.start()
+        logging_service.info(
+            f"Liquidity pool refresh started on ledger close (at least every {self.refresh_interval}s)"
+        )
+
+    def stop(self):
+        self._stop_event.set()
+        self._ledger_closed.set()
+        logging_service.info("Liquidity pool refresh stopped")
+
+    def on_ledger_close(self, ledger_sequence):
+        """Reserves may have changed with the ledger, so reload them"""
+        self._ledger_closed.set()
+
+    def _poll(self):
+        while not self._stop_event.is_set():
+            self._ledger_closed.clear()
+            try:
+                self.refresh()
+            except Exception as e:
+                logging_service.warning(f"Liquidity pool refresh failed: {str(e)}")
+            self._ledger_closed.wait(self.refresh_interval)
+
+    def refresh(self):
+        """Reload the pool of every enabled pair from Horizon"""
+        now = self.clock()
+        pools = {}
+        for pair in combinations(sorted(asset_registry.get_enabled_codes()), 2):
+            try:
+                record = self._pool_record(pair, now)
+            except Exception as e:
+                logging_service.warning(f"Liquidity pool refresh for {pair[0]}/{pair[1]} failed: {str(e)}")
+                # Keep the last reserves; they age out under max_age
+                if pair in self.pools:
+                    pools[pair] = self.pools[pair]
+                continue
+            pool = self._parse_record(record, now) if record is not None else None
+            if pool is not None:
+                pools[pair] = pool
+
+        with self._lock:
+            self.pools = pools
+            self.last_refreshed = now
+        logging_service.debug(f"Liquidity pools refreshed: {len(pools)} pools between enabled assets")
+        for pool in pools.values():
+            if pool.updated_at == now:
+                self._notify(pool)
+
+    def _pool_record(self, pair, now):
+        """Horizon record of the pool between a sorted code pair, or None"""
+        pool_id = self._pool_ids.get(pair)
+        if pool_id is not None:
+            try:
+                with metrics_service.horizon_call('liquidity_pool'):
+                    return self.stellar_service.server.liquidity_pools().liquidity_pool(pool_id).call()
+            except NotFoundError:
+                # Withdrawn and removed; search the pair again
+                del self._pool_ids[pair]
+                self._searched.pop(pair, None)
+
+        if now - self._searched.get(pair, float('-inf')) < self.discovery_interval:
+            return None
+        self._searched[pair] = now
+        assets = [self.stellar_service.create_asset(code) for code in pair]
+        with metrics_service.horizon_call('liquidity_pools'):
+            response = self.stellar_service.server.liquidity_pools().for_reserves(assets).call()
+        for record in response.get('_embedded', {}).get('records', []):
+            if record.get('type', 'constant_product') == 'constant_product':
+                self._pool_ids[pair] = record['id']
+                return record
+        return None
+
+    def _notify(self, pool):
+        for listener in list(self._listeners):
+            try:
+                listener(pool)
+            except Exception as e:
+                logging_service.error(f"Liquidity pool listener failed: {str(e)}")
+
+    @staticmethod
+    def _parse_record(record, updated_at):
+        """LiquidityPool for a record whose reserves are both enabled assets, else None"""
+        reserves = record.get('reserves', [])
+        if record.get('type', 'constant_product') != 'constant_product' or len(reserves) != 2:
+            return None
+        codes = []
+        for reserve in reserves:
+            if reserve['asset'] == 'native':
+                code = 'XLM'
+            else:
+                code, _, issuer = reserve['asset'].partition(':')
+                asset = asset_registry.get_by_key(code, issuer)
+                if asset is None or not asset['enabled']:
+                    return None
+            codes.append(code)
+        return LiquidityPool(
+            record['id'], codes[0], codes[1],
+            parse_stroops(reserves[0]['amount']), parse_stroops(reserves[1]['amount']),
+            int(record.get('fee_bp', 30)), updated_at
+        )
+
+    def apply_feed_record(self, asset_a, asset_b, record):
+        """Cache a pool published on a shared market feed; replaces polling Horizon in readers"""
+        reserve_a, reserve_b, fee_bp = record_reserves(record)
+        pool = LiquidityPool(None, asset_a, asset_b, reserve_a, reserve_b, fee_bp, float(record['timestamp']))
+        with self._lock:
+            self.pools[tuple(sorted((asset_a, asset_b)))] = pool
+            self.last_refreshed = max(self.last_refreshed, pool.updated_at)
+
+    def get_pool(self, asset_a, asset_b, max_age=None):
+        """Pool between two asset codes in either order, or None (also when older than max_age)"""
+        pool = self.pools.get((asset_a, asset_b) if asset_a < asset_b else (asset_b, asset_a))
+        if pool is not None and max_age is not None and self.clock() - pool.updated_at > max_age:
+            return None
+        return pool
+
+    def get_pools(self, max_age=None):
+        """Cached pools, optionally only those refreshed within max_age seconds"""
+        if max_age is None:
+            return list(self.pools.values())
+        now = self.clock()
+        return [pool for pool in self.pools.values() if now - pool.updated_at <= max_age]
+
+    def get_rates(self, max_age=None):
+        """
+        Marginal after-fee pool rates in both directions
+
+        Returns:
+            dict: (source_code, target_code) -> rate
+        """
+        rates = {}
+        for pool in self.get_pools(max_age):
+            rates[(pool.asset_a, pool.asset_b)] = pool.marginal_rate(pool.asset_a)
+            rates[(pool.asset_b, pool.asset_a)] = pool.marginal_rate(pool.asset_b)
+        return rates
+
+# Create singleton instance
+liquidity_pool_service = LiquidityPoolService()
+
+__all__ = ['LiquidityPool', 'LiquidityPoolService', 'liquidity_pool_service']
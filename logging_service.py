@@ -1,51 +1,155 @@
+import atexit
+import copy
+import json
 import logging
 import os
+import queue
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+class JsonLineFormatter(logging.Formatter):
+    """Compact one-object-per-line structured output"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'msg': record.getMessage()
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, separators=(',', ':'), default=str)
+
+class SnapshotQueueHandler(QueueHandler):
+    """
+    QueueHandler that snapshots the message and leaves layout to the listener.
+
+    Like the stock prepare(), %-style arguments are rendered on the calling
+    thread, since they may be dicts the caller keeps mutating after the
+    record is queued. Unlike it, the formatter is not applied here: the
+    listener thread adds timestamps and layout (text or JSON) and renders
+    tracebacks from the exc_info kept on the record.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
 class LoggingService:
     def __init__(self, log_dir='logs'):
+        self.log_dir = log_dir
+
         # Ensure log directory exists
         os.makedirs(log_dir, exist_ok=True)
-        
-        # Create unique log filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        log_file = os.path.join(log_dir, f'stellar_etf_bot_{timestamp}.log')
-        
+
         # Configure logger
         self.logger = logging.getLogger('StellarETFBot')
         self.logger.setLevel(logging.DEBUG)
-        
-        # File handler
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(logging.DEBUG)
-        
+        self._listener = None
+        # One log file per process, however often configure() runs
+        self._started = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        self.configure()
+        atexit.register(self.shutdown)
+
+    def configure(self, level='DEBUG', async_mode=True, log_format='text',
+                  max_bytes=10 * 1024 * 1024, backup_count=5):
+        """
+        (Re)build the handler chain
+
+        Args:
+            level (str): Minimum level for the file output
+            async_mode (bool): Write through a queue on a background thread
+            log_format (str): 'text' or 'jsonl' for the file output
+            max_bytes (int): Rotate the log file at this size
+            backup_count (int): Rotated files to keep
+        """
+        self.shutdown()
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+            handler.close()
+
+        # Log filename stamped with the process start; opened on first write
+        extension = 'jsonl' if log_format == 'jsonl' else 'log'
+        log_file = os.path.join(self.log_dir, f'stellar_etf_bot_{self._started}.{extension}')
+
+        # File handler with size-based rotation
+        file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+        file_handler.setLevel(getattr(logging, str(level).upper(), logging.DEBUG))
+
         # Console handler
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.INFO)
-        
+
         # Formatter
         formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(formatter)
+        file_handler.setFormatter(JsonLineFormatter() if log_format == 'jsonl' else formatter)
         console_handler.setFormatter(formatter)
-        
-        # Add handlers
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
-    
-    def debug(self, msg):
-        self.logger.debug(msg)
-    
-    def info(self, msg):
-        self.logger.info(msg)
-    
-    def warning(self, msg):
-        self.logger.warning(msg)
-    
-    def error(self, msg):
-        self.logger.error(msg)
-    
-    def critical(self, msg):
-        self.logger.critical(msg)
+
+        # Only produce records some handler will keep
+        self.logger.setLevel(min(file_handler.level, console_handler.level))
+
+        if async_mode:
+            log_queue = queue.SimpleQueue()
+            self.logger.addHandler(SnapshotQueueHandler(log_queue))
+            self._listener = QueueListener(
+                log_queue, file_handler, console_handler, respect_handler_level=True
+            )
+            self._listener.start()
+        else:
+            self.logger.addHandler(file_handler)
+            self.logger.addHandler(console_handler)
+
+    def shutdown(self):
+        """Flush and stop the background writer, if running"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def is_enabled_for(self, level):
+        """Level guard for call sites that build expensive messages"""
+        return self.logger.isEnabledFor(level)
+
+    @property
+    def debug_enabled(self):
+        return self.logger.isEnabledFor(logging.DEBUG)
+
+    def _log(self, level, msg, args, fields, exc_info=None):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, msg, *args, exc_info=exc_info,
+                            extra={'fields': fields} if fields else None)
+
+    def debug(self, msg, *args, **fields):
+        self._log(logging.DEBUG, msg, args, fields)
+
+    def info(self, msg, *args, **fields):
+        self._log(logging.INFO, msg, args, fields)
+
+    def warning(self, msg, *args, **fields):
+        self._log(logging.WARNING, msg, args, fields)
+
+    def error(self, msg, *args, **fields):
+        self._log(logging.ERROR, msg, args, fields)
+
+    def critical(self, msg, *args, **fields):
+        self._log(logging.CRITICAL, msg, args, fields)
+
+    def log_error(self, exc, context=None, **fields):
+        """Log an exception with its traceback and optional context"""
+        if context is not None:
+            fields['context'] = context
+        self._log(
+            logging.ERROR,
+            "%s: %s%s",
+            (type(exc).__name__, exc, f" [{context}]" if context else ""),
+            fields,
+            exc_info=(type(exc), exc, exc.__traceback__)
+        )
 
 # Create a singleton logging service
 logging_service = LoggingService()
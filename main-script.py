@@ -1,7 +1,85 @@
 import time
 from config.config import Config
 from core.etf_manager import ETFManager
+from core.scheduler import LedgerScheduler
+from core.portfolio_engine import MultiPortfolioEngine
 from services.logging_service import logging_service
+from services.order_book_service import order_book_service
+from services.stellar_service import stellar_service
+from services.metrics_service import metrics_service
+from services.market_recorder import market_recorder
+from services.fee_engine import fee_engine
+from services.liquidity_pool_service import liquidity_pool_service
+from services.market_data_service import market_data_service
+from services.market_feed import MarketFeedWriter, MarketFeedReader
+
+def run_market_feed():
+    """Publish order books and prices to the shared market feed for other processes"""
+    # Interrupted while the feed is being created, there is no writer to close
+    writer = None
+    try:
+        writer = MarketFeedWriter()
+        order_book_service.add_listener(writer.publish_book)
+        order_book_service.start()
+        # Pools are reloaded on ledger close and published for the readers;
+        # the scheduler only relays ledger closes here and runs no ticks
+        liquidity_pool_service.add_listener(writer.publish_pool)
+        liquidity_pool_service.start()
+        LedgerScheduler(None, stellar_service).start_ledger_stream()
+        
+        while True:
+            # Tell readers which quiet books are still streamed live
+            writer.publish_liveness(order_book_service.connected_pairs())
+            snapshot = market_data_service.get_price_snapshot()
+            for asset_code, entry in snapshot.items():
+                writer.publish_prices({asset_code: entry['price']}, entry['timestamp'])
+            time.sleep(Config.PRICE_CACHE_TTL)
+    
+    except KeyboardInterrupt:
+        order_book_service.stop()
+        liquidity_pool_service.stop()
+        if writer is not None:
+            writer.close()
+    except Exception as e:
+        logging_service.error(f"Critical Error: {str(e)}")
+        raise
+
+def start_market_data():
+    """Warm order books and prices, from Horizon or from a shared feed"""
+    if Config.MARKET_FEED_ROLE == 'reader':
+        feed = MarketFeedReader()
+        # Pools come with the books, so readers never poll Horizon for them
+        order_book_service.follow_feed(feed, on_pool=liquidity_pool_service.apply_feed_record)
+        market_data_service.use_feed(feed)
+    else:
+        order_book_service.start()
+        # Pool reserves feed pool-aware arbitrage, and local path finding when enabled
+        liquidity_pool_service.start()
+
+def run_portfolios():
+    """Run every configured portfolio on one shared feed and scheduler"""
+    try:
+        engine = MultiPortfolioEngine(Config.load_portfolios())
+        
+        if Config.METRICS_PORT:
+            metrics_service.start_server(Config.METRICS_PORT)
+        start_market_data()
+        engine.start()
+        if Config.FEE_ENGINE_ENABLED:
+            fee_engine.start()
+        
+        # One ledger close drives one fair round across all portfolios
+        scheduler = LedgerScheduler(engine.run_round, stellar_service)
+        if Config.SCHEDULER_MARKET_TRIGGERS:
+            order_book_service.add_listener(scheduler.notify_market_change)
+        try:
+            scheduler.run_forever()
+        finally:
+            engine.stop()
+    
+    except Exception as e:
+        logging_service.error(f"Critical Error: {str(e)}")
+        raise
 
 def run_etf_bot():
     """Main entry point for Stellar ETF Bot"""
@@ -11,22 +89,48 @@ def run_etf_bot():
             server_endpoint=Config.HORIZON_SERVER
         )
         
-        while True:
-            try:
-                # Execute ETF strategy
-                etf_bot.execute_etf_strategy()
-                
-                # Wait before next iteration
-                time.sleep(Config.ARBITRAGE_THRESHOLD * 3600)  # Convert threshold to hours
-            
-            except Exception as e:
-                logging_service.error(f"ETF Bot Execution Error: {str(e)}")
-                time.sleep(60)  # Wait 1 minute before retry
+        # Expose latency histograms and Horizon counters on localhost
+        if Config.METRICS_PORT:
+            metrics_service.start_server(Config.METRICS_PORT)
+        
+        # Keep local order books warm for every enabled pair, either from
+        # Horizon directly or from a feed published by another process
+        start_market_data()
+        
+        # Follow account effects so balances are available locally
+        stellar_service.account_tracker.start()
+        
+        # Price transaction fees from live network fee statistics
+        if Config.FEE_ENGINE_ENABLED:
+            fee_engine.start()
+        
+        # Capture consumed market data for offline replay
+        if Config.RECORDER_ENABLED:
+            market_recorder.start()
+            order_book_service.add_listener(market_recorder.record_order_book)
+            liquidity_pool_service.add_listener(market_recorder.record_pool)
+        
+        # Tick on every ledger close rather than a fixed timer
+        scheduler = LedgerScheduler(etf_bot.execute_etf_strategy, stellar_service)
+        if Config.SCHEDULER_MARKET_TRIGGERS:
+            order_book_service.add_listener(scheduler.notify_market_change)
+        try:
+            scheduler.run_forever()
+        finally:
+            if market_recorder.active:
+                market_recorder.stop()
                 
     except Exception as e:
         logging_service.error(f"Critical Error: {str(e)}")
         raise
 
 if __name__ == '__main__':
-    logging_service.info("Stellar ETF Bot Starting...")
-    run_etf_bot()
+    if Config.MARKET_FEED_ROLE == 'writer':
+        logging_service.info("Stellar ETF Market Feed Starting...")
+        run_market_feed()
+    elif Config.PORTFOLIOS_FILE:
+        logging_service.info("Stellar ETF Multi-Portfolio Engine Starting...")
+        run_portfolios()
+    else:
+        logging_service.info("Stellar ETF Bot Starting...")
+        run_etf_bot()
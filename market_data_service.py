@@ -1,39 +1,330 @@
+import statistics
+import threading
+from abc import ABC, abstractmethod
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import requests
+from requests.adapters import HTTPAdapter
 from services.logging_service import logging_service
+from services.order_book_service import order_book_service
+from models.etf_assetlist import dynamic_asset_manager
+from config.config import Config
+
+class PriceSource(ABC):
+    """A price API with its own pooled keep-alive session and symbol mapping"""
+
+    def __init__(self, name, weight=1.0, symbols=None):
+        self.name = name
+        self.weight = weight
+        self.symbols = symbols or {}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def supported(self, assets):
+        return [asset for asset in assets if asset in self.symbols]
+
+    @abstractmethod
+    def fetch(self, assets, timeout):
+        """
+        Return {asset_code: price_in_usd} for the assets this source knows
+
+        Sources that know when each price was observed may return
+        {asset_code: (price_in_usd, timestamp)} instead.
+        """
+
+class CoinGeckoSource(PriceSource):
+    URL = 'https://api.coingecko.com/api/v3/simple/price'
+
+    def fetch(self, assets, timeout):
+        assets = self.supported(assets)
+        if not assets:
+            return {}
+        response = self.session.get(
+            self.URL,
+            params={'ids': ','.join(self.symbols[a] for a in assets), 'vs_currencies': 'usd'},
+            timeout=timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+        return {
+            asset: float(data[self.symbols[asset]]['usd'])
+            for asset in assets
+            if 'usd' in data.get(self.symbols[asset], {})
+        }
+
+class BinanceSource(PriceSource):
+    URL = 'https://api.binance.com/api/v3/ticker/price'
+
+    def fetch(self, assets, timeout):
+        assets = self.supported(assets)
+        if not assets:
+            return {}
+        symbols = '[' + ','.join(f'"{self.symbols[a]}"' for a in assets) + ']'
+        response = self.session.get(self.URL, params={'symbols': symbols}, timeout=timeout)
+        response.raise_for_status()
+        by_symbol = {item['symbol']: float(item['price']) for item in response.json()}
+        return {
+            asset: by_symbol[self.symbols[asset]]
+            for asset in assets
+            if self.symbols[asset] in by_symbol
+        }
+
+class StellarDexSource(PriceSource):
+    """
+    Mid prices against USDC from the local order-book cache (no network call)
+
+    Only fresh books are used (OrderBookService.is_fresh for max_age), so a
+    dead stream's last book is not weighted in as a live price.
+    """
+
+    def __init__(self, name, weight=1.0, max_age=Config.ORDER_BOOK_MAX_AGE):
+        super().__init__(name, weight)
+        self.max_age = max_age
+
+    def supported(self, assets):
+        return list(assets)
+
+    def fetch(self, assets, timeout):
+        prices = {}
+        for asset in assets:
+            if asset == 'USDC':
+                prices[asset] = 1.0
+                continue
+            bid, ask = order_book_service.get_best_bid_ask(asset, 'USDC', self.max_age)
+            if bid and ask:
+                prices[asset] = (bid + ask) / 2
+        return prices
+
+class SharedFeedSource(PriceSource):
+    """
+    Latest prices from a shared-memory market feed written by another process
+
+    Prices keep the feed's timestamp, and those older than max_age are
+    dropped, so a dead writer's last prices do not pass as fresh.
+    """
+
+    def __init__(self, name, reader, weight=1.0, max_age=Config.PRICE_STALE_AFTER):
+        super().__init__(name, weight)
+        self.reader = reader
+        self.max_age = max_age
+
+    def supported(self, assets):
+        return list(assets)
+
+    def fetch(self, assets, timeout):
+        self.reader.check_generation()
+        now = time.time()
+        return {
+            asset: (price, timestamp)
+            for asset, (price, timestamp) in self.reader.latest_prices(assets).items()
+            if now - timestamp <= self.max_age
+        }
 
 class MarketDataService:
-    def __init__(self):
+    """
+    Concurrent multi-source price aggregator.
+
+    Every source is queried in parallel with a per-request deadline. Sources
+    that have not answered after hedge_delay get a second, hedged request and
+    the first reply wins. Prices are combined with a weighted median and
+    cached per asset for cache_ttl seconds. A request queries the sources
+    only for its assets that expired and merges them into the shared
+    snapshot, so callers asking for different asset lists share one cache.
+    """
+
+    def __init__(self, cache_ttl=Config.PRICE_CACHE_TTL, timeout=Config.PRICE_REQUEST_TIMEOUT,
+                 hedge_delay=Config.PRICE_HEDGE_DELAY, stale_after=Config.PRICE_STALE_AFTER):
+        self.cache_ttl = cache_ttl
+        self.timeout = timeout
+        self.hedge_delay = hedge_delay
+        self.stale_after = stale_after
         self.price_sources = [
-            'https://api.coingecko.com/api/v3/simple/price',
-            'https://api.binance.com/api/v3/ticker/price'
+            CoinGeckoSource('coingecko', weight=1.0, symbols={
+                'XLM': 'stellar', 'USDC': 'usd-coin', 'EURC': 'euro-coin',
+                'BTC': 'bitcoin', 'ETH': 'ethereum', 'AQUA': 'aquarius',
+                'VELO': 'velo', 'SHX': 'stronghold-token', 'XRP': 'ripple'
+            }),
+            BinanceSource('binance', weight=1.0, symbols={
+                'XLM': 'XLMUSDT', 'USDC': 'USDCUSDT', 'BTC': 'BTCUSDT',
+                'ETH': 'ETHUSDT', 'XRP': 'XRPUSDT'
+            }),
+            StellarDexSource('stellar_dex', weight=0.5)
         ]
-    
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(self.price_sources) * 2, thread_name_prefix='price-source'
+        )
+        self._snapshot = {}
+        # When each asset was last queried, answered or not
+        self._fetched = {}
+        # Time source for cache expiry and price ages; replay substitutes a simulated clock
+        self.clock = time.time
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def use_feed(self, reader):
+        """Read prices from a shared market feed instead of the price APIs"""
+        self.price_sources = [SharedFeedSource('shared_feed', reader)]
+        self.clear_cache()
+
+    def clear_cache(self):
+        """Forget every cached price, so the next request queries the sources"""
+        with self._lock:
+            self._snapshot = {}
+            self._fetched = {}
+
     def get_current_prices(self, assets=None):
         """
         Retrieve current market prices for specified assets
-        
+
         Args:
-            assets (list): List of asset codes to retrieve prices for
-        
+            assets (list): List of asset codes to retrieve prices for;
+                defaults to every enabled ETF asset
+
         Returns:
-            dict: Current market prices
+            dict: Current market prices, leaving out prices older than stale_after
+        """
+        snapshot = self.get_price_snapshot(assets)
+        return {asset: entry['price'] for asset, entry in snapshot.items() if not entry['stale']}
+
+    def get_price_snapshot(self, assets=None):
+        """
+        Retrieve aggregated prices with per-asset metadata
+
+        Returns:
+            dict: asset_code -> {'price', 'sources', 'timestamp', 'age', 'stale'}
         """
         if assets is None:
-            assets = ['XLM', 'USDC', 'BTC', 'ETH']
-        
-        prices = {}
+            assets = [asset['asset_code'] for asset in dynamic_asset_manager.get_enabled_assets()]
+        assets = tuple(assets)
+
+        cached = self._cached_snapshot(assets)
+        if cached is not None:
+            return cached
+
+        # Single flight: concurrent callers wait for one refresh instead of
+        # each querying every source
+        with self._refresh_lock:
+            cached = self._cached_snapshot(assets)
+            if cached is not None:
+                return cached
+            return self._refresh(assets)
+
+    def _expired(self, assets, now):
+        """Assets not queried within cache_ttl; caller must hold the lock"""
+        return [asset for asset in assets if now - self._fetched.get(asset, float('-inf')) >= self.cache_ttl]
+
+    def _cached_snapshot(self, assets):
+        """Cached entries for assets if every one of them was queried within cache_ttl"""
+        now = self.clock()
+        with self._lock:
+            if not self._expired(assets, now):
+                return self._with_age({a: self._snapshot[a] for a in assets if a in self._snapshot}, now)
+        return None
+
+    def _refresh(self, assets):
+        """Query the sources for the expired assets and merge them into the snapshot"""
+        now = self.clock()
+        with self._lock:
+            expired = self._expired(assets, now)
+        quotes, observed = self._fetch_all(expired)
+
+        with self._lock:
+            for asset in expired:
+                samples = quotes.get(asset, [])
+                # Assets no source answered for keep their last known price
+                if samples:
+                    self._snapshot[asset] = {
+                        'price': self._weighted_median(samples),
+                        'sources': [name for name, _, _ in samples],
+                        # As old as the oldest sample that states when it was observed
+                        'timestamp': observed.get(asset, now)
+                    }
+                self._fetched[asset] = now
+            snapshot = {asset: self._snapshot[asset] for asset in assets if asset in self._snapshot}
+
+        return self._with_age(snapshot, now)
+
+    def _fetch_all(self, assets):
+        """
+        Query every source concurrently, hedging slow ones, within one deadline
+
+        Returns:
+            tuple: (asset -> [(source name, price, weight)], asset -> oldest
+                observation timestamp among sources that report one)
+        """
+        start = time.time()
+        deadline = start + self.timeout
+        hedge_at = start + self.hedge_delay
+        pending = {}
         for source in self.price_sources:
-            try:
-                response = requests.get(source, params={'ids': assets})
-                if response.status_code == 200:
-                    prices.update(response.json())
-                    break
-            except Exception as e:
-                logging_service.log_error(
-                    e, 
-                    context=f"Price Retrieval from {source}"
-                )
-        
-        return prices
+            future = self._executor.submit(source.fetch, assets, self.timeout)
+            pending[future] = source
+
+        results = {}
+        hedged = False
+        while pending and time.time() < deadline:
+            next_event = deadline if hedged else min(hedge_at, deadline)
+            done, _ = wait(list(pending), timeout=max(next_event - time.time(), 0),
+                           return_when=FIRST_COMPLETED)
+
+            for future in done:
+                source = pending.pop(future)
+                if source.name in results:
+                    continue
+                try:
+                    results[source.name] = (source, future.result())
+                except Exception as e:
+                    logging_service.warning(f"Price retrieval from {source.name} failed: {str(e)}")
+
+            # Drop duplicate requests for sources that already answered
+            pending = {f: s for f, s in pending.items() if s.name not in results}
+
+            if not hedged and time.time() >= hedge_at:
+                hedged = True
+                remaining = deadline - time.time()
+                for source in {s.name: s for s in pending.values()}.values():
+                    logging_service.debug(f"Hedging slow price source {source.name}")
+                    future = self._executor.submit(source.fetch, assets, remaining)
+                    pending[future] = source
+
+        for source in {s.name: s for s in pending.values()}.values():
+            logging_service.warning(f"Price source {source.name} missed the {self.timeout}s deadline")
+
+        quotes = {}
+        observed = {}
+        for name, (source, prices) in results.items():
+            for asset, quote in prices.items():
+                price, timestamp = quote if isinstance(quote, tuple) else (quote, None)
+                if price > 0:
+                    quotes.setdefault(asset, []).append((name, price, source.weight))
+                    if timestamp is not None:
+                        observed[asset] = min(observed.get(asset, timestamp), timestamp)
+        return quotes, observed
+
+    @staticmethod
+    def _weighted_median(samples):
+        """Weighted median of (name, price, weight) samples"""
+        if len(samples) == 1:
+            return samples[0][1]
+        if all(weight == samples[0][2] for _, _, weight in samples):
+            return statistics.median(price for _, price, _ in samples)
+        ordered = sorted(samples, key=lambda s: s[1])
+        half = sum(weight for _, _, weight in ordered) / 2
+        cumulative = 0.0
+        for _, price, weight in ordered:
+            cumulative += weight
+            if cumulative >= half:
+                return price
+        return ordered[-1][1]
+
+    def _with_age(self, snapshot, now):
+        """Attach age and staleness to each entry"""
+        return {
+            asset: dict(entry, age=now - entry['timestamp'],
+                        stale=now - entry['timestamp'] > self.stale_after)
+            for asset, entry in snapshot.items()
+        }
 
 market_data_service = MarketDataService()
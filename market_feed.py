@@ -0,0 +1,502 @@
+import os
+import threading
+import time
+import numpy as np
+from services.logging_service import logging_service
+from config.config import Config
+
+FEED_MAGIC = 0x4554464645454431  # 'ETFFEED1'
+FEED_VERSION = 4
+MAX_ASSETS = 1024
+MAX_PAIRS = 4096
+ASSET_CODE_BYTES = 12
+
+# Quote asset for reference (price-feed) records, published as a pseudo pair
+REFERENCE_CODE = 'USD'
+
+# What a pair's records hold: order books (and reference prices), or pool reserves
+KIND_BOOK = 0
+KIND_POOL = 1
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'u8'),
+    ('version', 'u4'),
+    ('depth', 'u4'),
+    ('capacity', 'u8'),
+    ('head', 'u8'),
+    ('generation', 'u8'),
+    ('heartbeat', 'f8'),
+    ('asset_count', 'u4'),
+    ('pair_count', 'u4'),
+    ('assets', f'S{ASSET_CODE_BYTES}', (MAX_ASSETS,)),
+    ('pair_selling', 'i4', (MAX_PAIRS,)),
+    ('pair_buying', 'i4', (MAX_PAIRS,)),
+    ('pair_kind', 'u1', (MAX_PAIRS,)),
+    ('pair_live', 'u1', (MAX_PAIRS,)),
+    ('pair_latest', 'i8', (MAX_PAIRS,))
+])
+
+# Records start on a cache-line boundary after the header
+RECORDS_OFFSET = (HEADER_DTYPE.itemsize + 63) // 64 * 64
+
+def record_dtype(depth):
+    """Ring record layout for a given number of book levels per side"""
+    return np.dtype([
+        ('seq', 'u8'),
+        ('timestamp', 'f8'),
+        ('pair', 'i4'),
+        ('levels', 'i4'),
+        ('bid', 'f8'),
+        ('ask', 'f8'),
+        ('bid_prices', 'f8', (depth,)),
+        ('bid_amounts', 'f8', (depth,)),
+        ('ask_prices', 'f8', (depth,)),
+        ('ask_amounts', 'f8', (depth,))
+    ])
+
+class MarketFeedWriter:
+    """
+    Single-writer side of the shared market-data ring.
+
+    The feed is one memory-mapped file: a header holding the asset and pair
+    tables, the global write count and the latest slot per pair, followed by
+    a ring of fixed-size NumPy structured records. Each record carries a
+    seqlock counter: it is odd while the slot is being written and 2*n + 2
+    once write number n is complete, so readers can detect torn or lapped
+    reads without taking a lock. Only one process may write a feed.
+
+    Liquidity pools are published as pool-kind pairs, with reserve_a as
+    the bid, reserve_b as the ask and the fee as the bid amount; reserves
+    are stroops and exact in float64 up to 2**53.
+
+    Horizon streams only changes, so a quiet book's last record can be old
+    and still current. The writer marks the pairs whose stream is
+    connected and stamps a heartbeat; readers count a marked pair as live
+    while the heartbeat is recent (MarketFeedReader.is_live).
+
+    A restarted writer never truncates a file readers may have mapped. A
+    feed with the same layout is reopened in place, keeping its tables and
+    head; otherwise a new file replaces the path atomically. Either way
+    the generation counter in the header is bumped, which tells readers to
+    remap the path and reload the latest record of every pair.
+    """
+
+    def __init__(self, path=Config.MARKET_FEED_PATH, capacity=Config.MARKET_FEED_CAPACITY,
+                 depth=Config.MARKET_FEED_DEPTH):
+        self.path = path
+        self.capacity = capacity
+        self.depth = depth
+        self.dtype = record_dtype(depth)
+        self._assets = {}
+        self._pairs = {}
+        self._lock = threading.Lock()
+
+        size = RECORDS_OFFSET + capacity * self.dtype.itemsize
+        previous = self._existing_header(path)
+        if previous is not None and os.path.getsize(path) == size and \
+                int(previous['depth'][0]) == depth and int(previous['capacity'][0]) == capacity:
+            del previous
+            self._map(path)
+            self._load_tables()
+        else:
+            generation = int(previous['generation'][0]) if previous is not None else 0
+            staging = f'{path}.{os.getpid()}.tmp'
+            with open(staging, 'wb') as handle:
+                handle.truncate(size)
+            self._map(staging)
+            self.header['pair_latest'][0][:] = -1
+            self.header['depth'] = depth
+            self.header['capacity'] = capacity
+            self.header['version'] = FEED_VERSION
+            self.header['generation'] = generation
+            # Readers refuse the file until the magic is written
+            self.header['magic'] = FEED_MAGIC
+            self.header.flush()
+            os.replace(staging, path)
+            if previous is not None:
+                # Readers still mapping the replaced file see it retired
+                previous['generation'] = generation + 1
+                previous.flush()
+                del previous
+        self.header['generation'] = int(self.header['generation'][0]) + 1
+        self._scratch = np.zeros(1, dtype=self.dtype)
+        logging_service.info(
+            "Market feed writer at %s (%d slots, %d levels, %.1f MiB, generation %d)",
+            path, capacity, depth, size / 1024 / 1024, int(self.header['generation'][0])
+        )
+
+    @staticmethod
+    def _existing_header(path):
+        """Writable header of a valid feed already at path, or None"""
+        try:
+            if os.path.getsize(path) < HEADER_DTYPE.itemsize:
+                return None
+            header = np.memmap(path, dtype=HEADER_DTYPE, mode='r+', shape=(1,))
+        except OSError:
+            return None
+        if int(header['magic'][0]) != FEED_MAGIC or int(header['version'][0]) != FEED_VERSION:
+            return None
+        return header
+
+    def _map(self, path):
+        self.header = np.memmap(path, dtype=HEADER_DTYPE, mode='r+', shape=(1,))
+        self.records = np.memmap(
+            path, dtype=self.dtype, mode='r+', offset=RECORDS_OFFSET, shape=(self.capacity,)
+        )
+
+    def _load_tables(self):
+        """Adopt the asset and pair tables of a feed reopened in place"""
+        header = self.header[0]
+        codes = [code.decode() for code in header['assets'][:int(header['asset_count'])]]
+        self._assets = {code: asset_id for asset_id, code in enumerate(codes)}
+        for pair_id in range(int(header['pair_count'])):
+            key = (codes[header['pair_selling'][pair_id]], codes[header['pair_buying'][pair_id]],
+                   int(header['pair_kind'][pair_id]))
+            self._pairs[key] = pair_id
+
+    def _asset_id(self, asset_code):
+        """Register an asset code in the header table; caller must hold the lock"""
+        asset_id = self._assets.get(asset_code)
+        if asset_id is None:
+            asset_id = len(self._assets)
+            if asset_id >= MAX_ASSETS:
+                raise ValueError(f"Market feed asset table is full ({MAX_ASSETS})")
+            self.header['assets'][0][asset_id] = asset_code.encode()
+            self.header['asset_count'] = asset_id + 1
+            self._assets[asset_code] = asset_id
+        return asset_id
+
+    def _pair_id(self, selling_code, buying_code, kind=KIND_BOOK):
+        """Register a pair in the header table; caller must hold the lock"""
+        key = (selling_code, buying_code, kind)
+        pair_id = self._pairs.get(key)
+        if pair_id is None:
+            pair_id = len(self._pairs)
+            if pair_id >= MAX_PAIRS:
+                raise ValueError(f"Market feed pair table is full ({MAX_PAIRS})")
+            self.header['pair_selling'][0][pair_id] = self._asset_id(selling_code)
+            self.header['pair_buying'][0][pair_id] = self._asset_id(buying_code)
+            self.header['pair_kind'][0][pair_id] = kind
+            self.header['pair_count'] = pair_id + 1
+            self._pairs[key] = pair_id
+        return pair_id
+
+    def _write(self, pair_id, timestamp, bids, asks):
+        """Write one record into the next ring slot; caller must hold the lock"""
+        n = int(self.header['head'][0])
+        slot = n % self.capacity
+        scratch = self._scratch[0]
+        bids = bids[:self.depth]
+        asks = asks[:self.depth]
+        scratch['timestamp'] = timestamp
+        scratch['pair'] = pair_id
+        scratch['levels'] = max(len(bids), len(asks))
+        scratch['bid'] = bids[0][0] if bids else np.nan
+        scratch['ask'] = asks[0][0] if asks else np.nan
+        for prefix, levels in (('bid', bids), ('ask', asks)):
+            prices = scratch[f'{prefix}_prices']
+            amounts = scratch[f'{prefix}_amounts']
+            prices[:] = np.nan
+            amounts[:] = 0.0
+            if levels:
+                prices[:len(levels)], amounts[:len(levels)] = zip(*levels)
+
+        records = self.records
+        records['seq'][slot] = 2 * n + 1
+        for field in self.dtype.names[1:]:
+            records[field][slot] = scratch[field]
+        records['seq'][slot] = 2 * n + 2
+        self.header['pair_latest'][0][pair_id] = n
+        self.header['head'] = n + 1
+
+    def publish_book(self, selling_code, buying_code, book):
+        """Publish an OrderBook; signature matches order_book_service listeners"""
+        with self._lock:
+            self._write(self._pair_id(selling_code, buying_code), book.updated_at, book.bids, book.asks)
+
+    def publish_prices(self, market_prices, timestamp=None):
+        """Publish reference prices as (asset, USD) records with bid = ask = price"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            for asset_code, price in market_prices.items():
+                level = [(float(price), 0.0)]
+                self._write(self._pair_id(asset_code, REFERENCE_CODE), timestamp, level, level)
+
+    def publish_pool(self, pool):
+        """Publish a LiquidityPool; signature matches liquidity_pool_service listeners"""
+        with self._lock:
+            self._write(
+                self._pair_id(pool.asset_a, pool.asset_b, KIND_POOL), pool.updated_at,
+                [(float(pool.reserve_a), float(pool.fee_bp))], [(float(pool.reserve_b), 0.0)]
+            )
+
+    def publish_liveness(self, live_pairs, timestamp=None):
+        """Mark which book pairs have a connected stream and stamp the heartbeat"""
+        with self._lock:
+            flags = self.header['pair_live'][0]
+            for (selling_code, buying_code, kind), pair_id in self._pairs.items():
+                if kind == KIND_BOOK:
+                    flags[pair_id] = (selling_code, buying_code) in live_pairs
+            self.header['heartbeat'] = time.time() if timestamp is None else timestamp
+
+    def close(self):
+        self.records.flush()
+        self.header.flush()
+
+class MarketFeedReader:
+    """
+    Lock-free reader of a shared market-data ring.
+
+    The file is mapped read-only, so any number of processes can read it
+    without copying the ring. A read copies one record (or a gathered batch)
+    out of the mapping and re-checks each slot's seqlock counter afterwards;
+    records that changed underneath are retried or reported as lapped.
+    """
+
+    def __init__(self, path=Config.MARKET_FEED_PATH, retries=8):
+        self.path = path
+        self.retries = retries
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        """Map the file currently at path and reset the cached tables"""
+        self.header = np.memmap(self.path, dtype=HEADER_DTYPE, mode='r', shape=(1,))
+        if int(self.header['magic'][0]) != FEED_MAGIC or int(self.header['version'][0]) != FEED_VERSION:
+            raise ValueError(f"{self.path} is not a version {FEED_VERSION} market feed")
+        self.generation = int(self.header['generation'][0])
+        self.depth = int(self.header['depth'][0])
+        self.capacity = int(self.header['capacity'][0])
+        self.dtype = record_dtype(self.depth)
+        self.records = np.memmap(
+            self.path, dtype=self.dtype, mode='r', offset=RECORDS_OFFSET, shape=(self.capacity,)
+        )
+        self._assets = []
+        self._pairs = {}
+        self._pair_codes = []
+        self._pair_kinds = []
+
+    def check_generation(self):
+        """
+        Remap the feed if its writer restarted since the last check
+
+        Returns:
+            int: Current generation; cursors taken under another one are void
+        """
+        with self._lock:
+            if int(self.header['generation'][0]) != self.generation:
+                logging_service.warning("Market feed %s writer restarted, remapping", self.path)
+                self._open()
+            return self.generation
+
+    @property
+    def head(self):
+        """Total records ever written"""
+        return int(self.header['head'][0])
+
+    def _refresh_tables(self):
+        """Pick up assets and pairs registered since the last call"""
+        header = self.header[0]
+        asset_count = int(header['asset_count'])
+        if asset_count > len(self._assets):
+            self._assets = [code.decode() for code in header['assets'][:asset_count]]
+        pair_count = int(header['pair_count'])
+        for pair_id in range(len(self._pair_codes), pair_count):
+            codes = (self._assets[header['pair_selling'][pair_id]], self._assets[header['pair_buying'][pair_id]])
+            kind = int(header['pair_kind'][pair_id])
+            self._pair_codes.append(codes)
+            self._pair_kinds.append(kind)
+            self._pairs[codes + (kind,)] = pair_id
+
+    def pair_codes(self, pair_id):
+        if pair_id >= len(self._pair_codes):
+            self._refresh_tables()
+        return self._pair_codes[pair_id]
+
+    def pair_kind(self, pair_id):
+        if pair_id >= len(self._pair_kinds):
+            self._refresh_tables()
+        return self._pair_kinds[pair_id]
+
+    def is_live(self, selling_code, buying_code, max_age, now=None):
+        """Whether the writer streams the pair live, as of a heartbeat within max_age seconds"""
+        pair_id = self._pairs.get((selling_code, buying_code, KIND_BOOK))
+        if pair_id is None:
+            return False
+        header = self.header[0]
+        if (time.time() if now is None else now) - float(header['heartbeat']) > max_age:
+            return False
+        return bool(header['pair_live'][pair_id])
+
+    def _read_slot(self, n):
+        """Copy write number n out of the ring, or None if it was overwritten"""
+        slot = n % self.capacity
+        expected = 2 * n + 2
+        for _ in range(self.retries):
+            before = self.records['seq'][slot]
+            if before != expected:
+                # Still being written (odd) or already lapped by a newer write
+                if before == expected - 1:
+                    continue
+                return None
+            record = self.records[slot:slot + 1].copy()[0]
+            if self.records['seq'][slot] == expected:
+                return record
+        return None
+
+    def latest(self, selling_code, buying_code, kind=KIND_BOOK):
+        """
+        Most recent record for a pair
+
+        Returns:
+            numpy.void: Record copy with timestamp, bid, ask and depth
+                arrays, or None if the pair was never published
+        """
+        key = (selling_code, buying_code, kind)
+        pair_id = self._pairs.get(key)
+        if pair_id is None:
+            self._refresh_tables()
+            pair_id = self._pairs.get(key)
+            if pair_id is None:
+                return None
+        for _ in range(self.retries):
+            n = int(self.header['pair_latest'][0][pair_id])
+            if n < 0:
+                return None
+            record = self._read_slot(n)
+            if record is not None and record['pair'] == pair_id:
+                return record
+        return None
+
+    def latest_prices(self, assets=None):
+        """
+        Latest reference prices in one vectorized, seqlock-checked gather
+
+        Returns:
+            dict: asset_code -> (price, timestamp)
+        """
+        self._refresh_tables()
+        pair_ids = np.array([
+            pair_id for (selling, buying, kind), pair_id in self._pairs.items()
+            if kind == KIND_BOOK and buying == REFERENCE_CODE and (assets is None or selling in assets)
+        ], dtype='i8')
+        if not len(pair_ids):
+            return {}
+        writes = np.array(self.header['pair_latest'][0][pair_ids])
+        pair_ids, writes = pair_ids[writes >= 0], writes[writes >= 0]
+        slots = writes % self.capacity
+        before = self.records['seq'][slots]
+        batch = self.records[slots]
+        after = self.records['seq'][slots]
+        valid = (before == after) & (before == 2 * writes + 2) & (batch['pair'] == pair_ids)
+
+        prices = {}
+        for pair_id, record in zip(pair_ids[valid], batch[valid]):
+            prices[self._pair_codes[pair_id][0]] = (float(record['bid']), float(record['timestamp']))
+        # Slots rewritten during the gather fall back to single-record reads
+        for pair_id in pair_ids[~valid]:
+            selling = self._pair_codes[pair_id][0]
+            record = self.latest(selling, REFERENCE_CODE)
+            if record is not None:
+                prices[selling] = (float(record['bid']), float(record['timestamp']))
+        return prices
+
+    def read_since(self, cursor):
+        """
+        Records written since a cursor, oldest first
+
+        Args:
+            cursor (int): head value from the previous call (0 to start)
+
+        Returns:
+            tuple: (records, new_cursor, lapped) where lapped counts writes
+                that were overwritten before they could be read
+        """
+        head = self.head
+        lapped = 0
+        if head - cursor > self.capacity:
+            lapped = head - cursor - self.capacity
+            cursor = head - self.capacity
+        records = []
+        for n in range(cursor, head):
+            record = self._read_slot(n)
+            if record is None:
+                lapped += 1
+            else:
+                records.append(record)
+        return records, head, lapped
+
+    def replay_latest(self, callback, pool_callback=None):
+        """
+        Call callback(selling_code, buying_code, record) with the latest
+        record of every book pair, and pool_callback(asset_a, asset_b,
+        record) with that of every pool if given
+        """
+        self._refresh_tables()
+        for (selling_code, buying_code), kind in list(zip(self._pair_codes, self._pair_kinds)):
+            target = pool_callback if kind == KIND_POOL else callback
+            if target is None:
+                continue
+            record = self.latest(selling_code, buying_code, kind)
+            if record is not None:
+                target(selling_code, buying_code, record)
+
+    def follow(self, callback, stop_event, poll_interval=Config.MARKET_FEED_POLL_INTERVAL, pool_callback=None):
+        """
+        Call callback(selling_code, buying_code, record) for every new book
+        or price record, and pool_callback(asset_a, asset_b, record) for
+        every pool record if given, until stop_event is set. Starts with the
+        latest record of every pair, so pairs that never update again are
+        loaded too, and starts over the same way when the writer restarts.
+        """
+        def deliver(selling_code, buying_code, record, target=callback):
+            try:
+                target(selling_code, buying_code, record)
+            except Exception as e:
+                logging_service.error(f"Market feed callback failed: {str(e)}")
+
+        def deliver_pool(asset_a, asset_b, record):
+            deliver(asset_a, asset_b, record, pool_callback)
+
+        cursor = seen = None
+        while not stop_event.is_set():
+            generation = self.check_generation()
+            if generation != seen:
+                # Take the head first: records written during the replay are read again, not lost
+                seen, cursor = generation, self.head
+                self.replay_latest(deliver, deliver_pool if pool_callback else None)
+            records, cursor, lapped = self.read_since(cursor)
+            if lapped:
+                logging_service.warning("Market feed reader lapped by %d records", lapped)
+            for record in records:
+                pair_id = int(record['pair'])
+                if self.pair_kind(pair_id) == KIND_POOL:
+                    if pool_callback is not None:
+                        deliver_pool(*self.pair_codes(pair_id), record)
+                else:
+                    deliver(*self.pair_codes(pair_id), record)
+            if not records:
+                stop_event.wait(poll_interval)
+
+    def close(self):
+        del self.records
+        del self.header
+
+def record_levels(record, side):
+    """(price, amount) levels of one side of a feed record"""
+    levels = int(record['levels'])
+    prices = record[f'{side}_prices'][:levels]
+    amounts = record[f'{side}_amounts'][:levels]
+    return [(float(p), float(a)) for p, a in zip(prices, amounts) if not np.isnan(p)]
+
+def record_reserves(record):
+    """(reserve_a, reserve_b, fee_bp) of a pool record, reserves in stroops"""
+    return int(record['bid']), int(record['ask']), int(record['bid_amounts'][0])
+
+def feed_exists(path=Config.MARKET_FEED_PATH):
+    return bool(path) and os.path.exists(path)
+
+__all__ = [
+    'MarketFeedWriter', 'MarketFeedReader', 'record_dtype', 'record_levels',
+    'record_reserves', 'feed_exists', 'REFERENCE_CODE', 'KIND_BOOK', 'KIND_POOL'
+]
@@ -0,0 +1,207 @@
+import glob
+import json
+import os
+import threading
+import time
+import numpy as np
+from services.logging_service import logging_service
+from config.config import Config
+
+LEDGER_DTYPE = np.dtype([('ledger', 'i8'), ('close_time', 'f8')])
+BALANCE_DTYPE = np.dtype([('ledger', 'i8'), ('asset', 'i4'), ('balance', 'f8')])
+PRICE_DTYPE = np.dtype([('ledger', 'i8'), ('asset', 'i4'), ('price', 'f8')])
+BOOK_DTYPE = np.dtype([
+    ('ledger', 'i8'), ('selling', 'i4'), ('buying', 'i4'),
+    ('side', 'i1'), ('level', 'i2'), ('price', 'f8'), ('amount', 'f8')
+])
+POOL_DTYPE = np.dtype([
+    ('ledger', 'i8'), ('asset_a', 'i4'), ('asset_b', 'i4'),
+    ('reserve_a', 'i8'), ('reserve_b', 'i8'), ('fee_bp', 'i4')
+])
+QUOTE_DTYPE = np.dtype([
+    ('ledger', 'i8'), ('source', 'i4'), ('destination', 'i4'),
+    ('send_amount', 'f8'), ('dest_amount', 'f8'), ('path', 'i4')
+])
+
+TABLE_DTYPES = {
+    'ledgers': LEDGER_DTYPE,
+    'balances': BALANCE_DTYPE,
+    'prices': PRICE_DTYPE,
+    'books': BOOK_DTYPE,
+    'pools': POOL_DTYPE,
+    'quotes': QUOTE_DTYPE
+}
+
+# Columns holding indices into the segment string table
+STRING_COLUMNS = {
+    'balances': ('asset',),
+    'prices': ('asset',),
+    'books': ('selling', 'buying'),
+    'pools': ('asset_a', 'asset_b'),
+    'quotes': ('source', 'destination', 'path')
+}
+
+# Order-book side codes in BOOK_DTYPE
+BID, ASK = 0, 1
+
+class MarketRecorder:
+    """
+    Captures the Horizon and price-feed data the pipeline consumes.
+
+    Records are appended to per-table column buffers tagged with the current
+    ledger, then written as NumPy structured arrays to compressed .npz
+    segments. Asset codes and path descriptions are stored once in a shared
+    string table and referenced by index. Recording is off until start() is
+    called; the hooks in the services are a single flag check otherwise.
+    """
+
+    def __init__(self, output_dir=Config.RECORDER_OUTPUT_DIR,
+                 segment_ledgers=Config.RECORDER_SEGMENT_LEDGERS):
+        self.output_dir = output_dir
+        self.segment_ledgers = segment_ledgers
+        self.active = False
+        self.ledger = 0
+        self._lock = threading.Lock()
+        self._reset_buffers()
+
+    def _reset_buffers(self):
+        self._strings = {}
+        self._ledgers = []
+        self._balances = []
+        self._prices = []
+        self._books = []
+        self._pools = []
+        self._quotes = []
+
+    def _intern(self, value):
+        """Index of a string in the segment string table; caller must hold the lock"""
+        index = self._strings.get(value)
+        if index is None:
+            index = self._strings[value] = len(self._strings)
+        return index
+
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.active = True
+        logging_service.info("Market recorder writing to %s", self.output_dir)
+
+    def stop(self):
+        self.active = False
+        self.flush()
+
+    def on_ledger_close(self, ledger_sequence, close_time=None):
+        """Tag subsequent records with a new ledger, flushing full segments"""
+        if not self.active:
+            return
+        with self._lock:
+            self.ledger = ledger_sequence
+            self._ledgers.append((ledger_sequence, close_time or time.time()))
+            full = len(self._ledgers) >= self.segment_ledgers
+        if full:
+            self.flush()
+
+    def record_account(self, account_details):
+        if not self.active:
+            return
+        with self._lock:
+            for balance in account_details['balances']:
+                if balance.get('asset_type') == 'native':
+                    asset_code = 'XLM'
+                else:
+                    asset_code = balance.get('asset_code')
+                if asset_code:
+                    self._balances.append((self.ledger, self._intern(asset_code), float(balance['balance'])))
+
+    def record_prices(self, market_prices):
+        if not self.active:
+            return
+        with self._lock:
+            for asset_code, price in market_prices.items():
+                self._prices.append((self.ledger, self._intern(asset_code), float(price)))
+
+    def record_order_book(self, selling_code, buying_code, book):
+        if not self.active:
+            return
+        with self._lock:
+            selling = self._intern(selling_code)
+            buying = self._intern(buying_code)
+            for side, levels in ((BID, book.bids), (ASK, book.asks)):
+                for level, (price, amount) in enumerate(levels):
+                    self._books.append((self.ledger, selling, buying, side, level, price, amount))
+
+    def record_pool(self, pool):
+        """Record a LiquidityPool's reserves; signature matches liquidity_pool_service listeners"""
+        if not self.active:
+            return
+        with self._lock:
+            self._pools.append((
+                self.ledger, self._intern(pool.asset_a), self._intern(pool.asset_b),
+                pool.reserve_a, pool.reserve_b, pool.fee_bp
+            ))
+
+    def record_path_quote(self, source_code, destination_code, send_amount, dest_amount, path_codes):
+        if not self.active:
+            return
+        with self._lock:
+            self._quotes.append((
+                self.ledger, self._intern(source_code), self._intern(destination_code),
+                float(send_amount), float(dest_amount), self._intern(json.dumps(path_codes))
+            ))
+
+    def flush(self):
+        """Write buffered records to a new .npz segment"""
+        with self._lock:
+            if not (self._ledgers or self._balances or self._prices or self._books or self._pools or self._quotes):
+                return None
+            strings = sorted(self._strings, key=self._strings.get)
+            tables = {
+                name: np.array(getattr(self, f'_{name}'), dtype=dtype)
+                for name, dtype in TABLE_DTYPES.items()
+            }
+            tables['strings'] = np.array(strings, dtype=str)
+            first_ledger = self._ledgers[0][0] if self._ledgers else self.ledger
+            self._reset_buffers()
+
+        path = os.path.join(self.output_dir, f'market_{first_ledger:012d}_{int(time.time() * 1000)}.npz')
+        np.savez_compressed(path, **tables)
+        logging_service.info("Market capture segment written: %s", path)
+        return path
+
+def load_segments(directory):
+    """
+    Load every recorded segment in a directory, merging string tables
+
+    Returns:
+        dict: 'strings' list plus concatenated structured arrays per table,
+            each sorted by ledger
+    """
+    string_index = {}
+    tables = {name: [] for name in TABLE_DTYPES}
+
+    for path in sorted(glob.glob(os.path.join(directory, 'market_*.npz'))):
+        with np.load(path) as segment:
+            # Segment-local string indices -> merged string table indices
+            mapping = np.array(
+                [string_index.setdefault(value, len(string_index)) for value in segment['strings'].tolist()],
+                dtype='i4'
+            )
+            for name in tables:
+                if name not in segment.files:
+                    # Segments recorded before the table existed
+                    continue
+                table = segment[name].copy()
+                if len(table):
+                    for column in STRING_COLUMNS.get(name, ()):
+                        table[column] = mapping[table[column]]
+                tables[name].append(table)
+
+    merged = {'strings': sorted(string_index, key=string_index.get)}
+    for name, parts in tables.items():
+        table = np.concatenate(parts) if parts else np.array([], dtype=TABLE_DTYPES[name])
+        merged[name] = table[np.argsort(table['ledger'], kind='stable')]
+    return merged
+
+# Create singleton instance
+market_recorder = MarketRecorder()
+
+__all__ = ['MarketRecorder', 'market_recorder', 'load_segments', 'BID', 'ASK']
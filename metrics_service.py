@@ -0,0 +1,229 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from services.logging_service import logging_service
+
+# Latency bucket upper bounds in seconds (50us .. 30s)
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with quantile estimates"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        with self._lock:
+            counts = list(self.counts)
+            count = self.count
+            maximum = self.max
+        if not count:
+            return 0.0
+        rank = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else maximum
+                fraction = (rank - cumulative) / bucket_count
+                return min(lower + (upper - lower) * fraction, maximum)
+            cumulative += bucket_count
+        return maximum
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'max': self.max
+        }
+
+class MetricsService:
+    """
+    In-process latency histograms and counters with a Prometheus text endpoint.
+
+    Stages are timed with perf_counter via timer() or the timed() decorator.
+    mark_tick_start() records when a strategy tick began so each submission
+    can also be observed as tick-to-submit latency. The tick start is kept
+    per thread, so portfolios ticking concurrently do not overwrite each
+    other's; carry_tick() hands it to worker-pool threads.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._tick = threading.local()
+        self._server = None
+
+    def _histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, LatencyHistogram())
+        return histogram
+
+    def observe(self, stage, seconds):
+        self._histogram(stage).observe(seconds)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the enclosed block as one observation of stage"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def timed(self, stage):
+        """Decorator form of timer()"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def horizon_call(self, call):
+        """Count a Horizon request, and its failure if it raises"""
+        self.increment('horizon_requests_total', call=call)
+        try:
+            yield
+        except Exception:
+            self.increment('horizon_errors_total', call=call)
+            raise
+
+    def mark_tick_start(self):
+        self._tick.started = time.perf_counter()
+
+    def observe_tick_to_submit(self):
+        started = getattr(self._tick, 'started', None)
+        if started is not None:
+            self.observe('tick_to_submit', time.perf_counter() - started)
+
+    def carry_tick(self, func):
+        """Wrap func to run under the calling thread's tick start, e.g. in a worker pool"""
+        started = getattr(self._tick, 'started', None)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            previous = getattr(self._tick, 'started', None)
+            self._tick.started = started
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._tick.started = previous
+        return wrapper
+
+    def reset(self):
+        """Drop all recorded histograms and counters"""
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+
+    def summary(self):
+        """p50/p99/max per stage"""
+        with self._lock:
+            histograms = list(self.histograms.items())
+        return {stage: histogram.summary() for stage, histogram in histograms}
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        # Copy the registries first; new stages and counters appear concurrently
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+
+        lines = [
+            '# HELP stage_latency_seconds Per-stage latency',
+            '# TYPE stage_latency_seconds histogram'
+        ]
+        for stage, histogram in histograms:
+            with histogram._lock:
+                counts = list(histogram.counts)
+                count = histogram.count
+                total = histogram.total
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'stage_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'stage_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'stage_latency_seconds_sum{{stage="{stage}"}} {total}')
+            lines.append(f'stage_latency_seconds_count{{stage="{stage}"}} {count}')
+
+        lines.append('# TYPE stage_latency_seconds_max gauge')
+        for stage, histogram in histograms:
+            lines.append(f'stage_latency_seconds_max{{stage="{stage}"}} {histogram.max}')
+
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f'# TYPE {name} counter')
+                typed.add(name)
+            label_text = ','.join(f'{key}="{val}"' for key, val in labels)
+            lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def start_server(self, port, host='127.0.0.1'):
+        """Serve /metrics on localhost from a background thread"""
+        if self._server is not None:
+            return
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        logging_service.info("Metrics endpoint listening on http://%s:%d/metrics", host, port)
+
+    def stop_server(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+# Create singleton instance
+metrics_service = MetricsService()
+
+__all__ = ['LatencyHistogram', 'MetricsService', 'metrics_service']
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+class MockHorizon:
+    """
+    Local stand-in for the Horizon endpoints the bot consumes.
+
+    Serves accounts, strict-send paths, order books, fee stats, ledgers,
+    synchronous and asynchronous transaction submission, plus a /prices
+    endpoint for the benchmark price source. Every response can be delayed
+    by a fixed latency with optional jitter, and list payloads (balances,
+    book levels, path records) are sized from the configured universe.
+    """
+
+    def __init__(self, assets, latency=0.0, jitter=0.0, book_levels=20, path_records=5,
+                 host='127.0.0.1', port=0, seed=7):
+        """
+        Args:
+            assets (list): Asset list entries ({'asset_code', 'issuer', ...})
+            latency (float): Base seconds to wait before each response
+            jitter (float): Extra uniformly random seconds per response
+            book_levels (int): Levels per side in order-book responses
+            path_records (int): Records per strict-send paths response
+        """
+        self.assets = {asset['asset_code']: asset for asset in assets}
+        self.latency = latency
+        self.jitter = jitter
+        self.book_levels = book_levels
+        self.path_records = path_records
+        self.host = host
+        self.port = port
+        self.ledger_sequence = 1000
+        self.account_sequence = 100000
+        self.submissions = 0
+        self.requests = 0
+        self._random = random.Random(seed)
+        self.prices = {code: 0.5 + self._random.random() * 2 for code in self.assets}
+        self.balances = {code: 100 + self._random.random() * 1000 for code in self.assets}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def set_universe(self, assets):
+        """Serve a different asset universe, keeping known prices and balances"""
+        with self._lock:
+            self.assets = {asset['asset_code']: asset for asset in assets}
+            for code in self.assets:
+                self.prices.setdefault(code, 0.5 + self._random.random() * 2)
+                self.balances.setdefault(code, 100 + self._random.random() * 1000)
+            self.prices = {code: self.prices[code] for code in self.assets}
+            self.balances = {code: self.balances[code] for code in self.assets}
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                mock._handle(self, 'GET')
+
+            def do_POST(self):
+                mock._handle(self, 'POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="mock-horizon", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _handle(self, request, method):
+        with self._lock:
+            self.requests += 1
+        delay = self.latency + (self._random.random() * self.jitter if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+
+        parsed = urlparse(request.path)
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        body = b''
+        if method == 'POST':
+            body = request.rfile.read(int(request.headers.get('Content-Length', 0)))
+
+        parts = [part for part in parsed.path.split('/') if part]
+        try:
+            if parts[:1] == ['accounts'] and len(parts) == 2:
+                payload = self._account(parts[1])
+            elif parts == ['paths', 'strict-send']:
+                payload = self._strict_send_paths(query)
+            elif parts == ['order_book']:
+                payload = self._order_book(query)
+            elif parts == ['fee_stats']:
+                payload = self._fee_stats()
+            elif parts == ['ledgers']:
+                payload = self._ledgers()
+            elif parts == ['transactions'] and method == 'POST':
+                payload = self._submit(body)
+            elif parts == ['transactions_async'] and method == 'POST':
+                payload = self._submit_async(body)
+            elif parts == ['prices']:
+                payload = {code: price for code, price in self.prices.items()}
+            else:
+                self._respond(request, 404, {'status': 404, 'title': 'Resource Missing'})
+                return
+        except Exception as e:
+            self._respond(request, 400, {'status': 400, 'title': 'Bad Request', 'detail': str(e)})
+            return
+        self._respond(request, 200, payload)
+
+    @staticmethod
+    def _respond(request, status, payload):
+        data = json.dumps(payload).encode()
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/hal+json')
+        request.send_header('Content-Length', str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+    def _asset_code(self, query, prefix):
+        if query.get(f'{prefix}_asset_type') == 'native':
+            return 'XLM'
+        return query.get(f'{prefix}_asset_code')
+
+    def _balance_record(self, code, amount):
+        asset = self.assets[code]
+        if asset['issuer'] == 'native':
+            return {'asset_type': 'native', 'balance': f"{amount:.7f}"}
+        return {
+            'asset_type': 'credit_alphanum4' if len(code) <= 4 else 'credit_alphanum12',
+            'asset_code': code,
+            'asset_issuer': asset['issuer'],
+            'balance': f"{amount:.7f}"
+        }
+
+    def _account(self, account_id):
+        with self._lock:
+            sequence = self.account_sequence
+        return {
+            'id': account_id,
+            'account_id': account_id,
+            'sequence': str(sequence),
+            'balances': [self._balance_record(code, amount) for code, amount in self.balances.items()],
+            'data': {}
+        }
+
+    def _strict_send_paths(self, query):
+        source_code = self._asset_code(query, 'source')
+        source_amount = float(query['source_amount'])
+        destination = query.get('destination_assets', '').split(',')[0]
+        dest_code = 'XLM' if destination == 'native' else destination.split(':')[0]
+        rate = self.prices[source_code] / self.prices[dest_code]
+        records = []
+        for index in range(self.path_records):
+            records.append({
+                'source_asset_type': query.get('source_asset_type'),
+                'source_amount': query['source_amount'],
+                'destination_amount': f"{source_amount * rate * (1 - 0.001 * (index + 1)):.7f}",
+                'path': []
+            })
+        return {'_embedded': {'records': records}}
+
+    def _order_book(self, query):
+        selling = self._asset_code(query, 'selling')
+        buying = self._asset_code(query, 'buying')
+        mid = self.prices[selling] / self.prices[buying]
+        levels = range(1, self.book_levels + 1)
+        return {
+            'bids': [{'price': f"{mid * (1 - 0.001 * i):.7f}", 'amount': '1000.0000000'} for i in levels],
+            'asks': [{'price': f"{mid * (1 + 0.001 * i):.7f}", 'amount': '1000.0000000'} for i in levels]
+        }
+
+    def _fee_stats(self):
+        percentiles = {f'p{p}': str(100 + p) for p in (10, 20, 30, 40, 50, 60, 70, 80, 90, 95, 99)}
+        return {
+            'last_ledger': str(self.ledger_sequence),
+            'last_ledger_base_fee': '100',
+            'ledger_capacity_usage': '0.5',
+            'fee_charged': dict(percentiles, max='1000', min='100', mode='100'),
+            'max_fee': dict(percentiles, max='10000', min='100', mode='100')
+        }
+
+    def _ledgers(self):
+        return {'_embedded': {'records': [{'sequence': self.ledger_sequence}]}}
+
+    def _submit(self, body):
+        with self._lock:
+            self.submissions += 1
+            self.account_sequence += 1
+            self.ledger_sequence += 1
+            ledger = self.ledger_sequence
+        return {
+            'hash': hashlib.sha256(body).hexdigest(),
+            'ledger': ledger,
+            'successful': True,
+            'envelope_xdr': '',
+            'result_xdr': ''
+        }
+
+    def _submit_async(self, body):
+        with self._lock:
+            self.submissions += 1
+            self.account_sequence += 1
+        return {'hash': hashlib.sha256(body).hexdigest(), 'tx_status': 'PENDING'}
+
+__all__ = ['MockHorizon']
@@ -0,0 +1,293 @@
+import threading
+import time
+from itertools import combinations
+from services.logging_service import logging_service
+from services.stellar_service import stellar_service
+from services.market_feed import REFERENCE_CODE, record_levels
+from models.etf_assetlist import dynamic_asset_manager
+from config.config import Config
+
+class OrderBook:
+    """In-memory snapshot of one Horizon order book (selling/buying pair)"""
+
+    def __init__(self, selling_asset, buying_asset, bids=None, asks=None, updated_at=None):
+        self.selling_asset = selling_asset
+        self.buying_asset = buying_asset
+        self.bids = bids or []
+        self.asks = asks or []
+        self.updated_at = time.time() if updated_at is None else updated_at
+
+    @property
+    def best_bid(self):
+        return self.bids[0][0] if self.bids else None
+
+    @property
+    def best_ask(self):
+        return self.asks[0][0] if self.asks else None
+
+    @property
+    def mid_price(self):
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return (self.best_bid + self.best_ask) / 2
+
+    def depth(self, side='bids'):
+        """Total amount available on one side of the book"""
+        levels = self.bids if side == 'bids' else self.asks
+        return sum(amount for _, amount in levels)
+
+class OrderBookService:
+    """
+    Local order-book cache fed by Horizon server-sent event streams.
+
+    Up to max_streams pairs get a background SSE stream each, preferring
+    pairs against XLM; the remaining pairs are polled round-robin by a
+    single thread, so thread and connection counts stay bounded as the
+    asset list grows. Strategy code reads best bid/ask and depth without a
+    network round trip.
+
+    Horizon only streams changes, so a quiet book can be old and still
+    current. A book is stale when it is older than max_age and its stream
+    is not connected; a connected stream keeps its book fresh. Following a
+    shared feed, the writer's stream liveness counts the same way.
+    """
+
+    def __init__(self, stellar_service=stellar_service, depth=Config.ORDER_BOOK_DEPTH,
+                 max_streams=Config.ORDER_BOOK_MAX_STREAMS, poll_interval=Config.ORDER_BOOK_POLL_INTERVAL):
+        self.stellar_service = stellar_service
+        self.depth = depth
+        self.max_streams = max_streams
+        self.poll_interval = poll_interval
+        self.books = {}
+        # Time source for book ages; replay substitutes a simulated clock
+        self.clock = time.time
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._threads = {}
+        self._polled = []
+        self._connected = set()
+        self._feed = None
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Register callback(selling_code, buying_code, book) for book updates"""
+        self._listeners.append(callback)
+
+    def start(self, pairs=None):
+        """
+        Subscribe to order-book streams
+
+        Args:
+            pairs (list): (selling_code, buying_code) tuples; defaults to every
+                pair of enabled ETF assets
+        """
+        if pairs is None:
+            codes = [asset['asset_code'] for asset in dynamic_asset_manager.get_enabled_assets()]
+            pairs = list(combinations(codes, 2))
+        # XLM pairs carry most of the liquidity, so they get the streams first
+        pairs = sorted(pairs, key=lambda pair: 'XLM' not in pair)
+        streamed, self._polled = pairs[:self.max_streams], pairs[self.max_streams:]
+
+        self._stop_event.clear()
+        # Threads still blocked in a stream from before stop() resume rather than duplicate
+        self._threads = {key: thread for key, thread in self._threads.items() if thread.is_alive()}
+        for pair in streamed:
+            if pair in self._threads:
+                continue
+            self._start_thread(pair, self._stream_pair, pair, f"orderbook-{pair[0]}-{pair[1]}")
+        if self._polled and 'poll' not in self._threads:
+            self._start_thread('poll', self._poll_pairs, (), "orderbook-poll")
+        logging_service.info(
+            f"Order book streaming started for {len(streamed)} pairs, polling {len(self._polled)}"
+        )
+
+    def _start_thread(self, key, target, args, name):
+        thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+        self._threads[key] = thread
+        thread.start()
+
+    def stop(self):
+        """
+        Signal all stream threads to exit after their next event
+
+        Threads blocked in a quiet stream stay registered until they exit,
+        so a later start() does not open a second stream for their pair.
+        """
+        self._stop_event.set()
+        self._connected.clear()
+        logging_service.info("Order book streaming stopped")
+
+    def _stream_pair(self, selling_code, buying_code):
+        """Consume one order-book stream, reconnecting with backoff on failure"""
+        backoff = 1
+        while not self._stop_event.is_set():
+            try:
+                selling_asset = self.stellar_service.create_asset(selling_code)
+                buying_asset = self.stellar_service.create_asset(buying_code)
+                stream = (
+                    self.stellar_service.server.orderbook(selling_asset, buying_asset)
+                    .limit(self.depth)
+                    .stream()
+                )
+                for response in stream:
+                    if self._stop_event.is_set():
+                        return
+                    # The first event is the current book, so the stream is live from here
+                    self._apply_snapshot(selling_code, buying_code, response)
+                    self._connected.add((selling_code, buying_code))
+                    backoff = 1
+            except Exception as e:
+                logging_service.warning(
+                    f"Order book stream {selling_code}/{buying_code} interrupted: {str(e)}"
+                )
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                self._connected.discard((selling_code, buying_code))
+
+    def _poll_pairs(self):
+        """Refresh the pairs without a stream, spreading requests over poll_interval"""
+        while not self._stop_event.is_set():
+            pairs = list(self._polled)
+            if not pairs:
+                return
+            pause = self.poll_interval / len(pairs)
+            for selling_code, buying_code in pairs:
+                if self._stop_event.is_set():
+                    return
+                try:
+                    response = self.stellar_service.server.orderbook(
+                        self.stellar_service.create_asset(selling_code),
+                        self.stellar_service.create_asset(buying_code)
+                    ).limit(self.depth).call()
+                    self._apply_snapshot(selling_code, buying_code, response)
+                except Exception as e:
+                    logging_service.warning(f"Order book poll {selling_code}/{buying_code} failed: {str(e)}")
+                self._stop_event.wait(pause)
+
+    def connected_pairs(self):
+        """Pairs whose stream is currently connected"""
+        return set(self._connected)
+
+    def is_fresh(self, selling_code, buying_code, max_age=None, now=None):
+        """Whether a cached book can be traded on: streamed live, or updated within max_age"""
+        book = self.books.get((selling_code, buying_code))
+        if book is None:
+            return False
+        if max_age is None or (selling_code, buying_code) in self._connected:
+            return True
+        if self._feed is not None and self._feed.is_live(selling_code, buying_code, max_age):
+            return True
+        return (self.clock() if now is None else now) - book.updated_at <= max_age
+
+    def get_books(self, max_age=None):
+        """
+        Cached books that are fresh for max_age seconds
+
+        Returns:
+            dict: (selling_code, buying_code) -> OrderBook
+        """
+        now = self.clock()
+        return {
+            pair: book for pair, book in list(self.books.items())
+            if self.is_fresh(*pair, max_age=max_age, now=now)
+        }
+
+    def follow_feed(self, reader, on_pool=None):
+        """
+        Mirror books from a shared market feed instead of streaming Horizon
+
+        Args:
+            reader (MarketFeedReader): Reader of the feed another process writes
+            on_pool (callable): on_pool(asset_a, asset_b, record) for the
+                liquidity pools published on the same feed
+        """
+        self._stop_event.clear()
+        self._feed = reader
+        key = ('feed', reader.path)
+        if key in self._threads and self._threads[key].is_alive():
+            return
+        self._start_thread(
+            key, reader.follow,
+            (self._apply_feed_record, self._stop_event, Config.MARKET_FEED_POLL_INTERVAL, on_pool),
+            "orderbook-feed"
+        )
+        logging_service.info(f"Order books following shared market feed {reader.path}")
+
+    def _apply_feed_record(self, selling_code, buying_code, record):
+        """Replace the cached book for one pair with a shared-feed record"""
+        if buying_code == REFERENCE_CODE:
+            return
+        book = OrderBook(
+            selling_code, buying_code,
+            record_levels(record, 'bid'), record_levels(record, 'ask'),
+            float(record['timestamp'])
+        )
+        self._store_book(selling_code, buying_code, book)
+
+    def _apply_snapshot(self, selling_code, buying_code, response):
+        """Replace the cached book for one pair with a streamed snapshot"""
+        bids = [(float(level['price']), float(level['amount'])) for level in response.get('bids', [])]
+        asks = [(float(level['price']), float(level['amount'])) for level in response.get('asks', [])]
+        self._store_book(selling_code, buying_code, OrderBook(selling_code, buying_code, bids, asks))
+
+    def _store_book(self, selling_code, buying_code, book):
+        """Cache a book and notify listeners"""
+        with self._lock:
+            self.books[(selling_code, buying_code)] = book
+        for listener in list(self._listeners):
+            try:
+                listener(selling_code, buying_code, book)
+            except Exception as e:
+                logging_service.error(f"Order book listener failed: {str(e)}")
+
+    def get_book(self, selling_code, buying_code, max_age=None):
+        """Return the cached OrderBook for a pair, or None if not streamed or stale"""
+        if max_age is not None and not self.is_fresh(selling_code, buying_code, max_age):
+            return None
+        return self.books.get((selling_code, buying_code))
+
+    def get_best_bid_ask(self, selling_code, buying_code, max_age=None):
+        """
+        Best bid and ask for a pair, in units of buying asset per selling asset.
+        Falls back to the inverted book if only the reverse pair is streamed.
+        Books stale for max_age seconds are ignored.
+        """
+        book = self.get_book(selling_code, buying_code, max_age)
+        if book is not None:
+            return book.best_bid, book.best_ask
+
+        book = self.get_book(buying_code, selling_code, max_age)
+        if book is None:
+            return None, None
+        bid = 1 / book.best_ask if book.best_ask else None
+        ask = 1 / book.best_bid if book.best_bid else None
+        return bid, ask
+
+    def get_rate(self, source_code, target_code, max_age=None):
+        """Units of target received when selling one unit of source at the top of a fresh book"""
+        bid, _ = self.get_best_bid_ask(source_code, target_code, max_age)
+        return bid
+
+    def get_rates(self, max_age=None):
+        """
+        Executable top-of-book rates in both directions for all cached pairs
+
+        Args:
+            max_age (float): Ignore books that are stale for this many seconds
+
+        Returns:
+            dict: (source_code, target_code) -> rate
+        """
+        rates = {}
+        for (selling_code, buying_code), book in self.get_books(max_age).items():
+            if book.best_bid:
+                rates[(selling_code, buying_code)] = book.best_bid
+            if book.best_ask:
+                rates[(buying_code, selling_code)] = 1 / book.best_ask
+        return rates
+
+# Create singleton instance
+order_book_service = OrderBookService()
+
+__all__ = ['OrderBook', 'OrderBookService', 'order_book_service']
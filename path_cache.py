@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+from services.logging_service import logging_service
+from models.stroop_amount import parse_stroops
+from config.config import Config
+
+class PathQuoteCache:
+    """
+    LRU cache of strict-send path quotes.
+
+    Quotes are keyed on (source, destination, amount bucket) where the bucket
+    rounds the send amount to a few significant digits. A hit returns the
+    cached path with the minimum destination amount scaled to the requested
+    send amount. Only amounts up to the quoted one are served: scaling a
+    quote up would understate price impact, scaling it down only
+    overstates it. Entries expire after a TTL or when a newer ledger closes.
+    """
+
+    def __init__(self, max_entries=Config.PATH_CACHE_SIZE, ttl=Config.PATH_CACHE_TTL,
+                 bucket_digits=Config.PATH_CACHE_BUCKET_DIGITS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.bucket_digits = bucket_digits
+        self.ledger_sequence = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket(self, stroops):
+        """Round a stroop amount to bucket_digits significant digits"""
+        if stroops <= 0:
+            return 0
+        exponent = len(str(stroops)) - self.bucket_digits
+        if exponent <= 0:
+            return stroops
+        unit = 10 ** exponent
+        return (stroops + unit // 2) // unit * unit
+
+    def get(self, source_asset_code, destination_asset_code, send_amount):
+        """
+        Look up a cached quote
+
+        Returns:
+            tuple: (min_amount in stroops, path) scaled to send_amount, or None
+                on miss or when send_amount exceeds the quoted amount
+        """
+        send_stroops = parse_stroops(send_amount)
+        key = (source_asset_code, destination_asset_code, self._bucket(send_stroops))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry['created_at'] > self.ttl or \
+                    entry['ledger_sequence'] != self.ledger_sequence:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            if send_stroops > entry['send_stroops']:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry['min_stroops'] * send_stroops // entry['send_stroops'], entry['path']
+
+    def put(self, source_asset_code, destination_asset_code, send_amount, min_amount, path):
+        """Store a quote for the bucket containing send_amount"""
+        send_stroops = parse_stroops(send_amount)
+        if send_stroops <= 0 or min_amount is None:
+            return
+        key = (source_asset_code, destination_asset_code, self._bucket(send_stroops))
+        with self._lock:
+            self._entries[key] = {
+                'min_stroops': parse_stroops(min_amount),
+                'send_stroops': send_stroops,
+                'path': path,
+                'created_at': time.time(),
+                'ledger_sequence': self.ledger_sequence
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def on_ledger_close(self, ledger_sequence):
+        """Invalidate every quote taken before the given ledger closed"""
+        with self._lock:
+            if ledger_sequence == self.ledger_sequence:
+                return
+            self.ledger_sequence = ledger_sequence
+            self._entries.clear()
+        logging_service.debug(f"Path quote cache cleared at ledger {ledger_sequence}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+            'size': len(self._entries)
+        }
+
+# Create singleton instance
+path_cache = PathQuoteCache()
+
+__all__ = ['PathQuoteCache', 'path_cache']
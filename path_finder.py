@@ -0,0 +1,216 @@
+import math
+import numpy as np
+from services.order_book_service import order_book_service
+from services.liquidity_pool_service import liquidity_pool_service
+from services.metrics_service import metrics_service
+from models.stroop_amount import STROOPS_PER_UNIT
+from config.config import Config
+
+class PathQuote:
+    """Best local path with exact amounts in stroops"""
+
+    __slots__ = ('source_asset', 'destination_asset', 'send_stroops', 'dest_stroops', 'path', 'venues')
+
+    def __init__(self, source_asset, destination_asset, send_stroops, dest_stroops, path, venues):
+        self.source_asset = source_asset
+        self.destination_asset = destination_asset
+        self.send_stroops = send_stroops
+        self.dest_stroops = dest_stroops
+        self.path = path
+        self.venues = venues
+
+    def __repr__(self):
+        return (f"PathQuote({self.send_stroops} {self.source_asset} -> {self.dest_stroops} "
+                f"{self.destination_asset} via {self.path} on {self.venues})")
+
+class LocalPathFinder:
+    """
+    Strict-send and strict-receive path finding over local market data.
+
+    The graph has an edge wherever a streamed order book or a cached
+    constant-product pool connects two assets. A hop is priced the way
+    Stellar Core executes it: against the better of that pair's order book
+    (walked level by level) and its pool (exact integer formula), never
+    split across both. Paths are searched layer by layer up to max_hops
+    intermediate assets, keeping the best amount reached at each asset,
+    which is the same label-setting search Horizon's /paths runs.
+
+    Paths come back as asset codes for PathPaymentStrictSend; amounts are
+    only as exact as the local books and reserves are fresh.
+    """
+
+    def __init__(self, order_book_service=order_book_service, liquidity_pool_service=liquidity_pool_service,
+                 max_hops=Config.PATH_FINDER_MAX_HOPS, max_age=Config.ORDER_BOOK_MAX_AGE):
+        """
+        Args:
+            order_book_service (OrderBookService): Streamed offers
+            liquidity_pool_service (LiquidityPoolService): Cached pool reserves
+            max_hops (int): Intermediate assets allowed in a path (Stellar allows 5)
+            max_age (float): Ignore books and pools older than this many seconds
+        """
+        self.order_book_service = order_book_service
+        self.liquidity_pool_service = liquidity_pool_service
+        self.max_hops = max_hops
+        self.max_age = max_age
+
+    def _neighbours(self):
+        """Asset code -> set of directly tradable asset codes"""
+        graph = {}
+        for selling, buying in self.order_book_service.get_books(self.max_age):
+            graph.setdefault(selling, set()).add(buying)
+            graph.setdefault(buying, set()).add(selling)
+        for pool in self.liquidity_pool_service.get_pools(self.max_age):
+            graph.setdefault(pool.asset_a, set()).add(pool.asset_b)
+            graph.setdefault(pool.asset_b, set()).add(pool.asset_a)
+        return graph
+
+    def _book_levels(self, source, target):
+        """Offers selling target for source as (target per source, target available) levels"""
+        # Same freshness rule as _neighbours, so no hop is priced off a stale book
+        book = self.order_book_service.get_book(source, target, max_age=self.max_age)
+        if book is not None:
+            # Bids on source/target pay target, amounts quoted in target
+            return book.bids
+        book = self.order_book_service.get_book(target, source, max_age=self.max_age)
+        if book is not None:
+            # Asks on target/source sell target at a price in source
+            return [(1 / price, amount) for price, amount in book.asks if price > 0]
+        return []
+
+    def _book_send(self, source, target, send_stroops):
+        remaining = send_stroops / STROOPS_PER_UNIT
+        received = 0.0
+        for rate, available in self._book_levels(source, target):
+            cost = available / rate
+            if remaining <= cost:
+                return int(received * STROOPS_PER_UNIT + remaining * rate * STROOPS_PER_UNIT) or None
+            received += available
+            remaining -= cost
+        return None
+
+    def _book_receive(self, source, target, receive_stroops):
+        needed = receive_stroops / STROOPS_PER_UNIT
+        paid = 0.0
+        for rate, available in self._book_levels(source, target):
+            if needed <= available:
+                return math.ceil((paid + needed / rate) * STROOPS_PER_UNIT)
+            paid += available / rate
+            needed -= available
+        return None
+
+    def _book_send_array(self, source, target, send_stroops):
+        levels = self._book_levels(source, target)
+        if not levels:
+            return np.full(send_stroops.shape, np.nan)
+        rates, available = np.array(levels, dtype=np.float64).T
+        # Received as a piecewise-linear function of the amount sold
+        cost = np.concatenate(([0.0], np.cumsum(available / rates)))
+        received = np.concatenate(([0.0], np.cumsum(available)))
+        units = send_stroops / STROOPS_PER_UNIT
+        filled = np.floor(np.interp(units, cost, received) * STROOPS_PER_UNIT)
+        return np.where(units <= cost[-1], filled, np.nan)
+
+    def hop_send_array(self, source, target, send_stroops):
+        """
+        hop_send for many amounts at once
+
+        Each amount takes the better venue on its own, as Core would.
+
+        Returns:
+            numpy.ndarray: Stroops of target received (NaN where liquidity runs out)
+        """
+        send_stroops = np.asarray(send_stroops, dtype=np.float64)
+        book = self._book_send_array(source, target, send_stroops)
+        pool = self.liquidity_pool_service.get_pool(source, target, max_age=self.max_age)
+        if pool is None:
+            return book
+        return np.fmax(book, pool.quote_send_array(source, send_stroops))
+
+    def hop_send(self, source, target, send_stroops):
+        """(stroops of target received, venue) for one hop, or (None, None)"""
+        book = self._book_send(source, target, send_stroops)
+        pool = self.liquidity_pool_service.get_pool(source, target, max_age=self.max_age)
+        pooled = pool.quote_send(source, send_stroops) if pool is not None else None
+        if pooled is not None and (book is None or pooled > book):
+            return pooled, 'pool'
+        return (book, 'book') if book is not None else (None, None)
+
+    def hop_receive(self, source, target, receive_stroops):
+        """(stroops of source needed, venue) for one hop, or (None, None)"""
+        book = self._book_receive(source, target, receive_stroops)
+        pool = self.liquidity_pool_service.get_pool(source, target, max_age=self.max_age)
+        pooled = pool.quote_receive(source, receive_stroops) if pool is not None else None
+        if pooled is not None and (book is None or pooled < book):
+            return pooled, 'pool'
+        return (book, 'book') if book is not None else (None, None)
+
+    @metrics_service.timed('local_path_send')
+    def strict_send(self, source_asset, destination_asset, send_stroops):
+        """
+        Best path to deliver the most destination asset for a fixed send
+
+        Returns:
+            PathQuote: Best path found, or None if the assets are not connected
+        """
+        graph = self._neighbours()
+        best = {source_asset: send_stroops}
+        frontier = {source_asset: (send_stroops, [], [])}
+        result = None
+        for depth in range(self.max_hops + 1):
+            next_frontier = {}
+            for asset, (amount, path, venues) in frontier.items():
+                for target in graph.get(asset, ()):
+                    if target == source_asset or target in path:
+                        continue
+                    received, venue = self.hop_send(asset, target, amount)
+                    if received is None:
+                        continue
+                    if target == destination_asset:
+                        if result is None or received > result[0]:
+                            result = (received, path, venues + [venue])
+                    elif depth < self.max_hops and received > best.get(target, 0):
+                        best[target] = received
+                        next_frontier[target] = (received, path + [target], venues + [venue])
+            frontier = next_frontier
+            if not frontier:
+                break
+        if result is None:
+            return None
+        return PathQuote(source_asset, destination_asset, send_stroops, *result)
+
+    @metrics_service.timed('local_path_receive')
+    def strict_receive(self, source_asset, destination_asset, receive_stroops):
+        """
+        Best path to deliver a fixed destination amount for the least source asset
+
+        Returns:
+            PathQuote: Best path found, or None if the assets are not connected
+        """
+        graph = self._neighbours()
+        best = {destination_asset: receive_stroops}
+        frontier = {destination_asset: (receive_stroops, [], [])}
+        result = None
+        for depth in range(self.max_hops + 1):
+            next_frontier = {}
+            for asset, (amount, path, venues) in frontier.items():
+                for origin in graph.get(asset, ()):
+                    if origin == destination_asset or origin in path:
+                        continue
+                    needed, venue = self.hop_receive(origin, asset, amount)
+                    if needed is None:
+                        continue
+                    if origin == source_asset:
+                        if result is None or needed < result[0]:
+                            result = (needed, path, [venue] + venues)
+                    elif depth < self.max_hops and needed < best.get(origin, math.inf):
+                        best[origin] = needed
+                        next_frontier[origin] = (needed, [origin] + path, [venue] + venues)
+            frontier = next_frontier
+            if not frontier:
+                break
+        if result is None:
+            return None
+        needed, path, venues = result
+        return PathQuote(source_asset, destination_asset, needed, receive_stroops, path, venues)
+
+__all__ = ['PathQuote', 'LocalPathFinder']
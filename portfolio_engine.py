@@ -0,0 +1,157 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from core.async_pipeline import AsyncPipeline
+from core.etf_manager import ETFManager
+from services.stellar_service import StellarService, stellar_service
+from services.market_data_service import market_data_service
+from services.logging_service import logging_service
+from services.metrics_service import metrics_service
+from config.config import Config
+
+class Portfolio:
+    """One managed account with its strategy state and fair-share accounting"""
+
+    def __init__(self, name, manager, weight=1.0):
+        self.name = name
+        self.manager = manager
+        self.weight = weight
+        self.virtual_time = 0.0
+        self.ticks = 0
+        self.skipped = 0
+        self.last_duration = 0.0
+        self.future = None
+
+    @property
+    def busy(self):
+        return self.future is not None and not self.future.done()
+
+class MultiPortfolioEngine:
+    """
+    Runs many ETF portfolios on shared infrastructure.
+
+    Each portfolio has its own keypair, StellarService (sequence manager,
+    channel pool, account tracker) and allocation table. The Horizon client,
+    async pipeline, market-data and order-book services, path cache and
+    asset registry are shared. Every round (one ledger close) refreshes the
+    shared price snapshot once for the union of all baskets, then dispatches
+    idle portfolios to a bounded worker pool in fair-queueing order: least
+    weighted service time first. A portfolio whose previous tick is still
+    running is skipped for the round instead of being queued twice.
+    """
+
+    def __init__(self, portfolio_specs, workers=Config.PORTFOLIO_WORKERS,
+                 deadline=Config.SCHEDULER_TICK_DEADLINE):
+        """
+        Args:
+            portfolio_specs (list): Entries from Config.load_portfolios
+            workers (int): Portfolios ticking concurrently
+            deadline (float): Seconds a round waits for its ticks
+        """
+        self.deadline = deadline
+        self.async_pipeline = AsyncPipeline(stellar_service)
+        self.portfolios = []
+        self.rounds = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='portfolio')
+        for spec in portfolio_specs:
+            self.add_portfolio(spec)
+
+    def add_portfolio(self, spec):
+        """Create a portfolio from a spec and add it to the rotation"""
+        service = StellarService(
+            secret_key=spec['secret_key'],
+            channel_secret_keys=spec.get('channel_secret_keys', []),
+            server=stellar_service.server
+        )
+        manager = ETFManager(
+            Config.NETWORK_PASSPHRASE, Config.HORIZON_SERVER,
+            stellar_network=service,
+            target_allocations=spec['allocations'],
+            async_pipeline=self.async_pipeline
+        )
+        portfolio = Portfolio(spec['name'], manager, spec.get('weight', 1.0))
+        with self._lock:
+            # Join at the current minimum so a newcomer neither starves nor is starved
+            portfolio.virtual_time = min((p.virtual_time for p in self.portfolios), default=0.0)
+            self.portfolios.append(portfolio)
+        logging_service.info("Portfolio %s added for account %s", portfolio.name, service.public_key)
+        return portfolio
+
+    @property
+    def price_assets(self):
+        """Union of every portfolio's basket"""
+        assets = {}
+        for portfolio in self.portfolios:
+            assets.update(dict.fromkeys(portfolio.manager.target_allocations))
+        return list(assets)
+
+    def start(self):
+        """Start the per-account effects streams"""
+        for portfolio in self.portfolios:
+            portfolio.manager.stellar_network.account_tracker.start()
+        logging_service.info(f"Multi-portfolio engine started with {len(self.portfolios)} portfolios")
+
+    def stop(self):
+        for portfolio in self.portfolios:
+            portfolio.manager.stellar_network.account_tracker.stop()
+            portfolio.manager.stellar_network.submission_pipeline.stop()
+        self._executor.shutdown(wait=False)
+        self.async_pipeline.close()
+
+    def _run_portfolio(self, portfolio):
+        started = time.perf_counter()
+        try:
+            portfolio.manager.execute_etf_strategy()
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics_service.observe('portfolio_tick', elapsed)
+            with self._lock:
+                portfolio.ticks += 1
+                portfolio.last_duration = elapsed
+                portfolio.virtual_time += elapsed / portfolio.weight
+
+    def run_round(self):
+        """Tick every idle portfolio once, waiting up to the deadline"""
+        self.rounds += 1
+        try:
+            market_data_service.get_price_snapshot(self.price_assets)
+        except Exception as e:
+            logging_service.warning(f"Shared price refresh failed: {str(e)}")
+
+        with self._lock:
+            ready = []
+            for portfolio in self.portfolios:
+                if portfolio.busy:
+                    portfolio.skipped += 1
+                else:
+                    ready.append(portfolio)
+            ready.sort(key=lambda p: p.virtual_time)
+
+        # The pool runs submissions in order, so the least-served go first
+        futures = []
+        for portfolio in ready:
+            portfolio.future = self._executor.submit(self._run_portfolio, portfolio)
+            futures.append(portfolio.future)
+
+        _, not_done = wait(futures, timeout=self.deadline)
+        if not_done:
+            logging_service.warning(
+                f"{len(not_done)} of {len(futures)} portfolio ticks still running after {self.deadline}s"
+            )
+
+    def stats(self):
+        return {
+            'rounds': self.rounds,
+            'portfolios': {
+                p.name: {
+                    'ticks': p.ticks,
+                    'skipped': p.skipped,
+                    'last_duration': p.last_duration,
+                    'virtual_time': p.virtual_time
+                }
+                for p in self.portfolios
+            }
+        }
+
+__all__ = ['Portfolio', 'MultiPortfolioEngine']
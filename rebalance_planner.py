@@ -0,0 +1,309 @@
+import numpy as np
+from services.logging_service import logging_service
+from models.stroop_amount import STROOPS_PER_UNIT, StroopAmount, to_stroops_array
+from config.config import Config
+
+class RebalancePlan:
+    """Rebalance legs with their estimated cost, ready for batched submission"""
+
+    def __init__(self, legs, total_cost, fee_cost):
+        self.legs = legs
+        self.total_cost = total_cost
+        self.fee_cost = fee_cost
+
+    def __len__(self):
+        return len(self.legs)
+
+    def batches(self, size):
+        """Legs grouped into transactions of at most size operations"""
+        return [self.legs[i:i + size] for i in range(0, len(self.legs), size)]
+
+class RebalancePlanner:
+    """
+    Plans rebalance legs as a min-cost flow over the asset graph.
+
+    Over-allocated assets supply value (as a fraction of the portfolio) and
+    under-allocated assets demand it. Every (source, destination) pair has
+    two parallel arcs: a shallow arc whose capacity is the value resting on
+    the top of that pair's order book, priced at the spread against the
+    reference price ratio, and an uncapacitated deep arc carrying an extra
+    depth penalty. Pairs without a fresh book use a flat unquoted cost.
+    Successive shortest augmenting paths (vectorized label correcting over
+    the bipartite residual graph) give the cheapest flow.
+
+    Every leg also pays a fixed network fee, which a flow cost cannot
+    express, so a second pass cancels flow around cycles of legs whenever
+    the extra spread costs less than the fees of the legs it removes. Legs
+    without cycles form a forest of at most m + n - 1 edges; a plan is only
+    larger where splitting is cheaper than the fees saved.
+    """
+
+    def __init__(self, order_book_service, unquoted_cost=Config.REBALANCE_UNQUOTED_COST,
+                 depth_penalty=Config.REBALANCE_DEPTH_PENALTY,
+                 fee_stroops=Config.MAX_TRANSACTION_FEE, max_age=Config.ORDER_BOOK_MAX_AGE):
+        self.order_book_service = order_book_service
+        self.unquoted_cost = unquoted_cost
+        self.depth_penalty = depth_penalty
+        self.fee_stroops = fee_stroops
+        self.max_age = max_age
+
+    def _edge_costs(self, sources, sinks, prices, total_value):
+        """
+        Shallow arc cost and capacity, and deep arc cost, per (source, sink)
+
+        Returns:
+            tuple: (shallow_cost, shallow_capacity, deep_cost) m x n arrays,
+                costs as fractions of traded value, capacity as portfolio weight
+        """
+        m, n = len(sources), len(sinks)
+        shallow_cost = np.full((m, n), self.unquoted_cost)
+        capacity = np.zeros((m, n))
+        for i, source in enumerate(sources):
+            for j, sink in enumerate(sinks):
+                rate = self.order_book_service.get_rate(source, sink, self.max_age)
+                if not rate:
+                    continue
+                reference = prices[source] / prices[sink]
+                shallow_cost[i, j] = max(1.0 - rate / reference, 0.0)
+                capacity[i, j] = self._depth_value(source, sink, prices) / total_value
+        return shallow_cost, capacity, shallow_cost + self.depth_penalty
+
+    def _depth_value(self, source, sink, prices):
+        """Value resting on the side of the book that buys source for sink"""
+        book = self.order_book_service.get_book(source, sink, self.max_age)
+        if book is not None:
+            # Bid amounts are quoted in the counter (sink) asset
+            return book.depth('bids') * prices[sink]
+        book = self.order_book_service.get_book(sink, source, self.max_age)
+        if book is not None:
+            # Asks of the reverse book sell the sink asset
+            return book.depth('asks') * prices[sink]
+        return 0.0
+
+    @staticmethod
+    def _solve(supply, demand, shallow_cost, capacity, deep_cost):
+        """
+        Successive shortest path min-cost flow on the bipartite network
+
+        Returns:
+            tuple: (shallow_flow, deep_flow) m x n arrays
+        """
+        m, n = shallow_cost.shape
+        supply = supply.astype(float).copy()
+        demand = demand.astype(float).copy()
+        shallow_flow = np.zeros((m, n))
+        deep_flow = np.zeros((m, n))
+        rows = np.arange(m)
+        epsilon = 1e-12
+
+        while supply.sum() > epsilon and demand.sum() > epsilon:
+            # Best residual arc in each direction between every pair
+            shallow_open = capacity - shallow_flow > epsilon
+            forward = np.where(shallow_open, shallow_cost, deep_cost)
+            backward = np.where(deep_flow > epsilon, -deep_cost,
+                                np.where(shallow_flow > epsilon, -shallow_cost, np.inf))
+
+            origin = np.where(supply > epsilon, 0.0, np.inf)
+            dist_source = origin.copy()
+            pred_source = np.full(m, -1)
+            for _ in range(m + n + 1):
+                through = dist_source[:, None] + forward
+                pred_sink = through.argmin(axis=0)
+                dist_sink = through[pred_sink, np.arange(n)]
+
+                back = dist_sink[None, :] + backward
+                back_sink = back.argmin(axis=1)
+                back_dist = back[rows, back_sink]
+                improved = back_dist < dist_source - epsilon
+                if not improved.any():
+                    break
+                dist_source = np.where(improved, back_dist, dist_source)
+                pred_source = np.where(improved, back_sink, pred_source)
+
+            open_sinks = np.where(demand > epsilon, dist_sink, np.inf)
+            sink = int(open_sinks.argmin())
+            if not np.isfinite(open_sinks[sink]):
+                break
+
+            # Trace the augmenting path back to the super source
+            path = []
+            j = sink
+            while True:
+                i = int(pred_sink[j])
+                path.append(('forward', i, j))
+                if pred_source[i] < 0:
+                    break
+                j = int(pred_source[i])
+                path.append(('backward', i, j))
+                if len(path) > 2 * (m + n):
+                    raise RuntimeError("Rebalance planner failed to trace an augmenting path")
+            start = path[-1][1]
+
+            amount = min(supply[start], demand[sink])
+            for direction, i, j in path:
+                if direction == 'forward' and shallow_open[i, j]:
+                    amount = min(amount, capacity[i, j] - shallow_flow[i, j])
+                elif direction == 'backward':
+                    amount = min(amount, deep_flow[i, j] if deep_flow[i, j] > epsilon else shallow_flow[i, j])
+
+            for direction, i, j in path:
+                if direction == 'forward':
+                    if shallow_open[i, j]:
+                        shallow_flow[i, j] += amount
+                    else:
+                        deep_flow[i, j] += amount
+                elif deep_flow[i, j] > epsilon:
+                    deep_flow[i, j] -= amount
+                else:
+                    shallow_flow[i, j] -= amount
+            supply[start] -= amount
+            demand[sink] -= amount
+
+        return shallow_flow, deep_flow
+
+    @staticmethod
+    def _merge_legs(flow, shallow_cost, capacity, deep_cost, leg_fee):
+        """
+        Cancel flow around cycles of legs where the fees saved outweigh the spread
+
+        Pushing flow one way around a cycle of legs keeps every supply and
+        demand met; pushed until a leg empties, it removes that leg. Legs
+        are tried smallest first, each against the cycle closed by the
+        other legs, and a push is kept when its cost change is at most
+        leg_fee per removed leg.
+
+        Args:
+            flow (numpy.ndarray): m x n total flow per pair, as portfolio weight
+            leg_fee (float): Network fee of one leg, as portfolio weight
+
+        Returns:
+            numpy.ndarray: Merged flow
+        """
+        flow = flow.copy()
+        epsilon = 1e-12
+
+        def pair_cost(f, i, j):
+            # Shallow arc first, the rest at the deep cost, as _solve fills them
+            shallow = min(f, capacity[i, j])
+            return shallow * shallow_cost[i, j] + (f - shallow) * deep_cost[i, j]
+
+        def closing_path(i, j, support):
+            # Breadth-first from sink j back to source i without the (i, j) leg
+            previous = {('sink', j): None}
+            queue = [('sink', j)]
+            for side, node in queue:
+                if side == 'sink':
+                    neighbours = [('source', s) for s in np.flatnonzero(support[:, node]) if s != i or node != j]
+                else:
+                    neighbours = [('sink', t) for t in np.flatnonzero(support[node, :])]
+                for neighbour in neighbours:
+                    if neighbour in previous:
+                        continue
+                    previous[neighbour] = (side, node)
+                    if neighbour == ('source', i):
+                        path = [neighbour]
+                        while previous[path[-1]] is not None:
+                            path.append(previous[path[-1]])
+                        return path[::-1]
+                    queue.append(neighbour)
+            return None
+
+        tried = set()
+        while True:
+            support = flow > epsilon
+            candidates = [(flow[i, j], i, j) for i, j in zip(*np.nonzero(support)) if (i, j) not in tried]
+            if not candidates:
+                return flow
+            _, i, j = min(candidates)
+            tried.add((i, j))
+            path = closing_path(i, j, support)
+            if path is None:
+                continue
+
+            # Legs alternate in sign: (i, j), then each hop of the closing path
+            edges = [(i, j)]
+            for (side, a), (_, b) in zip(path, path[1:]):
+                edges.append((b, a) if side == 'sink' else (a, b))
+            current = [flow[a, b] for a, b in edges]
+            before = sum(pair_cost(f, a, b) for f, (a, b) in zip(current, edges))
+
+            best = None
+            for direction in (1, -1):
+                signs = [direction if k % 2 == 0 else -direction for k in range(len(edges))]
+                theta = min(f for f, sign in zip(current, signs) if sign < 0)
+                after = sum(pair_cost(f + sign * theta, a, b) for f, sign, (a, b) in zip(current, signs, edges))
+                removed = sum(1 for f, sign in zip(current, signs) if sign < 0 and f - theta <= epsilon)
+                saving = removed * leg_fee - (after - before)
+                if best is None or saving > best[0]:
+                    best = (saving, signs, theta)
+
+            saving, signs, theta = best
+            if saving >= -epsilon:
+                for sign, (a, b) in zip(signs, edges):
+                    flow[a, b] = max(flow[a, b] + sign * theta, 0.0)
+                # The support changed, so earlier legs may close new cycles
+                tried.clear()
+
+    def plan(self, asset_codes, drift, flagged, prices, total_value):
+        """
+        Plan rebalance legs for the flagged assets of a valuation analysis
+
+        Args:
+            asset_codes (list): Asset codes aligned with the arrays
+            drift (numpy.ndarray): Current minus target weight per asset
+            flagged (numpy.ndarray): Assets outside tolerance
+            prices (numpy.ndarray): Price per asset
+            total_value (float): Portfolio value
+
+        Returns:
+            RebalancePlan: Legs as {'source_asset', 'destination_asset',
+                'amount' (StroopAmount of the source asset), 'value', 'cost', 'source_pct',
+                'dest_pct'} dicts, largest legs first
+        """
+        over = np.flatnonzero(flagged & (drift > 0))
+        under = np.flatnonzero(flagged & (drift < 0))
+        if not len(over) or not len(under) or total_value <= 0:
+            return RebalancePlan([], 0.0, 0.0)
+
+        sources = [asset_codes[i] for i in over]
+        sinks = [asset_codes[i] for i in under]
+        price_map = {asset_codes[i]: float(prices[i]) for i in np.concatenate([over, under])}
+        shallow_cost, capacity, deep_cost = self._edge_costs(sources, sinks, price_map, total_value)
+        shallow_flow, deep_flow = self._solve(drift[over], -drift[under], shallow_cost, capacity, deep_cost)
+
+        xlm_price = float(prices[asset_codes.index('XLM')]) if 'XLM' in asset_codes else 0.0
+        leg_fee = self.fee_stroops / STROOPS_PER_UNIT * xlm_price
+        flow = self._merge_legs(shallow_flow + deep_flow, shallow_cost, capacity, deep_cost, leg_fee / total_value)
+        shallow_flow = np.minimum(flow, capacity)
+        deep_flow = flow - shallow_flow
+
+        # Leg sizes in source-asset stroops, all pairs at once
+        source_prices = np.array([price_map[code] for code in sources])
+        amounts = to_stroops_array(flow * total_value / source_prices[:, None])
+        costs = (shallow_flow * shallow_cost + deep_flow * deep_cost) * total_value
+
+        legs = []
+        total_cost = 0.0
+        for i, j in zip(*np.nonzero(amounts >= 1)):
+            weight = flow[i, j]
+            cost = float(costs[i, j])
+            total_cost += cost
+            legs.append({
+                'source_asset': sources[i],
+                'destination_asset': sinks[j],
+                'amount': StroopAmount(amounts[i, j]),
+                'value': weight * total_value,
+                'cost': cost,
+                'source_pct': str(float(drift[over[i]])),
+                'dest_pct': str(float(-drift[under[j]]))
+            })
+        legs.sort(key=lambda leg: leg['value'], reverse=True)
+
+        fee_cost = len(legs) * leg_fee
+        logging_service.info(
+            "Rebalance plan: %d legs for %d sources / %d sinks, est. cost %.4f (+ fees %.4f)",
+            len(legs), len(sources), len(sinks), total_cost, fee_cost
+        )
+        return RebalancePlan(legs, total_cost + fee_cost, fee_cost)
+
+__all__ = ['RebalancePlan', 'RebalancePlanner']
@@ -0,0 +1,366 @@
+"""
+Faster-than-real-time backtests from recorded market data.
+
+Loads segments written by services.market_recorder and replays them ledger by
+ledger against a simulated ledger clock: recorded prices are served to
+MarketDataService through a replay price source, recorded order books and
+liquidity pool reserves are loaded into order_book_service and
+liquidity_pool_service under the simulated clock, balances are fed to
+StellarService.get_portfolio_composition and the ValuationEngine, and
+ArbitrageEngine scans every ledger. Rebalance legs are filled at recorded
+strict-send quote rates (falling back to book, then price ratios) instead of
+being submitted, so a grid of ARBITRAGE_THRESHOLD / ALLOCATION_TOLERANCE
+settings can be compared over long histories without touching the network.
+
+Usage:
+    python -m benchmarks.replay recordings --thresholds 0.002,0.005,0.01 --tolerances 0.01,0.02,0.05
+"""
+import argparse
+import itertools
+import json
+import logging
+import time
+import numpy as np
+
+# Stellar targets a ledger close roughly every five seconds
+LEDGER_INTERVAL = 5.0
+
+STROOPS_PER_XLM = 10 ** 7
+
+class SimulatedLedgerClock:
+    """Time source that only moves when a recorded ledger is replayed"""
+
+    def __init__(self):
+        self.ledger = 0
+        self.close_time = 0.0
+
+    def advance(self, ledger, close_time):
+        self.ledger = ledger
+        self.close_time = close_time
+
+    def time(self):
+        return self.close_time
+
+class MarketReplay:
+    """Recorded market tables sliced into per-ledger frames"""
+
+    def __init__(self, recording):
+        """
+        Args:
+            recording (dict): Output of services.market_recorder.load_segments
+        """
+        self.recording = recording
+        self.strings = recording['strings']
+        ledgers = recording['ledgers']
+        if len(ledgers):
+            sequences, first = np.unique(ledgers['ledger'], return_index=True)
+            close_times = ledgers['close_time'][first]
+        else:
+            # Recorded without a ledger stream: derive ledgers from the data itself
+            sequences = np.unique(np.concatenate([
+                recording[name]['ledger'] for name in ('balances', 'prices', 'books', 'pools', 'quotes')
+            ]))
+            close_times = sequences.astype('f8') * LEDGER_INTERVAL
+        self.sequences = sequences
+        self.close_times = close_times
+
+    def __len__(self):
+        return len(self.sequences)
+
+    def _bounds(self, name):
+        """Start/end row of each replayed ledger in one ledger-sorted table"""
+        column = self.recording[name]['ledger']
+        return (np.searchsorted(column, self.sequences, 'left'),
+                np.searchsorted(column, self.sequences, 'right'))
+
+    def frames(self):
+        """
+        Yield one dict per ledger with the data recorded during it
+
+        Frames hold 'ledger', 'close_time', 'balances' and 'prices'
+        (code -> value), 'books' ((selling, buying) -> (bids, asks)),
+        'pools' ((asset_a, asset_b) -> (reserve_a, reserve_b, fee_bp)) and
+        'quotes' ((source, destination) -> rate). Tables without records for
+        a ledger yield empty dicts; carrying state forward is up to the caller.
+        """
+        strings = self.strings
+        bounds = {name: self._bounds(name) for name in ('balances', 'prices', 'books', 'pools', 'quotes')}
+        balances = self.recording['balances']
+        prices = self.recording['prices']
+        books = self.recording['books']
+        pools = self.recording['pools']
+        quotes = self.recording['quotes']
+
+        for i, ledger in enumerate(self.sequences):
+            rows = balances[bounds['balances'][0][i]:bounds['balances'][1][i]]
+            frame_balances = {strings[a]: float(b) for a, b in zip(rows['asset'], rows['balance'])}
+
+            rows = prices[bounds['prices'][0][i]:bounds['prices'][1][i]]
+            frame_prices = {strings[a]: float(p) for a, p in zip(rows['asset'], rows['price'])}
+
+            frame_books = {}
+            rows = books[bounds['books'][0][i]:bounds['books'][1][i]]
+            for row in rows[np.lexsort((rows['level'], rows['side']))]:
+                pair = (strings[row['selling']], strings[row['buying']])
+                bids, asks = frame_books.setdefault(pair, ([], []))
+                (bids if row['side'] == 0 else asks).append((float(row['price']), float(row['amount'])))
+
+            rows = pools[bounds['pools'][0][i]:bounds['pools'][1][i]]
+            frame_pools = {
+                (strings[row['asset_a']], strings[row['asset_b']]):
+                    (int(row['reserve_a']), int(row['reserve_b']), int(row['fee_bp']))
+                for row in rows
+            }
+
+            rows = quotes[bounds['quotes'][0][i]:bounds['quotes'][1][i]]
+            frame_quotes = {
+                (strings[row['source']], strings[row['destination']]): row['dest_amount'] / row['send_amount']
+                for row in rows if row['send_amount'] > 0
+            }
+
+            yield {
+                'ledger': int(ledger),
+                'close_time': float(self.close_times[i]),
+                'balances': frame_balances,
+                'prices': frame_prices,
+                'books': frame_books,
+                'pools': frame_pools,
+                'quotes': frame_quotes
+            }
+
+class ReplayBacktest:
+    """
+    Runs the strategy's decision path over a MarketReplay for one setting pair.
+
+    The shared service singletons are pointed at the replay (price sources,
+    clocks, order books) for the duration of run() and restored afterwards.
+    """
+
+    def __init__(self, replay, manager, fee_stroops, arbitrage_notional=100.0):
+        """
+        Args:
+            replay (MarketReplay): Recorded history
+            manager (ETFManager): Supplies the allocation targets, the
+                rebalance planner and the ArbitrageEngine
+            fee_stroops (int): Fee charged per operation
+            arbitrage_notional (float): Value assumed traded around each
+                detected arbitrage cycle the engine could not size
+        """
+        self.replay = replay
+        self.manager = manager
+        self.fee_stroops = fee_stroops
+        self.arbitrage_notional = arbitrage_notional
+
+    def run(self, threshold, tolerance):
+        from core.valuation_engine import ValuationEngine
+        from services.market_data_service import market_data_service, PriceSource
+        from services.order_book_service import order_book_service, OrderBook
+        from services.liquidity_pool_service import liquidity_pool_service, LiquidityPool
+        from services.path_cache import path_cache
+        from services.stellar_service import stellar_service
+
+        class ReplayPriceSource(PriceSource):
+            def __init__(self, name):
+                super().__init__(name)
+                self.prices = {}
+
+            def supported(self, assets):
+                return [asset for asset in assets if asset in self.prices]
+
+            def fetch(self, assets, timeout):
+                return {asset: self.prices[asset] for asset in assets if asset in self.prices}
+
+        clock = SimulatedLedgerClock()
+        source = ReplayPriceSource('replay')
+        saved = (market_data_service.price_sources, market_data_service.clock,
+                 order_book_service.books, order_book_service.clock,
+                 liquidity_pool_service.pools, liquidity_pool_service.clock)
+        market_data_service.price_sources = [source]
+        market_data_service.clock = clock.time
+        market_data_service.clear_cache()
+        order_book_service.clock = clock.time
+        order_book_service.books = {}
+        liquidity_pool_service.clock = clock.time
+        liquidity_pool_service.pools = {}
+        path_cache.clear()
+        arbitrage_engine = self.manager.arbitrage_engine
+        saved_fee = arbitrage_engine.fee_stroops
+        # Size cycles at the fee the backtest charges for them
+        arbitrage_engine.fee_stroops = self.fee_stroops
+
+        targets = self.manager.target_allocations
+        assets = list(targets)
+        valuation = ValuationEngine(targets)
+        self.manager.valuation_engine = valuation
+
+        balances = None
+        quotes = {}
+        result = {
+            'threshold': threshold,
+            'tolerance': tolerance,
+            'ledgers': 0,
+            'rebalance_ticks': 0,
+            'legs': 0,
+            'turnover': 0.0,
+            'fees_xlm': 0.0,
+            'tracking_error': 0.0,
+            'start_value': None,
+            'final_value': 0.0,
+            'arbitrage_opportunities': 0,
+            'arbitrage_expected_profit': 0.0
+        }
+        started = time.perf_counter()
+        try:
+            for frame in self.replay.frames():
+                clock.advance(frame['ledger'], frame['close_time'])
+                path_cache.on_ledger_close(frame['ledger'])
+                source.prices.update(frame['prices'])
+                quotes.update(frame['quotes'])
+                if frame['books']:
+                    books = dict(order_book_service.books)
+                    for (selling, buying), (bids, asks) in frame['books'].items():
+                        books[(selling, buying)] = OrderBook(selling, buying, bids, asks, clock.time())
+                    order_book_service.books = books
+                if frame['pools']:
+                    pools = dict(liquidity_pool_service.pools)
+                    for (asset_a, asset_b), (reserve_a, reserve_b, fee_bp) in frame['pools'].items():
+                        pools[tuple(sorted((asset_a, asset_b)))] = LiquidityPool(
+                            None, asset_a, asset_b, reserve_a, reserve_b, fee_bp, clock.time()
+                        )
+                    liquidity_pool_service.pools = pools
+
+                # Simulated holdings start from the first recorded balances
+                if balances is None:
+                    if not frame['balances']:
+                        continue
+                    balances = dict(frame['balances'])
+
+                market_prices = market_data_service.get_current_prices(assets)
+                account_details = {
+                    'sequence': '0',
+                    'balances': [
+                        {'asset_type': 'native', 'balance': str(amount)} if code == 'XLM'
+                        else {'asset_type': 'credit_alphanum4' if len(code) <= 4 else 'credit_alphanum12',
+                              'asset_code': code, 'balance': str(amount)}
+                        for code, amount in balances.items()
+                    ]
+                }
+                current_portfolio = stellar_service.get_portfolio_composition(account_details, market_prices)
+                self.manager._update_valuation(account_details, market_prices)
+                analysis = valuation.analyze(tolerance)
+                result['ledgers'] += 1
+                result['tracking_error'] += float(np.abs(analysis['drift']).sum()) / 2
+                if result['start_value'] is None:
+                    result['start_value'] = analysis['total_value']
+
+                operations = 0
+                pairs = self.manager._calculate_rebalance_pairs(analysis) if analysis['flagged'].any() else []
+                for pair in pairs:
+                    source_code, dest_code = pair['source_asset'], pair['destination_asset']
+                    amount = min(float(pair['amount']), balances.get(source_code, 0.0))
+                    rate = self._fill_rate(source_code, dest_code, quotes, market_prices, order_book_service)
+                    if amount <= 0 or not rate:
+                        continue
+                    balances[source_code] -= amount
+                    balances[dest_code] = balances.get(dest_code, 0.0) + amount * rate
+                    result['turnover'] += amount * market_prices.get(source_code, 0.0)
+                    operations += 1
+                if operations:
+                    result['rebalance_ticks'] += 1
+                    result['legs'] += operations
+
+                arbitrage_paths = arbitrage_engine.find_profitable_paths(
+                    current_portfolio, threshold=threshold, market_prices=market_prices
+                )
+                for path in arbitrage_paths:
+                    result['arbitrage_opportunities'] += 1
+                    if path.get('profit_value') is not None:
+                        # Sized against the replayed books at its best trade size
+                        result['arbitrage_expected_profit'] += path['profit_value']
+                    else:
+                        result['arbitrage_expected_profit'] += self.arbitrage_notional * path['profit_percentage'] / 100
+                    # The whole cycle is one path-payment operation
+                    operations += 1
+
+                if operations:
+                    fee = operations * self.fee_stroops / STROOPS_PER_XLM
+                    balances['XLM'] = balances.get('XLM', 0.0) - fee
+                    result['fees_xlm'] += fee
+
+            if result['ledgers']:
+                result['tracking_error'] /= result['ledgers']
+                result['final_value'] = valuation.analyze(tolerance)['total_value']
+        finally:
+            (market_data_service.price_sources, market_data_service.clock,
+             order_book_service.books, order_book_service.clock,
+             liquidity_pool_service.pools, liquidity_pool_service.clock) = saved
+            arbitrage_engine.fee_stroops = saved_fee
+            market_data_service.clear_cache()
+            path_cache.clear()
+
+        elapsed = time.perf_counter() - started
+        result['elapsed'] = elapsed
+        result['ledgers_per_sec'] = result['ledgers'] / elapsed if elapsed else 0.0
+        return result
+
+    @staticmethod
+    def _fill_rate(source_code, dest_code, quotes, market_prices, order_book_service):
+        """Units of dest per unit of source: recorded quote, then top of book, then prices"""
+        rate = quotes.get((source_code, dest_code))
+        if rate:
+            return rate
+        rate = order_book_service.get_rate(source_code, dest_code)
+        if rate:
+            return rate
+        source_price = market_prices.get(source_code)
+        dest_price = market_prices.get(dest_code)
+        if source_price and dest_price:
+            return source_price / dest_price
+        return None
+
+def print_results(results):
+    print(f"{'threshold':>10}{'tolerance':>10}{'ledgers':>9}{'legs':>7}{'turnover':>12}"
+          f"{'fees XLM':>10}{'track err':>10}{'final value':>13}{'arb opps':>9}{'arb profit':>11}{'ledgers/s':>11}")
+    for r in results:
+        print(f"{r['threshold']:>10.4f}{r['tolerance']:>10.4f}{r['ledgers']:>9}{r['legs']:>7}"
+              f"{r['turnover']:>12.2f}{r['fees_xlm']:>10.4f}{r['tracking_error']:>10.4f}"
+              f"{r['final_value']:>13.2f}{r['arbitrage_opportunities']:>9}"
+              f"{r['arbitrage_expected_profit']:>11.2f}{r['ledgers_per_sec']:>11.0f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded market data to compare strategy settings")
+    parser.add_argument('recording', help='Directory of market_*.npz segments')
+    parser.add_argument('--thresholds', help='Comma-separated ARBITRAGE_THRESHOLD values')
+    parser.add_argument('--tolerances', help='Comma-separated ALLOCATION_TOLERANCE values')
+    parser.add_argument('--fee', type=int, help='Fee per operation in stroops (default MAX_TRANSACTION_FEE)')
+    parser.add_argument('--arb-notional', type=float, default=100.0,
+                        help='Value assumed traded per detected arbitrage cycle')
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args(argv)
+
+    from config.config import Config
+    from core.etf_manager import ETFManager
+    from services.logging_service import logging_service
+    from services.market_recorder import load_segments
+    logging_service.logger.setLevel(logging.WARNING)
+
+    thresholds = [float(v) for v in args.thresholds.split(',')] if args.thresholds else [Config.ARBITRAGE_THRESHOLD]
+    tolerances = [float(v) for v in args.tolerances.split(',')] if args.tolerances else [Config.ALLOCATION_TOLERANCE]
+
+    replay = MarketReplay(load_segments(args.recording))
+    print(f"Loaded {len(replay)} ledgers from {args.recording}")
+    manager = ETFManager(Config.NETWORK_PASSPHRASE, Config.HORIZON_SERVER)
+    backtest = ReplayBacktest(
+        replay, manager, args.fee if args.fee is not None else Config.MAX_TRANSACTION_FEE, args.arb_notional
+    )
+
+    results = [backtest.run(threshold, tolerance) for threshold, tolerance in itertools.product(thresholds, tolerances)]
+    print_results(results)
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(results, handle, indent=2)
+    return results
+
+if __name__ == '__main__':
+    main()
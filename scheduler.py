@@ -0,0 +1,145 @@
+import threading
+import time
+from services.logging_service import logging_service
+from services.path_cache import path_cache
+from services.market_recorder import market_recorder
+from services.liquidity_pool_service import liquidity_pool_service
+from config.config import Config
+
+class LedgerScheduler:
+    """
+    Event-driven strategy scheduler.
+
+    Ticks are triggered by ledger closes from Horizon's ledger stream and,
+    optionally, by market-data change events. Ticks never overlap: triggers
+    that arrive while a tick is running are either coalesced into a single
+    follow-up tick or skipped, depending on the overrun policy. A tick that
+    runs longer than its deadline is logged as an overrun.
+    """
+
+    def __init__(self, tick, stellar_service, deadline=Config.SCHEDULER_TICK_DEADLINE,
+                 overrun_policy=Config.SCHEDULER_OVERRUN_POLICY,
+                 idle_timeout=Config.SCHEDULER_IDLE_TIMEOUT,
+                 error_backoff=Config.SCHEDULER_ERROR_BACKOFF):
+        if overrun_policy not in ('coalesce', 'skip'):
+            raise ValueError(f"Unknown overrun policy: {overrun_policy}")
+        self.tick = tick
+        self.stellar_service = stellar_service
+        self.deadline = deadline
+        self.overrun_policy = overrun_policy
+        self.idle_timeout = idle_timeout
+        self.error_backoff = error_backoff
+        self.ledger_sequence = None
+        self.ticks = 0
+        self.overruns = 0
+        self.coalesced = 0
+        self.skipped = 0
+        self._pending = 0
+        self._trigger = threading.Condition()
+        self._stop_event = threading.Event()
+        self._ledger_thread = None
+
+    def notify_ledger_close(self, ledger_sequence):
+        """Record a closed ledger and request a tick"""
+        self.ledger_sequence = ledger_sequence
+        path_cache.on_ledger_close(ledger_sequence)
+        market_recorder.on_ledger_close(ledger_sequence)
+        liquidity_pool_service.on_ledger_close(ledger_sequence)
+        self._request_tick()
+
+    def notify_market_change(self, *args):
+        """Request a tick after a market-data change event"""
+        self._request_tick()
+
+    def _request_tick(self):
+        with self._trigger:
+            self._pending += 1
+            self._trigger.notify()
+
+    def start_ledger_stream(self):
+        """Follow Horizon's ledger stream in a background thread"""
+        self._ledger_thread = threading.Thread(
+            target=self._follow_ledgers, name="ledger-stream", daemon=True
+        )
+        self._ledger_thread.start()
+
+    def _follow_ledgers(self):
+        backoff = 1
+        while not self._stop_event.is_set():
+            try:
+                stream = self.stellar_service.server.ledgers().cursor('now').stream()
+                for ledger in stream:
+                    if self._stop_event.is_set():
+                        return
+                    self.notify_ledger_close(int(ledger['sequence']))
+                    backoff = 1
+            except Exception as e:
+                logging_service.warning(f"Ledger stream interrupted: {str(e)}")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def stop(self):
+        self._stop_event.set()
+        with self._trigger:
+            self._trigger.notify_all()
+
+    def run_forever(self):
+        """Run ticks on triggers until stop() is called"""
+        self.start_ledger_stream()
+        logging_service.info(
+            f"Ledger scheduler started (deadline {self.deadline}s, policy {self.overrun_policy})"
+        )
+
+        while not self._stop_event.is_set():
+            with self._trigger:
+                if not self._pending:
+                    # Fall back to a timed tick if the ledger stream goes quiet
+                    self._trigger.wait(self.idle_timeout)
+                if self._stop_event.is_set():
+                    break
+                if self._pending > 1:
+                    self.coalesced += self._pending - 1
+                self._pending = 0
+
+            if not self._run_tick():
+                self._stop_event.wait(self.error_backoff)
+
+    def _run_tick(self):
+        """Run one tick and apply overrun backpressure; returns False on error"""
+        started = time.perf_counter()
+        succeeded = True
+        try:
+            self.tick()
+        except Exception as e:
+            succeeded = False
+            logging_service.error(f"ETF Bot Execution Error: {str(e)}")
+        finally:
+            self.ticks += 1
+            elapsed = time.perf_counter() - started
+
+        if elapsed > self.deadline:
+            self.overruns += 1
+            logging_service.warning(
+                f"Tick at ledger {self.ledger_sequence} overran deadline: "
+                f"{elapsed:.3f}s > {self.deadline}s"
+            )
+            if self.overrun_policy == 'skip':
+                # Drop triggers that queued up behind the slow tick
+                with self._trigger:
+                    self.skipped += self._pending
+                    self._pending = 0
+        else:
+            logging_service.debug(f"Tick at ledger {self.ledger_sequence} took {elapsed:.3f}s")
+
+        return succeeded
+
+    def stats(self):
+        return {
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'coalesced': self.coalesced,
+            'skipped': self.skipped,
+            'ledger_sequence': self.ledger_sequence
+        }
+
+__all__ = ['LedgerScheduler']
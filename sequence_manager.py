@@ -0,0 +1,93 @@
+import threading
+from stellar_sdk import Account
+from services.logging_service import logging_service
+from services.metrics_service import metrics_service
+
+class SequenceManager:
+    """
+    Local sequence-number tracker for a single Stellar source account.
+
+    The account sequence is loaded from Horizon once and then handed out
+    locally, so building a transaction does not need a load_account round
+    trip. A submission rejected before the ledger (tx_bad_seq and other
+    result codes) invalidates the local value and the next caller resyncs.
+    Timeouts and lost responses keep it: the transaction may still be
+    pending on its sequence number, which Horizon does not report yet.
+    """
+
+    def __init__(self, server, account_id):
+        self.server = server
+        self.account_id = account_id
+        self._sequence = None
+        self._lock = threading.Lock()
+
+    def resync(self):
+        """Reload the current sequence number from Horizon"""
+        with self._lock:
+            self._load()
+        return self._sequence
+
+    def invalidate(self):
+        """Force the next caller to reload the sequence from Horizon"""
+        with self._lock:
+            self._sequence = None
+
+    def next_account(self):
+        """
+        Reserve the next sequence number
+
+        Returns:
+            Account: Source account whose sequence is one below the reserved
+                number, ready for TransactionBuilder (which increments it)
+        """
+        with self._lock:
+            if self._sequence is None:
+                self._load()
+            account = Account(self.account_id, self._sequence)
+            self._sequence += 1
+            return account
+
+    def next_sequence(self):
+        """Reserve the next sequence number and return it as the transaction's seq_num"""
+        with self._lock:
+            if self._sequence is None:
+                self._load()
+            self._sequence += 1
+            return self._sequence
+
+    def handle_submit_error(self, error):
+        """
+        Update local state after a failed submission
+
+        A transaction that reached the ledger and failed (tx_failed) still
+        consumes its sequence. Without a result code (504, timeout, transport
+        error) it may still be pending, and resyncing would hand its number
+        out again. tx_insufficient_fee leaves it to be fee bumped on the same
+        number. Any other result code is a definite rejection, so resync.
+        """
+        result_code = self.get_transaction_result_code(error)
+        if result_code in (None, 'tx_failed', 'tx_insufficient_fee'):
+            return
+        if result_code == 'tx_bad_seq':
+            logging_service.warning(f"Sequence out of sync for {self.account_id}, resyncing")
+        self.invalidate()
+
+    @staticmethod
+    def get_transaction_result_code(error):
+        """Extract the Horizon transaction result code from a submission error"""
+        extras = getattr(error, 'extras', None) or {}
+        return extras.get('result_codes', {}).get('transaction')
+
+    def _load(self):
+        """Fetch the sequence from Horizon; caller must hold the lock"""
+        try:
+            with metrics_service.horizon_call('account'):
+                response = self.server.accounts().account_id(self.account_id).call()
+            self._sequence = int(response['sequence'])
+            logging_service.debug(f"Sequence for {self.account_id} synced at {self._sequence}")
+        except Exception as e:
+            self._sequence = None
+            logging_service.error(f"Failed to sync account sequence: {str(e)}")
+            raise
+
+__all__ = ['SequenceManager']
@@ -1,23 +1,44 @@
-from decimal import Decimal, ROUND_DOWN
-from stellar_sdk import Server, Keypair, TransactionBuilder, Asset, PathPaymentStrictSend
+from stellar_sdk import Server, Keypair
 from services.logging_service import logging_service
+from services.sequence_manager import SequenceManager
+from services.channel_pool import ChannelPool
+from services.account_tracker import AccountStateTracker
+from services.transaction_templates import TransactionTemplates
+from services.submission_pipeline import SubmissionPipeline
+from services.metrics_service import metrics_service
+from models.etf_assetlist import asset_registry
+from models.stroop_amount import parse_stroops, format_stroops
 from config.config import Config
 
 class StellarService:
     def __init__(self, network_passphrase=Config.NETWORK_PASSPHRASE, 
-                 server_endpoint=Config.HORIZON_SERVER):
+                 server_endpoint=Config.HORIZON_SERVER, secret_key=Config.SECRET_KEY,
+                 channel_secret_keys=Config.CHANNEL_SECRET_KEYS, server=None):
+        """
+        Args:
+            secret_key (str): Account to trade from; each portfolio in
+                multi-portfolio mode passes its own
+            channel_secret_keys (list): Channel account secrets for this account
+            server (Server): Existing Horizon client to share instead of
+                opening a new one
+        """
         self.network_passphrase = network_passphrase
-        self.server = Server(horizon_url=server_endpoint)
+        self.server = server or Server(horizon_url=server_endpoint)
         self.MAX_TRANSACTION_FEE = Config.MAX_TRANSACTION_FEE
+        self.transaction_templates = TransactionTemplates(network_passphrase, self.MAX_TRANSACTION_FEE)
         
-        if not Config.SECRET_KEY:
+        if not secret_key:
             error_msg = "Stellar secret key not found in environment variables"
             logging_service.error(error_msg)
             raise ValueError(error_msg)
             
         try:
-            self.keypair = Keypair.from_secret(Config.SECRET_KEY)
+            self.keypair = Keypair.from_secret(secret_key)
             self.public_key = self.keypair.public_key
+            self.sequence_manager = SequenceManager(self.server, self.public_key)
+            self.channel_pool = ChannelPool(self.server, channel_secret_keys)
+            self.account_tracker = AccountStateTracker(self)
+            self.submission_pipeline = SubmissionPipeline(self)
             logging_service.info("Stellar account initialized successfully")
         except Exception as e:
             logging_service.error(f"Error initializing Stellar account: {str(e)}")
@@ -26,42 +47,57 @@ class StellarService:
     def get_account_details(self):
         """Retrieve account details from Stellar network"""
         try:
-            response = self.server.accounts().account_id(self.public_key).call()
+            with metrics_service.horizon_call('account'):
+                response = self.server.accounts().account_id(self.public_key).call()
             return {
                 'sequence': response['sequence'],
-                'balances': response['balances']
+                'balances': response['balances'],
+                'last_modified_ledger': response.get('last_modified_ledger')
             }
         except Exception as e:
             logging_service.error(f"Failed to retrieve account details: {str(e)}")
             raise
 
-    def get_portfolio_composition(self):
+    def get_portfolio_composition(self, account_details=None, market_prices=None):
         """
         Analyze current portfolio asset allocation
         Returns dict with asset codes as keys and allocation percentages as values
+        
+        Args:
+            account_details (dict): Already fetched account details; taken
+                from the account tracker, or loaded from Horizon, when omitted
+            market_prices (dict): Asset code -> price; when given, weights are
+                by market value and unpriced assets are left out
         """
         try:
-            account_details = self.get_account_details()
+            if account_details is None:
+                if self.account_tracker.is_ready:
+                    account_details = self.account_tracker.get_account_details()
+                else:
+                    account_details = self.get_account_details()
             portfolio = {}
             
-            # Convert balances to Decimal for precise arithmetic
-            total_balance = Decimal('0')
-            for balance in account_details['balances']:
-                balance_amount = Decimal(str(balance.get('balance', '0')))
-                total_balance += balance_amount
-            
+            # Value each balance (raw amount when no prices are supplied)
+            values = {}
             for balance in account_details['balances']:
                 asset_code = balance.get('asset_type', 'native')
                 if asset_code == 'native':
                     asset_code = 'XLM'
                 else:
                     asset_code = balance.get('asset_code', 'XLM')
-                    
-                balance_amount = Decimal(str(balance.get('balance', '0')))
-                if total_balance > 0:
-                    portfolio[asset_code] = float(balance_amount / total_balance)
+                
+                balance_stroops = parse_stroops(balance.get('balance', '0'))
+                if market_prices is None:
+                    values[asset_code] = balance_stroops
+                elif market_prices.get(asset_code):
+                    values[asset_code] = balance_stroops * float(market_prices[asset_code])
+            
+            total_value = sum(values.values())
+            if total_value > 0:
+                for asset_code, value in values.items():
+                    portfolio[asset_code] = float(value / total_value)
             
-            logging_service.info(f"Portfolio composition retrieved: {portfolio}")
+            logging_service.debug("Portfolio composition retrieved: %s", portfolio)
             return portfolio
         except Exception as e:
             logging_service.error(f"Failed to compute portfolio composition: {str(e)}")
@@ -69,47 +105,31 @@ class StellarService:
 
     def get_asset_issuer(self, asset_code):
         """Get issuer for a specific asset code"""
-        try:
-            asset_info = next(
-                (asset for asset in Config.ETF_ASSETLIST 
-                 if asset['asset_code'] == asset_code),
-                None
-            )
-            if not asset_info:
-                logging_service.error(f"Asset {asset_code} not found in ETF asset list")
-                return None
-            return asset_info['issuer']
-        except Exception as e:
-            logging_service.error(f"Error getting issuer for {asset_code}: {str(e)}")
+        issuer = asset_registry.get_issuer(asset_code)
+        if not issuer:
+            logging_service.error(f"Asset {asset_code} not found in ETF asset list")
             return None
+        return issuer
 
     def format_stellar_amount(self, amount):
         """Format amount to Stellar's 7 decimal place precision"""
         try:
-            decimal_amount = Decimal(str(amount))
-            formatted_amount = decimal_amount.quantize(Decimal('0.0000001'), rounding=ROUND_DOWN)
-            return str(formatted_amount)
+            return format_stroops(parse_stroops(amount))
         except Exception as e:
             logging_service.error(f"Error formatting amount: {str(e)}")
             raise ValueError(f"Invalid amount format: {amount}")
 
     def create_asset(self, asset_code):
-        """Create Stellar SDK Asset object"""
-        try:
-            if asset_code.upper() == 'XLM':
-                return Asset.native()
-            
-            issuer = self.get_asset_issuer(asset_code)
-            if not issuer:
-                raise ValueError(f"No issuer found for asset {asset_code}")
-                
-            return Asset(asset_code, issuer)
-        except Exception as e:
-            logging_service.error(f"Failed to create asset {asset_code}: {str(e)}")
-            raise
+        """Return the interned Stellar SDK Asset object for an asset code"""
+        asset = asset_registry.get_asset(asset_code)
+        if asset is None:
+            error_msg = f"No issuer found for asset {asset_code}"
+            logging_service.error(f"Failed to create asset {asset_code}: {error_msg}")
+            raise ValueError(error_msg)
+        return asset
 
     def create_path_payment(self, source_asset_code, destination_asset_code, send_amount, destination):
-        """Create a path payment transaction"""
+        """Create a signed path payment transaction as base64 envelope XDR"""
         try:
             # Format amount
             formatted_amount = self.format_stellar_amount(send_amount)
@@ -119,56 +139,79 @@ class StellarService:
             destination_asset = self.create_asset(destination_asset_code)
             
             # Skip if amount is too small
-            if Decimal(formatted_amount) < Decimal('0.0000001'):
+            if parse_stroops(formatted_amount) < 1:
                 logging_service.warning(f"Amount {formatted_amount} too small for path payment, skipping")
                 return None
             
-            # Load account
-            account = self.server.load_account(self.public_key)
-            
-            # Create path payment operation
-            path_payment_op = PathPaymentStrictSend(
-                destination=destination,
-                send_asset=source_asset,
-                send_amount=formatted_amount,
-                dest_asset=destination_asset,
-                dest_min=formatted_amount,  # Set minimum to same as send amount
-                path=[]  # Empty path for direct payment
+            # Direct payment: empty path, minimum equal to the amount sent
+            path_payment_op = self.transaction_templates.path_payment(
+                source_asset, formatted_amount, destination, destination_asset, formatted_amount
             )
-            
-            # Build transaction
-            transaction = (
-                TransactionBuilder(
-                    source_account=account,
-                    network_passphrase=self.network_passphrase,
-                    base_fee=self.MAX_TRANSACTION_FEE
-                )
-                .append_operation(path_payment_op)
-                .set_timeout(30)
-                .build()
-            )
-            
-            # Sign transaction
-            transaction.sign(self.keypair)
+
+            # Reserve the next sequence number locally
+            sequence = self.sequence_manager.next_sequence()
+
+            with metrics_service.timer('tx_build_sign'):
+                transaction, _ = self.transaction_templates.build(self.keypair, sequence, [path_payment_op])
             return transaction
             
         except Exception as e:
             logging_service.error(f"Failed to create path payment: {str(e)}")
             raise
 
-    def submit_transaction(self, transaction):
-        """Submit signed transaction to Stellar network"""
+    def build_channel_transaction(self, operations, channel, base_fee=None):
+        """
+        Build and sign a transaction whose source is a channel account
+
+        Operations must carry the main account as their own source; the
+        channel only pays the fee and supplies the sequence number, so both
+        keys sign.
+
+        Args:
+            operations (list): Operation XDR from transaction_templates
+            base_fee (int): Fee per operation, MAX_TRANSACTION_FEE by default
+
+        Returns:
+            tuple: (envelope, hash) as base64 XDR and hex digest
+        """
+        try:
+            sequence = channel.sequence_manager.next_sequence()
+            with metrics_service.timer('tx_build_sign'):
+                return self.transaction_templates.build(
+                    channel.keypair, sequence, operations, co_signers=[self.keypair], base_fee=base_fee
+                )
+        except Exception as e:
+            logging_service.error(f"Failed to build channel transaction: {str(e)}")
+            raise
+
+    def submit_transaction(self, transaction, sequence_manager=None):
+        """Submit a signed transaction (envelope object or base64 XDR) to Stellar network"""
         try:
             if transaction is None:
                 return None
                 
-            response = self.server.submit_transaction(transaction)
+            metrics_service.observe_tick_to_submit()
+            with metrics_service.timer('tx_submit'), metrics_service.horizon_call('submit_transaction'):
+                response = self.server.submit_transaction(transaction)
             logging_service.info(f"Transaction {response['hash']} submitted successfully")
             return response
         except Exception as e:
+            (sequence_manager or self.sequence_manager).handle_submit_error(e)
             logging_service.error(f"Failed to submit transaction: {str(e)}")
             raise
 
+    def submit_transaction_async(self, transaction, tx_hash, sequence_manager=None, callback=None):
+        """
+        Queue a signed transaction without waiting for its ledger
+
+        Returns:
+            Future: Resolves to the Horizon transaction record, or raises
+                SubmissionError if the transaction is rejected or fails
+        """
+        return self.submission_pipeline.submit(
+            transaction, tx_hash, sequence_manager=sequence_manager, callback=callback
+        )
+
 # Create singleton instance
 stellar_service = StellarService()
 
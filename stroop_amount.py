@@ -0,0 +1,124 @@
+from decimal import Decimal
+import numpy as np
+
+# Stellar amounts carry seven implied decimal places
+STROOPS_PER_UNIT = 10 ** 7
+
+def parse_stroops(value):
+    """
+    Convert an amount to integer stroops, truncating toward zero
+
+    Accepts StroopAmount, Horizon amount strings, floats, ints (whole units)
+    and Decimals. Truncation matches the previous
+    Decimal(str(value)).quantize(..., ROUND_DOWN) behaviour, without
+    building a Decimal except for exponent notation.
+    """
+    if isinstance(value, StroopAmount):
+        return value.stroops
+    if isinstance(value, int):
+        return value * STROOPS_PER_UNIT
+    text = value.strip() if isinstance(value, str) else str(value)
+    if 'e' in text or 'E' in text:
+        text = format(Decimal(text), 'f')
+    negative = text.startswith('-')
+    if negative or text.startswith('+'):
+        text = text[1:]
+    whole, _, fraction = text.partition('.')
+    if not (whole or fraction) or not (whole or '0').isdigit() or (fraction and not fraction.isdigit()):
+        raise ValueError(f"Invalid amount: {value!r}")
+    stroops = int(whole or 0) * STROOPS_PER_UNIT + int((fraction + '0000000')[:7])
+    return -stroops if negative else stroops
+
+def format_stroops(stroops):
+    """Render integer stroops as a 7-decimal amount string for XDR"""
+    stroops = int(stroops)
+    sign = '-' if stroops < 0 else ''
+    whole, fraction = divmod(abs(stroops), STROOPS_PER_UNIT)
+    return f"{sign}{whole}.{fraction:07d}"
+
+class StroopAmount:
+    """
+    Exact Stellar amount held as integer stroops.
+
+    Arithmetic stays in integers; conversion to a string happens only when
+    the amount is written into an operation.
+    """
+
+    __slots__ = ('stroops',)
+
+    def __init__(self, stroops=0):
+        self.stroops = int(stroops)
+
+    @classmethod
+    def parse(cls, value):
+        return cls(parse_stroops(value))
+
+    def scale(self, numerator, denominator):
+        """Multiply by numerator / denominator, rounding toward zero"""
+        product = self.stroops * int(numerator)
+        quotient = abs(product) // int(denominator)
+        return StroopAmount(-quotient if product < 0 else quotient)
+
+    def __add__(self, other):
+        return StroopAmount(self.stroops + parse_stroops(other))
+
+    def __sub__(self, other):
+        return StroopAmount(self.stroops - parse_stroops(other))
+
+    def __neg__(self):
+        return StroopAmount(-self.stroops)
+
+    def __eq__(self, other):
+        try:
+            return self.stroops == parse_stroops(other)
+        except (TypeError, ValueError):
+            return NotImplemented
+
+    def __lt__(self, other):
+        return self.stroops < parse_stroops(other)
+
+    def __le__(self, other):
+        return self.stroops <= parse_stroops(other)
+
+    def __gt__(self, other):
+        return self.stroops > parse_stroops(other)
+
+    def __ge__(self, other):
+        return self.stroops >= parse_stroops(other)
+
+    def __hash__(self):
+        return hash(self.stroops)
+
+    def __bool__(self):
+        return self.stroops != 0
+
+    def __int__(self):
+        return self.stroops
+
+    def __float__(self):
+        return self.stroops / STROOPS_PER_UNIT
+
+    def __str__(self):
+        return format_stroops(self.stroops)
+
+    def __repr__(self):
+        return f"StroopAmount('{self}')"
+
+def parse_stroops_array(values):
+    """Parse a sequence of amounts into an int64 stroop array"""
+    return np.fromiter((parse_stroops(value) for value in values), dtype=np.int64, count=len(values))
+
+def to_stroops_array(amounts):
+    """Float unit amounts to int64 stroops, truncating toward zero"""
+    scaled = np.asarray(amounts, dtype=np.float64) * STROOPS_PER_UNIT
+    # Absorb binary representation error before truncating (0.3 * 1e7 -> 2999999.9999...)
+    return np.trunc(scaled + np.copysign(1e-6, scaled)).astype(np.int64)
+
+def to_units_array(stroops):
+    """int64 stroops to float unit amounts for valuation"""
+    return np.asarray(stroops, dtype=np.int64) / STROOPS_PER_UNIT
+
+__all__ = [
+    'STROOPS_PER_UNIT', 'StroopAmount', 'parse_stroops', 'format_stroops',
+    'parse_stroops_array', 'to_stroops_array', 'to_units_array'
+]
@@ -0,0 +1,272 @@
+import threading
+import time
+from concurrent.futures import Future
+from stellar_sdk.exceptions import NotFoundError
+from stellar_sdk.xdr import TransactionResult
+from services.logging_service import logging_service
+from services.metrics_service import metrics_service
+from config.config import Config
+
+class SubmissionError(Exception):
+    """
+    A pipelined transaction that was rejected, failed in a ledger or expired
+
+    Carries Horizon-style extras so SequenceManager.handle_submit_error and
+    FeeEngine.is_stuck treat it like a synchronous submission error.
+    """
+
+    def __init__(self, tx_hash, message, result_code=None, record=None):
+        super().__init__(f"Transaction {tx_hash} {message}")
+        self.tx_hash = tx_hash
+        self.record = record
+        self.extras = {'result_codes': {'transaction': result_code}} if result_code else {}
+
+class PendingSubmission:
+    """One in-flight transaction awaiting its ledger result"""
+
+    __slots__ = ('tx_hash', 'future', 'sequence_manager', 'submitted_at', 'deadline')
+
+    def __init__(self, tx_hash, future, sequence_manager, submitted_at, deadline):
+        self.tx_hash = tx_hash
+        self.future = future
+        self.sequence_manager = sequence_manager
+        self.submitted_at = submitted_at
+        self.deadline = deadline
+
+class SubmissionPipeline:
+    """
+    Non-blocking transaction submission with out-of-band result tracking.
+
+    Transactions are posted to Horizon's /transactions_async endpoint,
+    which returns as soon as Stellar Core has queued them. The outcome
+    arrives later on the account's transaction stream (failed transactions
+    included), where the matching future is resolved with the transaction
+    record, or with a SubmissionError if it failed. Fee-bump records match
+    through their inner hash as well. Transactions not seen by their
+    deadline are looked up once and otherwise failed as expired.
+
+    At most max_in_flight transactions are outstanding; submit() blocks
+    for a free slot, which is the pipeline's backpressure. Stellar Core
+    queues one transaction per source account at a time, so more than one
+    in flight needs channel accounts.
+    """
+
+    def __init__(self, stellar_service, max_in_flight=Config.SUBMIT_MAX_IN_FLIGHT,
+                 result_timeout=Config.SUBMIT_RESULT_TIMEOUT):
+        """
+        Args:
+            stellar_service (StellarService): Account whose transactions are tracked
+            max_in_flight (int): Outstanding transactions before submit() blocks
+            result_timeout (float): Seconds to wait for a result before
+                looking the transaction up directly
+        """
+        self.stellar_service = stellar_service
+        self.max_in_flight = max_in_flight
+        self.result_timeout = result_timeout
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self._pending = {}
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    @property
+    def in_flight(self):
+        return len(self._pending)
+
+    @property
+    def is_running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self):
+        """Follow the account's transaction stream and expire overdue submissions"""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._threads = [
+            threading.Thread(target=self._follow_transactions, name="submission-stream", daemon=True),
+            threading.Thread(target=self._expire_overdue, name="submission-expiry", daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logging_service.info(f"Submission pipeline started ({self.max_in_flight} in flight)")
+
+    def stop(self):
+        self._stop_event.set()
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+        for entry in pending:
+            self._resolve(entry, error=SubmissionError(entry.tx_hash, "abandoned: pipeline stopped"))
+        logging_service.info("Submission pipeline stopped")
+
+    def submit(self, transaction, tx_hash, sequence_manager=None, callback=None, timeout=None):
+        """
+        Post a signed transaction without waiting for its ledger
+
+        Args:
+            transaction: Signed envelope (object or base64 XDR)
+            tx_hash (str): Hex hash of the transaction (the outer hash for a fee bump)
+            sequence_manager (SequenceManager): Sequence source to correct on
+                failure; the main account's by default
+            callback (callable): Called with the future once resolved
+            timeout (float): Seconds to wait for an in-flight slot
+
+        Returns:
+            Future: Resolves to the Horizon transaction record
+        """
+        if not self.is_running:
+            self.start()
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No submission slot free within {timeout}s ({self.max_in_flight} in flight)")
+
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        now = time.time()
+        entry = PendingSubmission(
+            tx_hash, future, sequence_manager or self.stellar_service.sequence_manager,
+            now, now + self.result_timeout
+        )
+        # Register before posting so a fast stream event cannot be missed
+        with self._lock:
+            self._pending[tx_hash] = entry
+        self.submitted += 1
+
+        try:
+            metrics_service.observe_tick_to_submit()
+            with metrics_service.timer('tx_submit_async'), \
+                    metrics_service.horizon_call('submit_transaction_async'):
+                response = self.stellar_service.server.submit_transaction_async(transaction)
+        except Exception as e:
+            if getattr(e, 'status', None) is None:
+                # Lost in transit: Core may still have it, so let the stream or expiry settle it
+                logging_service.warning(f"Async submission of {tx_hash} unconfirmed: {str(e)}")
+                return future
+            self._reject(entry, self._error_from_response(tx_hash, getattr(e, 'extras', None) or {}, e))
+            return future
+
+        status = response.get('tx_status')
+        if status in ('PENDING', 'DUPLICATE'):
+            logging_service.debug(f"Transaction {tx_hash} queued ({status})")
+        else:
+            self._reject(entry, self._error_from_response(tx_hash, response))
+        return future
+
+    def _error_from_response(self, tx_hash, response, cause=None):
+        """SubmissionError for a transaction Core did not queue"""
+        status = response.get('tx_status', 'ERROR')
+        if status == 'TRY_AGAIN_LATER':
+            return SubmissionError(tx_hash, "not queued: Core asked to try again later")
+        result_code = self._result_code(response.get('error_result_xdr'))
+        return SubmissionError(tx_hash, f"rejected ({result_code or cause or status})", result_code)
+
+    @staticmethod
+    def _result_code(result_xdr):
+        """Horizon-style result code (e.g. 'tx_bad_seq') from TransactionResult XDR"""
+        if not result_xdr:
+            return None
+        try:
+            name = TransactionResult.from_xdr(result_xdr).result.code.name
+            return 'tx_' + name[2:].lower()
+        except Exception:
+            return None
+
+    def _reject(self, entry, error):
+        """Resolve a submission that never reached the queue"""
+        with self._lock:
+            if self._pending.pop(entry.tx_hash, None) is None:
+                return
+        self._resolve(entry, error=error)
+
+    def _resolve(self, entry, record=None, error=None):
+        self._slots.release()
+        metrics_service.observe('tx_settle', time.time() - entry.submitted_at)
+        if error is None:
+            self.succeeded += 1
+            entry.future.set_result(record)
+            return
+        self.failed += 1
+        entry.sequence_manager.handle_submit_error(error)
+        logging_service.error(f"Pipelined submission failed: {str(error)}")
+        entry.future.set_exception(error)
+
+    def _apply_record(self, record):
+        """Settle the pending submission matching a streamed transaction record"""
+        hashes = [record.get('hash'), (record.get('inner_transaction') or {}).get('hash')]
+        with self._lock:
+            entry = None
+            for tx_hash in hashes:
+                if tx_hash in self._pending:
+                    entry = self._pending.pop(tx_hash)
+                    break
+        if entry is None:
+            return
+        if record.get('successful'):
+            self._resolve(entry, record=record)
+        else:
+            self._resolve(entry, error=SubmissionError(
+                entry.tx_hash, f"failed in ledger {record.get('ledger')}", 'tx_failed', record
+            ))
+
+    def _follow_transactions(self):
+        """Consume the account's transaction stream, reconnecting with backoff"""
+        backoff = 1
+        cursor = 'now'
+        while not self._stop_event.is_set():
+            try:
+                stream = (
+                    self.stellar_service.server.transactions()
+                    .for_account(self.stellar_service.public_key)
+                    .include_failed(True)
+                    .cursor(cursor)
+                    .stream()
+                )
+                for record in stream:
+                    if self._stop_event.is_set():
+                        return
+                    cursor = record.get('paging_token', cursor)
+                    self._apply_record(record)
+                    backoff = 1
+            except Exception as e:
+                logging_service.warning(f"Transaction stream interrupted: {str(e)}")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def _expire_overdue(self):
+        """Look up submissions the stream has not settled by their deadline"""
+        while not self._stop_event.wait(1.0):
+            now = time.time()
+            with self._lock:
+                overdue = [entry for entry in self._pending.values() if entry.deadline <= now]
+            for entry in overdue:
+                try:
+                    with metrics_service.horizon_call('transaction'):
+                        record = self.stellar_service.server.transactions().transaction(entry.tx_hash).call()
+                except NotFoundError:
+                    record = None
+                except Exception as e:
+                    logging_service.warning(f"Lookup of overdue transaction {entry.tx_hash} failed: {str(e)}")
+                    continue
+
+                if record is not None:
+                    self._apply_record(record)
+                    continue
+                with self._lock:
+                    if self._pending.pop(entry.tx_hash, None) is None:
+                        continue
+                # Unknown outcome: the sequence is kept, and a later tx_bad_seq resyncs it
+                self._resolve(entry, error=SubmissionError(
+                    entry.tx_hash, f"not in a ledger after {self.result_timeout}s"
+                ))
+
+    def stats(self):
+        return {
+            'submitted': self.submitted,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'in_flight': self.in_flight
+        }
+
+__all__ = ['SubmissionPipeline', 'SubmissionError']
@@ -1,115 +1,224 @@
-from decimal import Decimal
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from services.logging_service import logging_service
-from stellar_sdk import (
-    Asset, Server, TransactionBuilder, Operation, PathPaymentStrictSend
-)
+from stellar_sdk import Asset
+from stellar_sdk.exceptions import NotFoundError
+from core.async_pipeline import AsyncPipeline
+from core.path_finder import LocalPathFinder
+from services.path_cache import path_cache
+from services.metrics_service import metrics_service
+from services.market_recorder import market_recorder
+from services.fee_engine import fee_engine, URGENCY_LEVELS
+from services.sequence_manager import SequenceManager
+from models.stroop_amount import StroopAmount, parse_stroops, format_stroops
+from config.config import Config
+
+# Stellar protocol limit on operations in a single transaction
+MAX_OPERATIONS_PER_TRANSACTION = 100
+
+# Seconds past a transaction's max_time before its absence from the ledger is final
+LEDGER_CLOSE_MARGIN = 6
 
 class TransactionExecutor:
-    def __init__(self, stellar_service):
+    def __init__(self, stellar_service, async_pipeline=None):
         self.stellar_service = stellar_service
+        self.async_pipeline = async_pipeline or AsyncPipeline(stellar_service)
+        self.path_finder = LocalPathFinder()
 
+    @metrics_service.timed('path_quote')
     def get_path_payment_min_amount(self, source_asset_code, destination_asset_code, send_amount):
         """Calculate minimum destination amount based on strict send path"""
         try:
+            formatted_amount = self.stellar_service.format_stellar_amount(send_amount)
+            cached = self._get_cached_quote(source_asset_code, destination_asset_code, formatted_amount)
+            if cached is not None:
+                return cached
+
+            # Price the path from streamed offers and pools before asking Horizon
+            local = self._get_local_quote(source_asset_code, destination_asset_code, formatted_amount)
+            if local is not None:
+                return local
+
             # Create assets
             source_asset = self.stellar_service.create_asset(source_asset_code)
             destination_asset = self.stellar_service.create_asset(destination_asset_code)
-            formatted_amount = self.stellar_service.format_stellar_amount(send_amount)
 
             # Get paths using correct parameters
-            paths_response = self.stellar_service.server.strict_send_paths(
-                source_asset=source_asset,
-                source_amount=formatted_amount,
-                destination=[destination_asset]  # Changed from destination_assets to destination
-            ).call()
+            with metrics_service.horizon_call('strict_send_paths'):
+                paths_response = self.stellar_service.server.strict_send_paths(
+                    source_asset=source_asset,
+                    source_amount=formatted_amount,
+                    destination=[destination_asset]  # Changed from destination_assets to destination
+                ).call()
             
-            if not paths_response.get('_embedded', {}).get('records', []):
-                logging_service.error(f"No path found from {source_asset_code} to {destination_asset_code}")
-                return None, []
+            quote = self._parse_path_response(
+                paths_response, source_asset_code, destination_asset_code, formatted_amount
+            )
+            path_cache.put(source_asset_code, destination_asset_code, formatted_amount, *quote)
+            return quote
 
-            # Get the best path's destination amount
-            best_path = paths_response['_embedded']['records'][0]
-            dest_amount = best_path['destination_amount']
+        except Exception as e:
+            logging_service.error(f"Error calculating minimum amount: {str(e)}")
+            return None, []
 
-            # Apply 1% slippage tolerance
-            min_amount = Decimal(dest_amount) * Decimal('0.99')
-            formatted_min = self.stellar_service.format_stellar_amount(min_amount)
+    @metrics_service.timed('path_quote_batch')
+    def get_path_payment_min_amounts(self, legs):
+        """
+        Quote several strict-send paths concurrently through the async pipeline
 
-            logging_service.info(
-                f"Path found: {formatted_amount} {source_asset_code} -> "
-                f"{formatted_min} {destination_asset_code} (path: {best_path.get('path', [])})"
-            )
+        Args:
+            legs (list): (source_asset_code, destination_asset_code, send_amount) tuples
 
-            return formatted_min, best_path.get('path', [])
+        Returns:
+            list: (min_amount, path) tuples in leg order; (None, []) where no path exists
+        """
+        quotes = [(None, []) for _ in legs]
+        try:
+            # Serve what we can from the cache or local path finder and query Horizon only for misses
+            pending = []
+            for index, (source_asset_code, destination_asset_code, send_amount) in enumerate(legs):
+                formatted_amount = self.stellar_service.format_stellar_amount(send_amount)
+                quote = self._get_cached_quote(source_asset_code, destination_asset_code, formatted_amount) \
+                    or self._get_local_quote(source_asset_code, destination_asset_code, formatted_amount)
+                if quote is not None:
+                    quotes[index] = quote
+                else:
+                    pending.append((index, formatted_amount))
 
+            queries = [
+                (
+                    self.stellar_service.create_asset(legs[index][0]),
+                    formatted_amount,
+                    self.stellar_service.create_asset(legs[index][1])
+                )
+                for index, formatted_amount in pending
+            ]
+            responses = self.async_pipeline.run(self.async_pipeline.strict_send_paths_many(queries)) \
+                if queries else []
         except Exception as e:
-            logging_service.error(f"Error calculating minimum amount: {str(e)}")
+            logging_service.error(f"Error calculating minimum amounts: {str(e)}")
+            return quotes
+
+        for (index, formatted_amount), response in zip(pending, responses):
+            source_asset_code, destination_asset_code, _ = legs[index]
+            if isinstance(response, Exception):
+                logging_service.error(
+                    f"Error calculating minimum amount for {source_asset_code} -> "
+                    f"{destination_asset_code}: {str(response)}"
+                )
+                continue
+            quotes[index] = self._parse_path_response(
+                response, source_asset_code, destination_asset_code, formatted_amount
+            )
+            path_cache.put(source_asset_code, destination_asset_code, formatted_amount, *quotes[index])
+        return quotes
+
+    def _get_cached_quote(self, source_asset_code, destination_asset_code, formatted_amount):
+        """Return a cached (min_amount, path) quote scaled to formatted_amount, if fresh"""
+        cached = path_cache.get(source_asset_code, destination_asset_code, formatted_amount)
+        if cached is None:
+            return None
+        min_stroops, path = cached
+        return format_stroops(min_stroops), path
+
+    def _get_local_quote(self, source_asset_code, destination_asset_code, formatted_amount):
+        """Return a (min_amount, path) quote from the local path finder, or None to ask Horizon"""
+        if not Config.LOCAL_PATHFINDING_ENABLED:
+            return None
+        quote = self.path_finder.strict_send(
+            source_asset_code, destination_asset_code, parse_stroops(formatted_amount)
+        )
+        if quote is None:
+            return None
+
+        # Same 1% slippage tolerance as Horizon quotes
+        formatted_min = format_stroops(quote.dest_stroops * 99 // 100)
+        path = [self.stellar_service.create_asset(code) for code in quote.path]
+        market_recorder.record_path_quote(
+            source_asset_code, destination_asset_code, formatted_amount,
+            format_stroops(quote.dest_stroops), quote.path
+        )
+        path_cache.put(source_asset_code, destination_asset_code, formatted_amount, formatted_min, path)
+        logging_service.info(
+            f"Local path: {formatted_amount} {source_asset_code} -> "
+            f"{formatted_min} {destination_asset_code} (path: {quote.path}, venues: {quote.venues})"
+        )
+        return formatted_min, path
+
+    def _parse_path_response(self, paths_response, source_asset_code, destination_asset_code, formatted_amount):
+        """Extract minimum destination amount and intermediate assets from a paths response"""
+        if not paths_response.get('_embedded', {}).get('records', []):
+            logging_service.error(f"No path found from {source_asset_code} to {destination_asset_code}")
             return None, []
 
+        # Get the best path's destination amount
+        best_path = paths_response['_embedded']['records'][0]
+        dest_amount = best_path['destination_amount']
+
+        # Apply 1% slippage tolerance
+        formatted_min = format_stroops(parse_stroops(dest_amount) * 99 // 100)
+
+        # Horizon returns path hops as JSON records; operations need Asset objects
+        path = [
+            Asset.native() if hop['asset_type'] == 'native'
+            else Asset(hop['asset_code'], hop['asset_issuer'])
+            for hop in best_path.get('path', [])
+        ]
+        market_recorder.record_path_quote(
+            source_asset_code, destination_asset_code, formatted_amount, dest_amount,
+            [asset.code for asset in path]
+        )
+
+        logging_service.info(
+            f"Path found: {formatted_amount} {source_asset_code} -> "
+            f"{formatted_min} {destination_asset_code} (path: {[a.code for a in path]})"
+        )
+
+        return formatted_min, path
+
     def execute_path_payment(self, payment_details):
-        """Execute a path payment for rebalancing"""
+        """
+        Execute a path payment for rebalancing
+
+        Besides the required fields, payment_details may carry 'urgency'
+        ('low' to 'critical', default 'normal') and 'expected_profit' (XLM)
+        to price the transaction fee, and 'dest_min' with 'path_assets'
+        (intermediate asset codes) to send along a fixed route unquoted.
+        """
         try:
             if not self._validate_path_payment(payment_details):
                 logging_service.error("Invalid path payment details")
                 return None
 
             # Format send amount
-            send_amount = self.stellar_service.format_stellar_amount(payment_details['send_amount'])
+            send_stroops = parse_stroops(payment_details['send_amount'])
+            send_amount = format_stroops(send_stroops)
             
             # Skip if amount is too small
-            if Decimal(send_amount) < Decimal('0.0000001'):
+            if send_stroops < 1:
                 logging_service.warning(f"Amount {send_amount} too small for {payment_details['source_asset']}, skipping")
                 return None
 
-            # Calculate minimum destination amount and path
-            dest_min, path = self.get_path_payment_min_amount(
-                payment_details['source_asset'],
-                payment_details['destination_asset'],
-                send_amount
-            )
-
-            if not dest_min:
-                logging_service.error("Could not determine minimum destination amount")
+            path_payment_op = self._build_path_payment_op(payment_details, send_amount)
+            if path_payment_op is None:
                 return None
 
-            # Create assets
-            source_asset = self.stellar_service.create_asset(payment_details['source_asset'])
-            destination_asset = self.stellar_service.create_asset(payment_details['destination_asset'])
-
-            # Load account
-            account = self.stellar_service.server.load_account(self.stellar_service.public_key)
-
-            # Build path payment operation
-            path_payment_op = PathPaymentStrictSend(
-                destination=payment_details['destination'],
-                send_asset=source_asset,
-                send_amount=send_amount,
-                dest_asset=destination_asset,
-                dest_min=dest_min,
-                path=path
-            )
+            # Reserve the next sequence number locally
+            sequence = self.stellar_service.sequence_manager.next_sequence()
+            fee, urgency = self._transaction_fee([payment_details])
 
-            # Create transaction
-            transaction = (
-                TransactionBuilder(
-                    source_account=account,
-                    network_passphrase=self.stellar_service.network_passphrase,
-                    base_fee=self.stellar_service.MAX_TRANSACTION_FEE
+            with metrics_service.timer('tx_build_sign'):
+                # Patch sequence, fee and time bounds into the cached skeleton, then sign
+                transaction, _ = self.stellar_service.transaction_templates.build(
+                    self.stellar_service.keypair, sequence, [path_payment_op], base_fee=fee
                 )
-                .append_operation(path_payment_op)
-                .set_timeout(30)
-                .build()
-            )
-
-            # Sign and submit transaction
-            transaction.sign(self.stellar_service.keypair)
             
             logging_service.info(
                 f"Submitting path payment: {send_amount} {payment_details['source_asset']} -> "
-                f"min {dest_min} {payment_details['destination_asset']}"
+                f"{payment_details['destination_asset']} (fee {fee} stroops/op)"
             )
             
-            response = self.stellar_service.submit_transaction(transaction)
+            response = self._submit(transaction, fee, 1, urgency)
 
             logging_service.info(
                 f"Path payment executed: {send_amount} "
@@ -123,7 +232,456 @@ class TransactionExecutor:
             logging_service.error(f"Failed to execute path payment: {str(e)}")
             raise
 
-    # Rest of the class remains the same...
+    def execute_path_payments_batch(self, payments, atomic=Config.REBALANCE_BATCH_ATOMIC):
+        """
+        Execute several path payments packed into multi-operation transactions
+
+        Args:
+            payments (list): Path payment details dicts, as for execute_path_payment
+            atomic (bool): If True a failed batch is reported as failed; if False
+                its legs are retried one transaction each, but only once the
+                batch is known not to have applied
+
+        Returns:
+            list: Submission responses, one per submitted transaction
+        """
+        legs = self._prepare_legs(payments)
+
+        responses = []
+        for start in range(0, len(legs), MAX_OPERATIONS_PER_TRANSACTION):
+            batch = legs[start:start + MAX_OPERATIONS_PER_TRANSACTION]
+            tx_hash = None
+            try:
+                sequence = self.stellar_service.sequence_manager.next_sequence()
+                fee, urgency = self._transaction_fee([payment_details for payment_details, _ in batch])
+                max_time = int(time.time()) + self.stellar_service.transaction_templates.timeout
+                with metrics_service.timer('tx_build_sign'):
+                    transaction, tx_hash = self.stellar_service.transaction_templates.build(
+                        self.stellar_service.keypair, sequence,
+                        [path_payment_op for _, path_payment_op in batch],
+                        max_time=max_time, base_fee=fee
+                    )
+
+                logging_service.info(
+                    f"Submitting batched path payment with {len(batch)} operations (fee {fee} stroops/op)"
+                )
+                response = self._submit(transaction, fee, len(batch), urgency)
+                logging_service.info(
+                    f"Batched path payment executed: {len(batch)} legs "
+                    f"(hash: {response.get('hash', 'unknown')})"
+                )
+                responses.append(response)
+
+            except Exception as e:
+                logging_service.error(f"Batched path payment with {len(batch)} operations failed: {str(e)}")
+                if atomic:
+                    raise
+
+                record, retry = self._batch_outcome(e, tx_hash, max_time) if tx_hash else (None, True)
+                if record is not None:
+                    logging_service.info(f"Batched path payment {tx_hash} applied despite the error")
+                    responses.append(record)
+                if not retry:
+                    continue
+
+                # Fall back to one transaction per leg so healthy legs still land
+                for payment_details, _ in batch:
+                    try:
+                        response = self.execute_path_payment(payment_details)
+                        if response:
+                            responses.append(response)
+                    except Exception as leg_error:
+                        logging_service.error(
+                            f"Fallback leg {payment_details['source_asset']} -> "
+                            f"{payment_details['destination_asset']} failed: {str(leg_error)}"
+                        )
+
+        return responses
+
+    def _batch_outcome(self, error, tx_hash, max_time):
+        """
+        Find out whether a batch whose submission raised was applied
+
+        An error carrying a transaction result code is definite: the batch
+        was rejected before the ledger or failed in it (tx_failed), and
+        either way did not apply. Timeouts and lost responses carry none and
+        may still land, so the hash (the inner hash, which also finds a fee
+        bump) is looked up, and if it is missing, looked up again once
+        max_time has passed and it no longer can.
+
+        Returns:
+            tuple: (successful transaction record or None, whether the legs
+                may safely be retried one by one)
+        """
+        if SequenceManager.get_transaction_result_code(error) is not None:
+            return None, True
+        try:
+            record = self._lookup_transaction(tx_hash)
+            if record is None:
+                time.sleep(max(0, max_time - time.time()) + LEDGER_CLOSE_MARGIN)
+                record = self._lookup_transaction(tx_hash)
+        except Exception as e:
+            logging_service.error(f"Outcome of batch {tx_hash} unknown, not retrying its legs: {str(e)}")
+            return None, False
+        if record is None or not record.get('successful'):
+            return None, True
+        return record, False
+
+    def _lookup_transaction(self, tx_hash):
+        """Horizon record of a transaction, or None if it is not in a ledger"""
+        try:
+            with metrics_service.horizon_call('transaction'):
+                return self.stellar_service.server.transactions().transaction(tx_hash).call()
+        except NotFoundError:
+            return None
+
+    def execute_path_payments_concurrent(self, payments):
+        """
+        Submit independent path payments in parallel through channel accounts
+
+        Each leg is its own transaction with a channel account as source and
+        the main account as operation source, so legs do not contend for
+        one sequence number.
+
+        Returns:
+            list: Submission responses for the legs that succeeded
+        """
+        channel_pool = self.stellar_service.channel_pool
+        if not channel_pool.size:
+            logging_service.warning("No channel accounts configured, submitting sequentially")
+            responses = []
+            for payment_details in payments:
+                try:
+                    response = self.execute_path_payment(payment_details)
+                    if response:
+                        responses.append(response)
+                except Exception as e:
+                    logging_service.error(f"Sequential path payment failed: {str(e)}")
+            return responses
+
+        responses = []
+        with ThreadPoolExecutor(max_workers=channel_pool.size) as pool:
+            futures = [
+                pool.submit(metrics_service.carry_tick(self._execute_channel_path_payment), payment_details)
+                for payment_details in payments
+            ]
+            for future in as_completed(futures):
+                try:
+                    response = future.result()
+                    if response:
+                        responses.append(response)
+                except Exception as e:
+                    logging_service.error(f"Concurrent path payment failed: {str(e)}")
+        return responses
+
+    def _prepare_legs(self, payments, source=None):
+        """
+        Validate, quote (in parallel) and encode several legs
+
+        Returns:
+            list: (payment_details, operation XDR) for the legs that can be sent
+        """
+        candidates = []
+        for payment_details in payments:
+            try:
+                if not self._validate_path_payment(payment_details):
+                    logging_service.error("Invalid path payment details")
+                    continue
+
+                send_stroops = parse_stroops(payment_details['send_amount'])
+                send_amount = format_stroops(send_stroops)
+                if send_stroops < 1:
+                    logging_service.warning(f"Amount {send_amount} too small for {payment_details['source_asset']}, skipping")
+                    continue
+
+                candidates.append((payment_details, send_amount))
+            except Exception as e:
+                logging_service.error(f"Failed to prepare path payment: {str(e)}")
+
+        # Quote every leg without its own route in parallel before building operations
+        quotes = [self._fixed_quote(payment_details) for payment_details, _ in candidates]
+        unquoted = [index for index, quote in enumerate(quotes) if quote is None]
+        fetched = self.get_path_payment_min_amounts([
+            (candidates[index][0]['source_asset'], candidates[index][0]['destination_asset'], candidates[index][1])
+            for index in unquoted
+        ])
+        for index, quote in zip(unquoted, fetched):
+            quotes[index] = quote
+
+        legs = []
+        for (payment_details, send_amount), quote in zip(candidates, quotes):
+            try:
+                path_payment_op = self._build_path_payment_op(
+                    payment_details, send_amount, source=source, quote=quote
+                )
+                if path_payment_op is not None:
+                    legs.append((payment_details, path_payment_op))
+            except Exception as e:
+                logging_service.error(f"Failed to prepare path payment: {str(e)}")
+        return legs
+
+    def execute_path_payments_pipelined(self, payments, callback=None):
+        """
+        Submit path payments without waiting for each to settle
+
+        Legs are quoted together, then each goes out through its own channel
+        account via the async submission pipeline as soon as it is signed;
+        the channel is checked back in when the leg's ledger result arrives,
+        so the pool size bounds the legs in flight. Without channel accounts
+        the legs are packed into batch transactions from the main account,
+        each queued once the previous one has settled (Core holds one
+        transaction per source account).
+
+        Args:
+            payments (list): Path payment details dicts, as for execute_path_payment
+            callback (callable): Called with each leg's future once resolved
+
+        Returns:
+            list: Futures resolving to Horizon transaction records
+        """
+        channel_pool = self.stellar_service.channel_pool
+        if not channel_pool.size:
+            return self._pipeline_batches(self._prepare_legs(payments), callback)
+
+        legs = self._prepare_legs(payments, source=self.stellar_service.public_key)
+        futures = []
+        for payment_details, path_payment_op in legs:
+            channel = channel_pool.checkout(timeout=Config.CHANNEL_CHECKOUT_TIMEOUT)
+            if channel is None:
+                logging_service.error(
+                    f"No channel account available for {payment_details['source_asset']} -> "
+                    f"{payment_details['destination_asset']}, leg not submitted"
+                )
+                continue
+            try:
+                fee, _ = self._transaction_fee([payment_details])
+                transaction, tx_hash = self.stellar_service.build_channel_transaction(
+                    [path_payment_op], channel, base_fee=fee
+                )
+                future = self.stellar_service.submit_transaction_async(
+                    transaction, tx_hash, sequence_manager=channel.sequence_manager,
+                    callback=self._settle_callback(payment_details, channel, callback)
+                )
+                futures.append(future)
+            except Exception as e:
+                channel_pool.checkin(channel, error=e)
+                logging_service.error(f"Pipelined path payment failed: {str(e)}")
+        logging_service.info(f"Pipelined {len(futures)} path payments through channel accounts")
+        return futures
+
+    def _pipeline_batches(self, legs, callback=None):
+        """
+        Queue batch transactions from the main account one after another
+
+        The first batch is queued now and each following one from the
+        previous one's done-callback, so the caller never waits on a ledger.
+
+        Returns:
+            list: One future per batch, resolved when that batch settles
+        """
+        batches = [
+            legs[start:start + MAX_OPERATIONS_PER_TRANSACTION]
+            for start in range(0, len(legs), MAX_OPERATIONS_PER_TRANSACTION)
+        ]
+        futures = [Future() for _ in batches]
+        if callback is not None:
+            for future in futures:
+                future.add_done_callback(callback)
+
+        def queue_batch(index):
+            if index == len(batches):
+                return
+            batch = batches[index]
+            try:
+                sequence = self.stellar_service.sequence_manager.next_sequence()
+                fee, _ = self._transaction_fee([payment_details for payment_details, _ in batch])
+                with metrics_service.timer('tx_build_sign'):
+                    transaction, tx_hash = self.stellar_service.transaction_templates.build(
+                        self.stellar_service.keypair, sequence,
+                        [path_payment_op for _, path_payment_op in batch], base_fee=fee
+                    )
+                submitted = self.stellar_service.submit_transaction_async(transaction, tx_hash)
+                logging_service.info(f"Queued batched path payment with {len(batch)} operations ({tx_hash})")
+            except Exception as e:
+                logging_service.error(f"Pipelined batch with {len(batch)} operations failed: {str(e)}")
+                futures[index].set_exception(e)
+                queue_batch(index + 1)
+                return
+
+            def settled(result):
+                # The previous transaction has left the queue; Core takes the next one
+                error = result.exception()
+                if error is None:
+                    futures[index].set_result(result.result())
+                else:
+                    logging_service.warning(f"Previous batch failed, continuing: {str(error)}")
+                    futures[index].set_exception(error)
+                queue_batch(index + 1)
+            submitted.add_done_callback(settled)
+
+        queue_batch(0)
+        return futures
+
+    def _settle_callback(self, payment_details, channel, callback=None):
+        """Done-callback returning the channel and logging a pipelined leg's outcome"""
+        def settle(future):
+            error = future.exception()
+            self.stellar_service.channel_pool.checkin(channel, error=error)
+            if error is None:
+                logging_service.info(
+                    f"Path payment settled via channel {channel.public_key}: "
+                    f"{payment_details['source_asset']} -> {payment_details['destination_asset']} "
+                    f"(hash: {future.result().get('hash', 'unknown')})"
+                )
+            if callback is not None:
+                callback(future)
+        return settle
+
+    def _execute_channel_path_payment(self, payment_details):
+        """Build, sign and submit one leg using a checked-out channel account"""
+        if not self._validate_path_payment(payment_details):
+            logging_service.error("Invalid path payment details")
+            return None
+
+        send_stroops = parse_stroops(payment_details['send_amount'])
+        send_amount = format_stroops(send_stroops)
+        if send_stroops < 1:
+            logging_service.warning(f"Amount {send_amount} too small for {payment_details['source_asset']}, skipping")
+            return None
+
+        path_payment_op = self._build_path_payment_op(
+            payment_details, send_amount, source=self.stellar_service.public_key
+        )
+        if path_payment_op is None:
+            return None
+
+        channel_pool = self.stellar_service.channel_pool
+        channel = channel_pool.checkout(timeout=Config.CHANNEL_CHECKOUT_TIMEOUT)
+        if channel is None:
+            raise RuntimeError("No channel account available for path payment")
+
+        error = None
+        try:
+            fee, urgency = self._transaction_fee([payment_details])
+            transaction, _ = self.stellar_service.build_channel_transaction([path_payment_op], channel, base_fee=fee)
+            response = self._submit(transaction, fee, 1, urgency, sequence_manager=channel.sequence_manager)
+            logging_service.info(
+                f"Path payment executed via channel {channel.public_key}: {send_amount} "
+                f"{payment_details['source_asset']} -> {payment_details['destination_asset']} "
+                f"(hash: {response.get('hash', 'unknown')})"
+            )
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            channel_pool.checkin(channel, error=error)
+
+    def _transaction_fee(self, legs):
+        """
+        Per-operation fee for a transaction carrying these legs
+
+        Returns:
+            tuple: (fee in stroops per operation, urgency of the most urgent leg)
+        """
+        urgency = max((leg.get('urgency', 'normal') for leg in legs), key=URGENCY_LEVELS.index)
+        if not Config.FEE_ENGINE_ENABLED:
+            return self.stellar_service.MAX_TRANSACTION_FEE, urgency
+
+        # Profit caps the fee only when every leg states one
+        profits = [leg.get('expected_profit') for leg in legs]
+        expected_profit = None
+        if all(profit is not None for profit in profits):
+            expected_profit = StroopAmount(sum(parse_stroops(profit) for profit in profits))
+        return fee_engine.fee_for(len(legs), urgency, expected_profit), urgency
+
+    def _submit(self, transaction, fee, operation_count, urgency, sequence_manager=None):
+        """
+        Submit a transaction, fee bumping it while it is stuck on its fee
+
+        A submission that times out waiting for a ledger or is rejected with
+        tx_insufficient_fee is re-sent inside a fee-bump transaction paid by
+        the main account, up to FEE_BUMP_MAX_ATTEMPTS times. Once any attempt
+        has timed out the inner transaction may still land, so that timeout
+        is what gets raised, whatever the later bumps were rejected with.
+        """
+        try:
+            return self.stellar_service.submit_transaction(transaction, sequence_manager=sequence_manager)
+        except Exception as e:
+            if not Config.FEE_ENGINE_ENABLED or not fee_engine.is_stuck(e):
+                raise
+            error = e
+        unsettled = error if SequenceManager.get_transaction_result_code(error) is None else None
+
+        for _ in range(Config.FEE_BUMP_MAX_ATTEMPTS):
+            bumped_fee = fee_engine.bump_fee(fee, urgency)
+            if bumped_fee is None:
+                logging_service.warning(
+                    f"Fee bump from {fee} stroops/op would exceed {fee_engine.max_fee}, giving up"
+                )
+                break
+
+            # Always wrap the original inner transaction; fee bumps do not nest
+            fee_bump, _ = self.stellar_service.transaction_templates.fee_bump(
+                self.stellar_service.keypair, transaction, bumped_fee, operation_count
+            )
+            metrics_service.increment('fee_bumps_total', urgency=urgency)
+            logging_service.warning(
+                f"Transaction stuck ({str(error)}), fee bump {fee} -> {bumped_fee} stroops/op"
+            )
+            try:
+                return self.stellar_service.submit_transaction(fee_bump, sequence_manager=sequence_manager)
+            except Exception as e:
+                if unsettled is None and SequenceManager.get_transaction_result_code(e) is None:
+                    unsettled = e
+                if not fee_engine.is_stuck(e):
+                    raise unsettled or e
+                error, fee = e, bumped_fee
+        raise unsettled or error
+
+    def _build_path_payment_op(self, payment_details, send_amount, source=None, quote=None):
+        """
+        Encode the PathPaymentStrictSend operation for one leg, quoting it unless a quote is given
+
+        Returns:
+            bytes: Operation XDR from the cached pair template, or None without a quote
+        """
+        # Calculate minimum destination amount and path
+        if quote is None:
+            quote = self._fixed_quote(payment_details) or self.get_path_payment_min_amount(
+                payment_details['source_asset'],
+                payment_details['destination_asset'],
+                send_amount
+            )
+        dest_min, path = quote
+
+        if not dest_min:
+            logging_service.error("Could not determine minimum destination amount")
+            return None
+
+        logging_service.debug(
+            f"Path payment leg: {send_amount} {payment_details['source_asset']} -> "
+            f"min {dest_min} {payment_details['destination_asset']}"
+        )
+        return self.stellar_service.transaction_templates.path_payment(
+            self.stellar_service.create_asset(payment_details['source_asset']),
+            send_amount,
+            payment_details['destination'],
+            self.stellar_service.create_asset(payment_details['destination_asset']),
+            dest_min,
+            path,
+            source=source
+        )
+
+    def _fixed_quote(self, payment_details):
+        """(dest_min, path) for details that carry their own route, such as arbitrage cycles, else None"""
+        if payment_details.get('dest_min') is None:
+            return None
+        return (
+            format_stroops(parse_stroops(payment_details['dest_min'])),
+            [self.stellar_service.create_asset(code) for code in payment_details.get('path_assets', [])]
+        )
+
     def _validate_path_payment(self, payment_details):
         """Validate path payment details"""
         try:
@@ -135,8 +693,8 @@ class TransactionExecutor:
                 logging_service.error(f"Missing required fields: {required_fields}")
                 return False
                 
-            # Validate amount can be converted to Decimal
-            Decimal(str(payment_details['send_amount']))
+            # Validate amount can be converted to stroops
+            parse_stroops(payment_details['send_amount'])
             return True
             
         except Exception as e:
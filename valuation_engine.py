@@ -0,0 +1,150 @@
+import threading
+import numpy as np
+from services.logging_service import logging_service
+from models.stroop_amount import STROOPS_PER_UNIT, parse_stroops, to_stroops_array, to_units_array
+from config.config import Config
+
+class ValuationEngine:
+    """
+    Price-weighted portfolio valuation over aligned NumPy arrays.
+
+    Balances, prices and target weights are stored in arrays indexed by
+    asset, so composition, drift and rebalance sizes come out of a single
+    vectorized pass. Single balance or price updates adjust the cached
+    value vector and total in place instead of recomputing everything.
+    Assets without a positive price are excluded from the valuation, and
+    the targets of the priced assets are renormalized to sum to one.
+    Balances are held exactly as int64 stroops, with a float unit view
+    used for valuation.
+    """
+
+    def __init__(self, target_allocations):
+        self.asset_codes = list(target_allocations)
+        self.index = {code: i for i, code in enumerate(self.asset_codes)}
+        self.targets = np.array([float(target_allocations[c]) for c in self.asset_codes])
+        self.stroops = np.zeros(len(self.asset_codes), dtype=np.int64)
+        self.balances = np.zeros(len(self.asset_codes))
+        self.prices = np.zeros(len(self.asset_codes))
+        self.values = np.zeros(len(self.asset_codes))
+        self.total_value = 0.0
+        self._unpriced = ()
+        self._lock = threading.Lock()
+
+    def set_balances_from_account(self, balances):
+        """Load balances from Horizon balance records"""
+        new_stroops = np.zeros(len(self.asset_codes), dtype=np.int64)
+        for balance in balances:
+            if balance.get('asset_type') == 'native':
+                asset_code = 'XLM'
+            else:
+                asset_code = balance.get('asset_code')
+            i = self.index.get(asset_code)
+            if i is not None:
+                new_stroops[i] = parse_stroops(balance.get('balance', '0'))
+        with self._lock:
+            self.stroops = new_stroops
+            self.balances = to_units_array(new_stroops)
+            self._revalue()
+
+    def set_prices(self, market_prices):
+        """Load prices for every tracked asset"""
+        new_prices = np.array([float(market_prices.get(c, 0) or 0) for c in self.asset_codes])
+        with self._lock:
+            self.prices = new_prices
+            self._revalue()
+
+    def update_balance(self, asset_code, balance):
+        """Apply a single balance change incrementally"""
+        i = self.index.get(asset_code)
+        if i is None:
+            return
+        stroops = parse_stroops(balance)
+        with self._lock:
+            self.stroops[i] = stroops
+            self.balances[i] = stroops / STROOPS_PER_UNIT
+            self._update_value(i)
+
+    def update_price(self, asset_code, price):
+        """Apply a single price change incrementally"""
+        i = self.index.get(asset_code)
+        if i is None:
+            return
+        with self._lock:
+            self.prices[i] = float(price or 0)
+            self._update_value(i)
+
+    def _revalue(self):
+        """Recompute the value vector; caller must hold the lock"""
+        priced = self.prices > 0
+        self.values = np.where(priced, self.balances * self.prices, 0.0)
+        self.total_value = float(self.values.sum())
+
+    def _update_value(self, i):
+        """Recompute one asset's value and adjust the total; caller must hold the lock"""
+        new_value = self.balances[i] * self.prices[i] if self.prices[i] > 0 else 0.0
+        self.total_value += new_value - self.values[i]
+        self.values[i] = new_value
+
+    def analyze(self, tolerance=Config.ALLOCATION_TOLERANCE):
+        """
+        Compute composition, drift and rebalance sizes in one pass
+
+        Returns:
+            dict: Arrays aligned with asset_codes -- 'weights', 'targets'
+                (renormalized over priced assets), 'drift' (current - target),
+                'flagged' (|drift| > tolerance and priced),
+                'trade_values' (value to buy, negative to sell),
+                'trade_units' (same in asset units) and 'trade_stroops'
+                (same as int64 stroops) -- plus 'total_value'
+        """
+        with self._lock:
+            values = self.values.copy()
+            prices = self.prices.copy()
+            total = self.total_value
+
+        priced = prices > 0
+        if total <= 0:
+            weights = np.zeros_like(values)
+        else:
+            weights = values / total
+        # Weights only cover priced assets, so targets must too
+        targets = np.where(priced, self.targets, 0.0)
+        target_total = targets.sum()
+        if target_total > 0:
+            targets = targets / target_total
+        drift = np.where(priced, weights - targets, 0.0)
+        flagged = priced & (np.abs(drift) > tolerance)
+        trade_values = -drift * total
+        with np.errstate(divide='ignore', invalid='ignore'):
+            trade_units = np.where(priced, trade_values / prices, 0.0)
+
+        unpriced = tuple(self.asset_codes[i] for i in np.flatnonzero(~priced))
+        if unpriced != self._unpriced:
+            # Log once per change of the unpriced set, not on every tick
+            self._unpriced = unpriced
+            if unpriced:
+                logging_service.warning(f"No price for {list(unpriced)}, excluded from valuation")
+
+        return {
+            'weights': weights,
+            'targets': targets,
+            'drift': drift,
+            'flagged': flagged,
+            'trade_values': trade_values,
+            'trade_units': trade_units,
+            'trade_stroops': to_stroops_array(trade_units),
+            'total_value': total
+        }
+
+    def get_composition(self, analysis=None):
+        """Value-weighted composition as {asset_code: weight}"""
+        if analysis is None:
+            analysis = self.analyze()
+        weights = analysis['weights']
+        return {
+            code: float(weights[i])
+            for i, code in enumerate(self.asset_codes)
+            if self.balances[i] > 0
+        }
+
+__all__ = ['ValuationEngine']